@@ -0,0 +1,199 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# MICRO-BENCHMARKS: figure functions and overview callback over every (year, category) combination
+#
+# Run from the repository root:
+#     python benchmarks/bench_callbacks.py [--repeat 5] [--scales 1,10,100,1000]
+#
+# The scaled runs replace countries.csv with a synthetic dataset of N times its rows (every
+# copy of a row gets a new country name and a random value), then time the aggregation of
+# the country breakdown and the country bar chart on the result.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import import_app, latency_summary, run_metadata, write_results
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Time a function call repeated `repeat` times, return the durations in seconds
+def time_call(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+# Synthetic country dataset with `factor` times the rows of countries.csv
+def scaled_countries(countries, factor, seed=0):
+    if factor == 1:
+        return countries
+    generator = np.random.default_rng(seed)
+    copies = []
+    for copy in range(factor):
+        data = countries.copy()
+        if copy > 0:
+            data['Country'] = data['Country'].astype(str) + f' #{copy}'
+            data['Food Value'] = data['Food Value'] * generator.uniform(0.1, 2.0, len(data))
+        copies.append(data)
+    data = pd.concat(copies, ignore_index=True)
+    data['Country'] = data['Country'].astype('category')
+    return data
+
+
+# ------------------------------------------------------------------------------------------------
+# BENCHMARK SECTION
+
+# Time the figure functions and the overview callback for every filter combination
+def bench_functions(app, repeat):
+    # Importable once app.py has been imported from the src directory
+    from figure_cache import figure_to_json
+    cube = app.cube
+    years = cube['years']
+    categories = cube['categories']
+    calls = {
+        'update_food_value': [],
+        'line_plot_food_value': [],
+        'bar_plot_food_value': [],
+        'bar_plot_food_value_others': [],
+        'figure_to_json': [],
+    }
+
+    for year in years:
+        for category in categories:
+            calls['update_food_value'].append(lambda y=year, c=category: app.update_food_value(y, c))
+            calls['bar_plot_food_value_others'].append(
+                lambda key=(year, category): app.bar_plot_food_value_others(
+                    cube['countries'][key], column1='Country', column2='Food Value',
+                    the_title='Total Value of Food Imported per Country', x_label='Total Food Value ($)',
+                    y_label='Country'))
+            figure = app.food_value_countries_func.__wrapped__(year, category)
+            calls['figure_to_json'].append(lambda f=figure: figure_to_json(f))
+
+            # The over time graph shows a bar chart per category when only a year is selected
+            if year != app.ALL and category == app.ALL:
+                calls['bar_plot_food_value'].append(
+                    lambda y=year: app.bar_plot_food_value(
+                        cube['value_by_category'][y], column1='Food Category', column2='Food Value',
+                        the_title='Total Value of Food Imported per Category', y_label='Food Category',
+                        x_label='Total Food Value ($)'))
+            else:
+                calls['line_plot_food_value'].append(
+                    lambda c=category: app.line_plot_food_value(
+                        data=cube['value_over_time'][c], column1='Year', column2='Food Value',
+                        the_title='Total Value of Food Imported per Year', x_label='Year',
+                        y_label='Total Food Value ($)'))
+
+    results = {}
+    for name, functions in calls.items():
+        durations = []
+        for func in functions:
+            durations.extend(time_call(func, repeat))
+        results[name] = latency_summary(durations)
+        print(f"{name:<28} {results[name]['count']:>6} calls  p50 {results[name]['p50']:8.3f} ms  "
+              f"p99 {results[name]['p99']:8.3f} ms")
+    return results
+
+
+# Time the country aggregation and chart on datasets scaled up from countries.csv
+def bench_scaled(app, scales, repeat):
+    # Importable once app.py has been imported from the src directory
+    from data_layer import group_food_value
+    from figure_cache import figure_to_json
+    from query_engine import QueryEngine
+
+    results = {}
+    for factor in scales:
+        data = scaled_countries(app.facts['countries'], factor)
+
+        # Aggregation of every (year, category) combination (done once at startup by the cube)
+        start = time.perf_counter()
+        groups = {}
+        for year in app.cube['years']:
+            for category in app.cube['categories']:
+                groups[(year, category)] = group_food_value(
+                    data, 'Country', 'Food Value',
+                    None if year == app.ALL else year, None if category == app.ALL else category)
+        aggregate_seconds = time.perf_counter() - start
+
+        # Same breakdowns from the indexed query engine (build once, then query)
+        start = time.perf_counter()
+        engine = QueryEngine(data)
+        engine_build_seconds = time.perf_counter() - start
+        query_durations = []
+        top_n_durations = []
+        for year in app.cube['years']:
+            for category in app.cube['categories']:
+                year_filter = None if year == app.ALL else year
+                category_filter = None if category == app.ALL else category
+                query_durations.extend(time_call(
+                    lambda: engine.group_by('Country', 'Food Value', year_filter, category_filter), repeat))
+                top_n_durations.extend(time_call(
+                    lambda: engine.group_by('Country', 'Food Value', year_filter, category_filter, top_n=10), repeat))
+
+        # Chart of the largest breakdown
+        group = groups[(app.ALL, app.ALL)]
+        figure_durations = time_call(lambda: app.bar_plot_food_value_others(
+            group, column1='Country', column2='Food Value', the_title='Total Value of Food Imported per Country',
+            x_label='Total Food Value ($)', y_label='Country'), repeat)
+        figure = app.bar_plot_food_value_others(group, column1='Country', column2='Food Value',
+                                                the_title='', x_label='', y_label='')
+        serialize_durations = time_call(lambda: figure_to_json(figure), repeat)
+
+        # Top 10 countries + 'Others' chart of the same breakdown
+        top_group = engine.group_by('Country', 'Food Value', top_n=10, others_label='Others')
+        top_durations = time_call(lambda: app.bar_plot_food_value_others(
+            top_group, column1='Country', column2='Food Value', the_title='Total Value of Food Imported per Country',
+            x_label='Total Food Value ($)', y_label='Country'), repeat)
+        top_figure = app.bar_plot_food_value_others(top_group, column1='Country', column2='Food Value',
+                                                    the_title='', x_label='', y_label='')
+
+        results[str(factor)] = {
+            'rows': len(data),
+            'countries': int(data['Country'].nunique()),
+            'aggregate_all_combinations_seconds': aggregate_seconds,
+            'engine_build_seconds': engine_build_seconds,
+            'engine_group_by': latency_summary(query_durations),
+            'engine_top_10': latency_summary(top_n_durations),
+            'bar_plot_food_value_others': latency_summary(figure_durations),
+            'figure_to_json': latency_summary(serialize_durations),
+            'figure_bytes': len(figure_to_json(figure)),
+            'bar_plot_top_10': latency_summary(top_durations),
+            'top_10_figure_bytes': len(figure_to_json(top_figure)),
+        }
+        print(f"{factor:>5}x  {len(data):>8} rows  aggregate {aggregate_seconds:8.3f} s  "
+              f"engine build {engine_build_seconds:6.3f} s  "
+              f"top 10 p50 {results[str(factor)]['engine_top_10']['p50']:6.3f} ms  "
+              f"figure p50 {results[str(factor)]['bar_plot_food_value_others']['p50']:8.2f} ms  "
+              f"{results[str(factor)]['figure_bytes']:>10} bytes")
+    return results
+
+
+# ------------------------------------------------------------------------------------------------
+# COMMAND LINE SECTION
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Micro-benchmarks of the dashboard callbacks')
+    parser.add_argument('--repeat', type=int, default=5, help='calls per function and combination')
+    parser.add_argument('--scales', default='1,10,100,1000', help='dataset scale factors (comma separated)')
+    parser.add_argument('--output-dir', default=None)
+    args = parser.parse_args()
+
+    dashboard = import_app()
+    results = {
+        'meta': run_metadata(),
+        'config': {'repeat': args.repeat, 'scales': args.scales},
+        'load': dashboard.load_report,
+        'functions': bench_functions(dashboard, args.repeat),
+        'scaled': bench_scaled(dashboard, [int(i) for i in args.scales.split(',') if i], args.repeat),
+    }
+    path = write_results('callbacks', results, *([args.output_dir] if args.output_dir else []))
+    print(f'Results written to {path}')
@@ -0,0 +1,68 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# STARTUP BENCHMARK: cold start of a worker, from the import of app.py to the first request served
+#
+# Run from the repository root:
+#     python benchmarks/bench_startup.py [--runs 5]
+#
+# Every run is a new Python process (nothing imported or cached in memory) which imports app.py,
+# creates the app and serves a first request (the page, then the layout), and reports the startup
+# phases recorded by startup.py.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from common import SRC_DIR, latency_summary, run_metadata, write_results
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Code of a run: prints the startup phases (seconds) as JSON on its last line
+RUN_CODE = '''
+import json
+import app, startup
+client = app.server.test_client()
+client.get('/')
+client.get('/_dash-layout')
+print(json.dumps(startup.phases))
+'''
+
+
+# ------------------------------------------------------------------------------------------------
+# BENCHMARK SECTION
+
+# Startup phases of one cold start, and the elapsed time of the whole process
+def run_once():
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', RUN_CODE], cwd=SRC_DIR, capture_output=True, text=True,
+                            check=True).stdout
+    phases = json.loads(output.strip().splitlines()[-1])
+    phases['process'] = time.perf_counter() - start
+    return phases
+
+
+# Summary of every phase over the runs (milliseconds)
+def bench_startup(runs):
+    samples = [run_once() for _ in range(runs)]
+    return {name: latency_summary([i[name] for i in samples if name in i]) for name in samples[0]}
+
+
+# ------------------------------------------------------------------------------------------------
+# COMMAND LINE SECTION
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold start time of a dashboard worker')
+    parser.add_argument('--runs', type=int, default=5, help='new processes started')
+    parser.add_argument('--output-dir', default=None)
+    args = parser.parse_args()
+
+    results = {'meta': run_metadata(), 'config': {'runs': args.runs}, 'startup_ms': bench_startup(args.runs)}
+    for name, summary in results['startup_ms'].items():
+        print(f"{name:>14}: p50 {summary['p50']:.1f} ms, max {summary['max']:.1f} ms")
+    path = write_results('startup', results, *([args.output_dir] if args.output_dir else []))
+    print(f'Results written to {path}')
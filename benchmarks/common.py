@@ -0,0 +1,85 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# BENCHMARKS: helpers shared by the benchmark scripts
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# The app reads its data with paths relative to the src directory
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+
+# Default location of the machine readable results
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Import app.py the way the server does (from the src directory), with the app created and the
+# data loaded
+def import_app():
+    os.chdir(SRC_DIR)
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    import app
+    app.create_app()
+    app.load_data()
+    return app
+
+
+# Current git commit of the repository (None outside a git checkout)
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Description of the machine and code the results were measured on
+def run_metadata():
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+# Summary statistics of a list of durations in seconds (reported in milliseconds)
+def latency_summary(seconds):
+    if len(seconds) == 0:
+        return {'count': 0}
+    milliseconds = np.asarray(seconds) * 1000
+    return {
+        'count': int(milliseconds.size),
+        'mean': float(milliseconds.mean()),
+        'min': float(milliseconds.min()),
+        'p50': float(np.percentile(milliseconds, 50)),
+        'p95': float(np.percentile(milliseconds, 95)),
+        'p99': float(np.percentile(milliseconds, 99)),
+        'max': float(milliseconds.max()),
+    }
+
+
+# Write a result file (<name>-<timestamp>.json) and return its path
+def write_results(name, results, output_dir=RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(output_dir, f'{name}-{stamp}.json')
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+    return path
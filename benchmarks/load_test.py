@@ -0,0 +1,238 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# LOAD TEST: replays dropdown changes against a gunicorn served instance
+#
+# Run from the repository root:
+#     python benchmarks/load_test.py [--workers 4] [--concurrency 16] [--duration 30]
+#     python benchmarks/load_test.py --url http://127.0.0.1:8050   (instance already running)
+#
+# Every simulated interaction picks a (year, category) combination and sends one
+# _dash-update-component POST per server callback of the filters, exactly like the browser does
+# (the callbacks are read from /_dash-dependencies, so every CALLBACK_MODE is supported). The
+# years and categories are the options of the filters in /_dash-layout.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from common import SRC_DIR, latency_summary, run_metadata, write_results
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Ids of the filter dropdowns
+FILTER_IDS = ('year-input', 'category-input')
+
+
+# ------------------------------------------------------------------------------------------------
+# SERVER SECTION
+
+# Free TCP port on the local host
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Start gunicorn serving app:server and wait until it answers
+def start_gunicorn(workers, threads, environment, timeout=60):
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--chdir', SRC_DIR, '--config', os.path.join(SRC_DIR, 'gunicorn.conf.py'),
+               '--workers', str(workers),
+               '--threads', str(threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:server']
+    process = subprocess.Popen(command, env={**os.environ, **environment})
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited before serving requests')
+        try:
+            urllib.request.urlopen(url + '/_dash-layout', timeout=1).read()
+            return process, url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError('gunicorn did not start in time')
+
+
+# ------------------------------------------------------------------------------------------------
+# REQUESTS SECTION
+
+# Server callbacks run by a filter change (the clientside ones never reach the server; the zoom,
+# resize and drill-through callbacks only run on a graph event)
+def server_callbacks(url):
+    with urllib.request.urlopen(url + '/_dash-dependencies') as response:
+        dependencies = json.load(response)
+    return [i for i in dependencies if i.get('clientside_function') is None and
+            any(j['id'] in FILTER_IDS for j in i['inputs'])]
+
+
+# Option values of the filter dropdowns of the layout: filter id -> values
+def filter_options(url):
+    with urllib.request.urlopen(url + '/_dash-layout') as response:
+        components = [json.load(response)]
+    options = {}
+    while components:
+        component = components.pop()
+        if isinstance(component, list):
+            components.extend(component)
+        elif isinstance(component, dict) and 'props' in component:
+            if component['props'].get('id') in FILTER_IDS:
+                options[component['props']['id']] = [i['value'] if isinstance(i, dict) else i
+                                                      for i in component['props']['options']]
+            components.extend(component['props'].values())
+    return options
+
+
+# Body of the POST the browser sends for a callback after a dropdown change.
+# state: component id -> 'data' of the stores (updated from the responses, like the browser does)
+def callback_body(callback, year_input, category_input, changed, state):
+    values = {'year-input': year_input, 'category-input': category_input}
+    outputs = [{'id': i.split('.')[0], 'property': i.split('.')[1]}
+               for i in callback['output'].strip('.').split('...')]
+    return {
+        'output': callback['output'],
+        'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+        'inputs': [{'id': i['id'], 'property': i['property'], 'value': values.get(i['id'])}
+                   for i in callback['inputs']],
+        'state': [{'id': i['id'], 'property': i['property'], 'value': state.get(i['id'])}
+                  for i in callback.get('state', [])],
+        'changedPropIds': [f'{changed}.value'],
+    }
+
+
+# Send one callback request, return (seconds, response body, error)
+def post(url, body):
+    data = json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(url + '/_dash-update-component', data=data,
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            content = response.read()
+        return time.perf_counter() - start, content, None
+    except (urllib.error.URLError, ConnectionError, socket.timeout) as error:
+        return time.perf_counter() - start, b'', str(error)
+
+
+# Keep the store values of a callback response (the chart types of the graphs)
+def update_state(state, content):
+    if not content:
+        return
+    for component_id, properties in json.loads(content).get('response', {}).items():
+        if 'data' in properties:
+            state[component_id] = properties['data']
+
+
+# ------------------------------------------------------------------------------------------------
+# LOAD GENERATOR SECTION
+
+# Run `concurrency` simulated users for `duration` seconds
+def run_load(url, concurrency, duration, seed):
+    callbacks = server_callbacks(url)
+    options = filter_options(url)
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user(number):
+        generator = random.Random(seed + number)
+        year_input, category_input = 'All', 'All'
+        state = {}
+        while time.monotonic() < deadline:
+            # A user changes one of the two dropdowns
+            if generator.random() < 0.5:
+                year_input, changed = generator.choice(options['year-input']), 'year-input'
+            else:
+                category_input, changed = generator.choice(options['category-input']), 'category-input'
+            for callback in callbacks:
+                seconds, content, error = post(url, callback_body(callback, year_input, category_input, changed,
+                                                                  state))
+                update_state(state, content)
+                with lock:
+                    samples.append((callback['output'], seconds, len(content)))
+                    if error is not None:
+                        errors.append(error)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    per_output = {}
+    for output, seconds, size in samples:
+        entry = per_output.setdefault(output, {'seconds': [], 'bytes': 0})
+        entry['seconds'].append(seconds)
+        entry['bytes'] += size
+
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+        'interactions_per_second': len(samples) / max(len(callbacks), 1) / elapsed if elapsed else 0.0,
+        'latency_ms': latency_summary([i[1] for i in samples]),
+        'per_output': {output: {'latency_ms': latency_summary(entry['seconds']),
+                                'mean_bytes': entry['bytes'] / len(entry['seconds'])}
+                       for output, entry in per_output.items()},
+    }
+
+
+# ------------------------------------------------------------------------------------------------
+# COMMAND LINE SECTION
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP load test of the dashboard callbacks')
+    parser.add_argument('--url', default=None, help='running instance (default: start gunicorn)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--mode', default=None, help='CALLBACK_MODE of the started instance')
+    parser.add_argument('--data-store', default=None, help='DATA_STORE of the started instance (shared)')
+    parser.add_argument('--concurrency', type=int, default=8, help='simulated users')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default=None)
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        environment = {'CALLBACK_MODE': args.mode, 'DATA_STORE': args.data_store}
+        process, url = start_gunicorn(args.workers, args.threads,
+                                      {key: value for key, value in environment.items() if value})
+    try:
+        results = {
+            'meta': run_metadata(),
+            'config': {'url': args.url, 'workers': args.workers, 'threads': args.threads, 'mode': args.mode,
+                       'data_store': args.data_store,
+                       'concurrency': args.concurrency, 'duration': args.duration, 'seed': args.seed},
+            'load': run_load(url, args.concurrency, args.duration, args.seed),
+        }
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latency = results['load']['latency_ms']
+    print(f"{results['load']['requests']} requests ({results['load']['errors']} errors), "
+          f"{results['load']['throughput_rps']:.1f} req/s, p50 {latency.get('p50', 0):.1f} ms, "
+          f"p95 {latency.get('p95', 0):.1f} ms, p99 {latency.get('p99', 0):.1f} ms")
+    path = write_results('load', results, *([args.output_dir] if args.output_dir else []))
+    print(f'Results written to {path}')
@@ -0,0 +1,287 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA API: read-only versioned HTTP API of the dashboard aggregates for bulk consumers
+#
+# Routes (GET, on the Flask server of the app):
+#     /api/v1                 filter values, groups, formats and data version
+#     /api/v1/overview        overview values (total value, average value, total volume) and the
+#                             growth over the previous year and share of the year(s) of the value
+#                             year, category: repeated parameters (default: every option, 'All' included)
+#     /api/v1/breakdown       food value per group of the country level data
+#                             group_by: 'country' (default) or 'category_type'
+#                             year, category: one value each (default 'All')
+#                             top_n: only the top_n largest groups, the others added up in an 'Others' row
+# Rows are sorted by food value (largest first) and paginated with limit (default 1000, at most
+# 10000) and offset: the total is sent in X-Total-Count and the next page in a Link header.
+# Values are in the scale of the charts (the fact table measures).
+#
+# Formats (format parameter or Accept header): JSON Lines (default) or Arrow IPC stream (pyarrow).
+# Responses are streamed, compressed with brotli (brotli package) or gzip when accepted, and carry
+# an ETag built from the data version and the request: If-None-Match answers 304 without any work.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import functools
+import hashlib
+import io
+import json
+import math
+import zlib
+from urllib.parse import urlencode
+
+import pandas as pd
+from flask import Response, request
+
+import metrics
+from data_layer import ALL, OTHERS
+from http_cache import response_encoding
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: Arrow responses answer 406 without it
+    pa = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used instead
+    brotli = None
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+API_VERSION = 'v1'
+API_PREFIX = f'/api/{API_VERSION}'
+
+# Format name -> media type
+FORMATS = {'jsonl': 'application/x-ndjson', 'arrow': 'application/vnd.apache.arrow.stream'}
+
+# group_by value -> column of the country level data
+GROUPS = {'country': 'Country', 'category_type': 'Category Type'}
+
+# Pagination
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+# Rows per streamed chunk / Arrow record batch
+CHUNK_ROWS = 1000
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Error raised by the parameter checks (answered as a JSON error with its status)
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# JSON error response
+def error_response(message, status):
+    return Response(json.dumps({'error': message}), status=status, mimetype='application/json')
+
+
+# Integer parameter between minimum and maximum (default when missing)
+def int_parameter(name, default=None, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be an integer') from None
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ApiError(f'{name} must be between {minimum} and {maximum}' if maximum is not None else
+                       f'{name} must be at least {minimum}')
+    return value
+
+
+# Values of a filter parameter, checked against the filter options (every option when missing)
+def filter_values(name, options, single=False):
+    values = request.args.getlist(name) or ([ALL] if single else list(options))
+    if single and len(values) > 1:
+        raise ApiError(f'{name} takes one value')
+    unknown = [i for i in values if i not in options]
+    if unknown:
+        raise ApiError(f'Unknown {name}: {", ".join(unknown)}', status=404)
+    return values
+
+
+# Response format from the format parameter, or from the Accept header
+def response_format():
+    name = request.args.get('format')
+    if name is None:
+        available = [value for key, value in FORMATS.items() if key != 'arrow' or pa is not None]
+        best = request.accept_mimetypes.best_match(available, default=FORMATS['jsonl'])
+        name = next(key for key, value in FORMATS.items() if value == best)
+    if name not in FORMATS:
+        raise ApiError(f'Unknown format: {name} (jsonl or arrow)')
+    if name == 'arrow' and pa is None:
+        raise ApiError('Arrow responses require the pyarrow package', status=406)
+    return name
+
+
+# Weak ETag of a request for a data version (same data, path, parameters and format)
+def request_etag(version, format_name):
+    parameters = sorted(request.args.items(multi=True))
+    key = json.dumps([API_VERSION, version, request.path, parameters, format_name])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+# ------------------------------------------------------------------------------------------------
+# STREAMING SECTION
+
+# JSON line of a row (NaN as null)
+def json_line(row):
+    return json.dumps({key: None if isinstance(value, float) and math.isnan(value) else value
+                       for key, value in row.items()}, separators=(',', ':')) + '\n'
+
+
+# JSON Lines chunks of a table
+def jsonl_chunks(data):
+    for start in range(0, len(data), CHUNK_ROWS):
+        yield ''.join(json_line(i) for i in data.iloc[start:start + CHUNK_ROWS].to_dict('records')).encode('utf-8')
+
+
+# Arrow IPC stream chunks of a table (one record batch per chunk)
+def arrow_chunks(data):
+    sink = io.BytesIO()
+
+    def flush():
+        content = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return content
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        yield flush()
+        for batch in table.to_batches(max_chunksize=CHUNK_ROWS):
+            writer.write_batch(batch)
+            yield flush()
+    yield flush()
+
+
+# Chunks compressed on the fly
+def encoded_chunks(chunks, encoding):
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        content = compress(chunk)
+        if content:
+            yield content
+    yield finish()
+
+
+# Streamed response of one page of a table, with the pagination and caching headers
+def table_response(data, format_name, etag, limit, offset):
+    total = len(data)
+    data = data.iloc[offset:offset + limit]
+    chunks = jsonl_chunks(data) if format_name == 'jsonl' else arrow_chunks(data)
+    encoding = response_encoding()
+
+    response = Response(encoded_chunks(chunks, encoding), mimetype=FORMATS[format_name])
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    response.headers['X-Total-Count'] = str(total)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    if offset + limit < total:
+        parameters = [(key, value) for key, value in request.args.items(multi=True) if key != 'offset']
+        next_url = f'{request.base_url}?{urlencode(parameters + [("offset", offset + limit)])}'
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+
+# ------------------------------------------------------------------------------------------------
+# QUERY SECTION
+
+# Overview values (KPIs) of the (year, category) combinations
+def overview_table(cube, years, categories):
+    data = cube['kpis'].loc[pd.MultiIndex.from_product([years, categories])]
+    return data.reset_index(names=['year', 'category'])
+
+
+# Food value per group of the country level data, largest first ('Others' last)
+def breakdown_table(cube, group_by, year, category, top_n):
+    data = cube['engine'].group_by(GROUPS[group_by], 'Food Value', None if year == ALL else year,
+                                   None if category == ALL else category, top_n=top_n, others_label=OTHERS)
+    data = data.iloc[::-1]
+    return pd.DataFrame({group_by: data[GROUPS[group_by]].astype(str).to_numpy(),
+                         'food_value': data['Food Value'].to_numpy()})
+
+
+# ------------------------------------------------------------------------------------------------
+# ROUTES SECTION
+
+# Register the API routes on the Flask server.
+# get_cube(): cube currently served, get_version(): version of its data (content hash)
+def register_api(server, get_cube, get_version):
+
+    # Count the requests and answer the parameter errors
+    def api_route(path, name):
+        def decorator(func):
+            @functools.wraps(func)
+            def view():
+                try:
+                    response = func()
+                except ApiError as error:
+                    response = error_response(str(error), error.status)
+                metrics.API_REQUESTS.inc(route=name, status=str(response.status_code))
+                return response
+
+            return server.route(path, endpoint=f'api_{name}')(view)
+
+        return decorator
+
+    # Checks shared by the table routes: format, ETag (304 before any work) and pagination
+    def table_request(build):
+        format_name = response_format()
+        etag = request_etag(get_version(), format_name)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        limit = int_parameter('limit', DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+        offset = int_parameter('offset', 0)
+        return table_response(build(), format_name, etag, limit, offset)
+
+    @api_route(API_PREFIX, 'index')
+    def index():
+        cube = get_cube()
+        return Response(json.dumps({
+            'version': API_VERSION,
+            'data_version': get_version(),
+            'years': cube['years'],
+            'categories': cube['categories'],
+            'group_by': list(GROUPS),
+            'formats': [name for name in FORMATS if name != 'arrow' or pa is not None],
+            'routes': [f'{API_PREFIX}/overview', f'{API_PREFIX}/breakdown'],
+        }), mimetype='application/json')
+
+    @api_route(f'{API_PREFIX}/overview', 'overview')
+    def overview():
+        cube = get_cube()
+        years = filter_values('year', cube['years'])
+        categories = filter_values('category', cube['categories'])
+        return table_request(lambda: overview_table(cube, years, categories))
+
+    @api_route(f'{API_PREFIX}/breakdown', 'breakdown')
+    def breakdown():
+        cube = get_cube()
+        group_by = request.args.get('group_by', 'country')
+        if group_by not in GROUPS:
+            raise ApiError(f'Unknown group_by: {group_by} ({" or ".join(GROUPS)})')
+        year = filter_values('year', cube['years'], single=True)[0]
+        category = filter_values('category', cube['categories'], single=True)[0]
+        top_n = int_parameter('top_n', minimum=1)
+        return table_request(lambda: breakdown_table(cube, group_by, year, category, top_n))
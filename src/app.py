@@ -1,53 +1,112 @@
 # PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
 # AUTHOR: MIKE MUSAS
+#
+# The app is built by create_app(): the import only defines the functions, the data is loaded
+# on first use (first request of a worker, or in the gunicorn master with --preload, see
+# gunicorn.conf.py). gunicorn serves app:server, which creates the app.
 
 
 # REQUIRED PYTHON PACKAGES TO IMPORT
+import startup  # first: starts the startup clock (see startup.py)
 import pandas as pd
-import base64
+import functools
+import json
+import logging
+import os
+import threading
 import numpy as np
 import dash
 import dash_bootstrap_components as dbc
-from dash import dcc
+import flask
+from dash import dcc, Patch, no_update
 from dash import html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import plotly.graph_objects as go
-
-# ------------------------------------------------------------------------------------------------
-# APP INITIALIZATION
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+import plotly.io as pio
+from data_layer import ALL, OTHERS, build_cube, hierarchy_breakdown, update_cube
+import api
+import clientside
+import coalescing
+import downsample
+import exports
+import http_cache
+import metrics
+from cache_backends import create_backend, DEFAULT_MAX_SIZE
+from figure_cache import FigureCache
+from data_watcher import DataWatcher
+from facts import update_facts
+from snapshot import content_hash, load_facts
+from shared_store import SEGMENT_ENV, attach_data
+from warmup import AccessStats, warm_up, warmup_combinations
+
+logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------------------------
 # PRE TASKS SECTION
 
-# Import and read data
-# Import the data on us import food value in USD
-food_value = pd.read_csv('data/us_food_imports_food_value.csv')
-# Import the data on us import food category
-food_value_categories = pd.read_csv('data/us_food_imports_food_value_categories.csv')
-# Import the data on us import food volume in metric tons
-food_volume = pd.read_csv('data/us_food_imports_food_volume.csv')
-# Import the data on us import food category
-food_volume_categories = pd.read_csv('data/us_food_imports_food_volume_categories.csv')
-# Import us import food value (countries)
-food_value_countries = pd.read_csv('data/countries.csv')
+# Dash app, set by create_app()
+app = None
+
+# Data, set by load_data(): fact tables (categories and countries, see facts.py), query engine,
+# load report, aggregates of every (year, category) combination and data version
+facts = None
+engine = None
+load_report = None
+data_segment = None
+cube = None
+# Version of the data currently served (content hash of the source files), used by the data API
+data_version = None
+
+# Number of bars of the country / category type charts, the others are added up in an 'Others' bar
+# TOP_N_COUNTRIES, TOP_N_TYPES: a number, or unset to show every bar
+top_n = {chart: int(os.environ[variable]) for chart, variable in
+         [('countries', 'TOP_N_COUNTRIES'), ('types', 'TOP_N_TYPES')] if os.environ.get(variable)}
+
+
+# Version of the cached figures: data content hash and top N settings
+def figure_version(data_hash):
+    return '{}-{}'.format(data_hash[:12], '-'.join(f'{k}{v}' for k, v in sorted(top_n.items())))
 
-# Insert an image
-image_file = 'assets/mmk_logo_desgin.png'
-encoded_image = base64.b64encode(open(image_file, 'rb').read()).decode('ascii')
+
+# Cache of the figures already built for a (graph, year, category) combination (backend set by
+# create_app, version by load_data)
+figure_cache = FigureCache()
+
+# Requests per filter combination, used to warm up the most requested figures (see warmup.py),
+# set by create_app when ACCESS_STATS is set
+access_stats = None
+
+# URL of the logo, set by create_app (served from the assets folder, versioned by its content)
+logo_url = None
 
 
 # ------------------------------------------------------------------------------------------------
 # GRAPHS SECTION
 
-# LINE PLOT for Food value
-def line_plot_food_value(data, column1, column2, the_title, x_label, y_label):
+# Bar colors
+HIGHLIGHT_COLOR = '#D9560B'
+MUTED_COLOR = '#B4BEC9'
+
+
+# Bar colors by rank for bars sorted in ascending order: the largest bars are highlighted, the
+# three smallest ones (and the 'Others' bar) are muted. highlight_n sets the number of highlighted bars.
+def rank_colors(labels, highlight_n=None):
+    ranked = [i for i in labels if i != OTHERS]
+    if highlight_n is None:
+        highlight_n = len(ranked) - 3
+    highlight_n = min(max(highlight_n, 0), len(ranked))
+    colors = iter([MUTED_COLOR] * (len(ranked) - highlight_n) + [HIGHLIGHT_COLOR] * highlight_n)
+    return [MUTED_COLOR if i == OTHERS else next(colors) for i in labels]
+
+
+# LINE PLOT for Food value (Plotly builder, see FIGURE TEMPLATES)
+def line_plot_figure(data, column1, column2, the_title, x_label, y_label):
     # Food Value Over Time Figure
     fig = go.Figure()
     # Food value Line plot
     fig.add_trace(go.Scatter(
         x=data[column1],
-        y=data[column2] * 1000,
+        y=data[column2],
         mode='lines',
         line=dict(color='#D9560B', width=5), connectgaps=True)
     )
@@ -110,22 +169,15 @@ def line_plot_food_value(data, column1, column2, the_title, x_label, y_label):
     return fig
 
 
-# BARCHART for the food value
-def bar_plot_food_value(data, column1, column2, the_title, x_label, y_label, year_filter):
-    # Filter the data
-    data_new = data.loc[data["Year"] == int(year_filter)]
-    # Change the food value column to Millions of dollars
-    data_new[column2] = data_new[column2] * 1000
-    # Sort the data in ascending order by food value
-    data_new = data_new.sort_values(by=[column2])
+# BARCHART for the food value (Plotly builder, see FIGURE TEMPLATES)
+def bar_plot_figure(data_new, column1, column2, the_title, x_label, y_label):
     # Initialize the graph
     fig = go.Figure()
 
     # Plot the graph
     fig.add_trace(go.Bar(
         x=data_new[column2], y=data_new[column1],
-        marker=dict(color=['#B4BEC9', '#B4BEC9', '#B4BEC9', '#D9560B', '#D9560B', '#D9560B', '#D9560B',
-                           '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B']),
+        marker=dict(color=rank_colors(data_new[column1].tolist())),
         orientation='h',
         text=['{:,}M'.format(round(i / 1000000, 1)) for i in
               data_new[column2]],
@@ -184,28 +236,8 @@ def bar_plot_food_value(data, column1, column2, the_title, x_label, y_label, yea
     return fig
 
 
-# BARCHART for the food value (Countries, category types)
-def bar_plot_food_value_others(data, column1, column2, the_title, x_label, y_label, year_filter=None, category_filter=None):
-
-    # Filter the data by the specified year
-    if year_filter is None:
-
-        if category_filter is None:
-            data_new = data.copy()
-        elif category_filter is not None:
-            data_new = data.loc[data["Food Category"] == category_filter]
-    else:
-        if category_filter is None:
-            data_new = data.loc[data["Year"] == year_filter]
-        elif category_filter is not None:
-            data_new = data.loc[data["Food Category"] == category_filter]
-
-    #
-    data_new[column2] = data_new[column2] * 1000
-
-    # Pivot the data
-    data_new = data_new.groupby(column1)[column2].sum().reset_index().sort_values(by=column2)
-    data_new = pd.DataFrame(data_new)
+# BARCHART for the food value (Countries, category types) (Plotly builder, see FIGURE TEMPLATES)
+def bar_plot_others_figure(data_new, column1, column2, the_title, x_label, y_label):
 
     # Initialize the bar chart
     fig = go.Figure()
@@ -213,8 +245,7 @@ def bar_plot_food_value_others(data, column1, column2, the_title, x_label, y_lab
     # Plot the graph
     fig.add_trace(go.Bar(
         x=data_new[column2], y=data_new[column1],
-        marker=dict(color=['#B4BEC9', '#B4BEC9', '#B4BEC9', '#D9560B', '#D9560B', '#D9560B', '#D9560B',
-                           '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B', '#D9560B']),
+        marker=dict(color=rank_colors(data_new[column1].tolist())),
         orientation='h',
         text=['{:,}M'.format(round(i / 1000000, 1)) for i in data_new[column2]],
         textfont=dict(color='white', size=12),
@@ -236,484 +267,1116 @@ def bar_plot_food_value_others(data, column1, column2, the_title, x_label, y_lab
     return fig
 
 
+# TREEMAP for the food value (Food Category -> Category Type -> Country) (Plotly builder, see
+# FIGURE TEMPLATES). A click on a node shows its children.
+def treemap_figure(data_new, column1, column2, the_title, x_label, y_label):
+
+    # Initialize the treemap
+    fig = go.Figure()
+
+    # Plot the graph (the nodes are set by the callbacks: ids, labels, parents, values, text)
+    fig.add_trace(go.Treemap(
+        ids=[], labels=[], parents=[], values=[],
+        branchvalues='total',
+        maxdepth=3,
+        texttemplate='%{label}<br>%{text}',
+        hovertemplate='<b>%{label}</b><br>%{text}<br>%{percentParent:.1%} of %{parent}<extra></extra>',
+        textfont=dict(size=14)
+    ))
+
+    # Figure layout
+    fig.update_layout(
+        title=dict(text=the_title, font=dict(size=20, color='#0C0B09')),
+        treemapcolorway=['#D94B2B', '#023E73', '#F2A444', '#595959', '#B4BEC9'],
+        margin=dict(l=30, r=30, b=30, t=70, pad=4)
+    )
+
+    return fig
+
+
 # ------------------------------------------------------------------------------------------------
-# APPLICATION LAYOUT
-app.layout = html.Div(children=[
-    # ------------------------------------------------------------------------------------------------
-    # TITLE SECTION
-    dbc.Row(children=[
-        dbc.Col([
-            html.Div(children=[
-                # The Title of the dashboard
-                html.Div("U.S.A. Food Imports Dashboard",
-                         style={'font-size': '54px', 'font-family': 'ApparatCond', 'font-weight': 'bold',
-                                'margin-top': '5px', 'color': 'white'}
-                         ),
-                # The Subtitle of the dashboard
-                html.Div("The data includes US imports from the year 2010 to 2023",
-                         style={'font-size': '20px', 'font-family': 'Lato', 'font-weight': 'regular',
-                                'margin-top': '0px', 'color': '#F2A444'}
-                         )
-            ])
-        ],
-            width={'size': 10},
-            xs=8, sm=8, md=8, lg=10, xl=10
-        )
-    ],
-        justify='center',
-        style={'background-color': '#023E73', 'padding': '10px 0 20px 10px'}),
-
-    # Line Break
-    dbc.Row(dbc.Col(html.Br())),
-
-    # ------------------------------------------------------------------------------------------------
-    # DASHBOARD BODY SECTION
-    dbc.Row(children=[
-
-        # --------------------------------------------------------------------------------------------
-        # FILTERS SECTION
-        dbc.Col([
-            # Filter Title
-            html.Div(children=[
-                html.Div('Filters',
-                         style={'font-size': '18px', 'font-weight': 'bold', 'color': '#000000',
-                                'padding': '15px 0 0 15px'}),
-                html.Hr(style={'color': '#D9D9D9'}),
-            ]),
+# FIGURE TEMPLATES
+# Plotly validates every property given to the builders above, which costs far more than the
+# data of these small charts. Each builder is called once per title, without data, and the
+# callbacks then only swap the trace arrays into a copy of the resulting plain figure.
 
-            # Year Filter Title
-            html.Div(children=[
-                # The title
-                html.Div('Year',
-                         style={'font-size': '16px', 'color': '#000000',
-                                'padding': '5px 30px 10px 15px'}),
-                # Year Filters Choice Dropdown Menu
-                html.Div(dcc.Dropdown(
-                    id='year-input',
-                    options=[{'label': i, 'value': i}
-                             for i in ['All', '2023', '2022', '2021', '2020', '2019', '2018', '2017', '2016',
-                                       '2015', '2014', '2013', '2012', '2011', '2010']],
-                    value='All'
-                ), style={'width': '90%', 'margin-left': '10px'})
-            ]),
+# Plain (JSON compatible) figure built once by a Plotly builder without data. The default
+# Plotly template holds the defaults of every trace type: only the types of the figure are kept.
+@functools.lru_cache(maxsize=None)
+def figure_template(builder, the_title, x_label, y_label):
+    figure = json.loads(pio.to_json(builder(pd.DataFrame({'x': [], 'y': []}), 'x', 'y', the_title, x_label, y_label),
+                                    validate=False))
+    trace_types = {trace.get('type', 'scatter') for trace in figure['data']}
+    template = figure['layout'].get('template', {})
+    template['data'] = {key: value for key, value in template.get('data', {}).items() if key in trace_types}
+    return figure
 
-            # Line break
-            html.Div(html.Br()),
-
-            # Food Category
-            html.Div(children=[
-                # The title
-                html.Div('Food Category',
-                         style={'font-size': '16px', 'color': '#000000',
-                                'padding': '5px 30px 10px 15px'}),
-                # Year Filters Choice Dropdown Menu
-                html.Div(dcc.Dropdown(
-                    id='category-input',
-                    options=[{'label': i, 'value': i}
-                             for i in ['All', 'Beverages', 'Cocoa and chocolate', 'Coffee, tea, and spices', 'Dairy',
-                                       'Fish and shellfish', 'Fruits', 'Grains', 'Live meat animals', 'Meats', 'Nuts',
-                                       'Sugar and candy', 'Vegetable oils', 'Vegetables', 'Other edible products']],
-                    value='All'
-                ), style={'width': '90%', 'margin-left': '10px'})
-            ]),
 
+# Figure of a template with new trace properties (the template itself is shared, never modified)
+def fill_template(template, **trace):
+    return {'data': [dict(template['data'][0], **trace)], 'layout': template['layout']}
+
+
+# Values of a column as a contiguous NumPy array (encoded natively by the figure serializer)
+def column_array(column):
+    return np.ascontiguousarray(column.to_numpy())
+
+
+# Horizontal bars of a grouped table: values, labels, value labels and colors by rank
+def bar_trace(template, data_new, column1, column2):
+    labels = data_new[column1].tolist()
+    values = column_array(data_new[column2])
+    return fill_template(template, x=values, y=labels,
+                         text=['{:,}M'.format(round(i / 1000000, 1)) for i in values.tolist()],
+                         marker=dict(template['data'][0]['marker'], color=rank_colors(labels)))
+
+
+# Line of a series. Series longer than the graph can show (finer than yearly granularity) are
+# downsampled to DOWNSAMPLE_WIDTH (the width of the graph in the browser isn't known here, see
+# fit_to_view) and drawn with WebGL.
+def line_trace(template, x, y):
+    if len(x) <= downsample.max_points():
+        return fill_template(template, x=x, y=y)
+    x, y = downsample.downsample(x, y)
+    return fill_template(template, type='scattergl', x=x, y=y)
+
+
+# LINE PLOT for Food value
+@metrics.timed_stage('figure')
+def line_plot_food_value(data, column1, column2, the_title, x_label, y_label):
+    template = figure_template(line_plot_figure, the_title, x_label, y_label)
+    return line_trace(template, column_array(data[column1]), column_array(data[column2]))
+
+
+# BARCHART for the food value (data already filtered, scaled and sorted by the data layer)
+@metrics.timed_stage('figure')
+def bar_plot_food_value(data_new, column1, column2, the_title, x_label, y_label):
+    return bar_trace(figure_template(bar_plot_figure, the_title, x_label, y_label), data_new, column1, column2)
+
+
+# BARCHART for the food value (Countries, category types)
+# The data is already grouped, scaled and sorted by the data layer
+@metrics.timed_stage('figure')
+def bar_plot_food_value_others(data_new, column1, column2, the_title, x_label, y_label):
+    return bar_trace(figure_template(bar_plot_others_figure, the_title, x_label, y_label), data_new, column1, column2)
+
+
+# TREEMAP for the food value (nodes of the precomputed hierarchy: ids, labels, parents, values)
+@metrics.timed_stage('figure')
+def treemap_food_value(nodes, the_title):
+    template = figure_template(treemap_figure, the_title, '', '')
+    values = np.ascontiguousarray(nodes['values'])
+    return fill_template(template, ids=nodes['ids'], labels=nodes['labels'], parents=nodes['parents'], values=values,
+                         text=['{:,}M'.format(round(i / 1000000, 1)) for i in values.tolist()])
+
+
+# ------------------------------------------------------------------------------------------------
+# APPLICATION LAYOUT
+# Build the layout from the options of the filters (years, categories: the years from the latest
+# to the earliest after 'All').
+# extra_children: components added at the end of the page
+def build_layout(years, categories, extra_children=()):
+    extra_children = list(extra_children)
+    return html.Div(children=[
+        # ------------------------------------------------------------------------------------------------
+        # TITLE SECTION
+        dbc.Row(children=[
+            dbc.Col([
+                html.Div(children=[
+                    # The Title of the dashboard
+                    html.Div("U.S.A. Food Imports Dashboard",
+                             style={'font-size': '54px', 'font-family': 'ApparatCond', 'font-weight': 'bold',
+                                    'margin-top': '5px', 'color': 'white'}
+                             ),
+                    # The Subtitle of the dashboard
+                    html.Div(f"The data includes US imports from the year {years[-1]} to {years[1]}"
+                             if len(years) > 1 else '',
+                             style={'font-size': '20px', 'font-family': 'Lato', 'font-weight': 'regular',
+                                    'margin-top': '0px', 'color': '#F2A444'}
+                             )
+                ])
+            ],
+                width={'size': 10},
+                xs=8, sm=8, md=8, lg=10, xl=10
+            )
         ],
-            width={'size': 2},
-            style={'background-color': '#E8E8E8',
-                   'border-radius': '12px', 'padding': '0 0 100px 0',  # padding [top right bottom left]
-                   'margin-right': '30px', 'height': '400px'},
-            xs=6, sm=6, md=6, lg=2, xl=2
-        ),
+            justify='center',
+            style={'background-color': '#023E73', 'padding': '10px 0 20px 10px'}),
+
+        # Line Break
+        dbc.Row(dbc.Col(html.Br())),
+
+        # ------------------------------------------------------------------------------------------------
+        # DASHBOARD BODY SECTION
+        dbc.Row(children=[
+
+            # --------------------------------------------------------------------------------------------
+            # FILTERS SECTION
+            dbc.Col([
+                # Filter Title
+                html.Div(children=[
+                    html.Div('Filters',
+                             style={'font-size': '18px', 'font-weight': 'bold', 'color': '#000000',
+                                    'padding': '15px 0 0 15px'}),
+                    html.Hr(style={'color': '#D9D9D9'}),
+                ]),
+
+                # Year Filter Title
+                html.Div(children=[
+                    # The title
+                    html.Div('Year',
+                             style={'font-size': '16px', 'color': '#000000',
+                                    'padding': '5px 30px 10px 15px'}),
+                    # Year Filters Choice Dropdown Menu
+                    html.Div(dcc.Dropdown(
+                        id='year-input',
+                        options=[{'label': i, 'value': i} for i in years],
+                        value='All'
+                    ), style={'width': '90%', 'margin-left': '10px'})
+                ]),
+
+                # Line break
+                html.Div(html.Br()),
+
+                # Food Category
+                html.Div(children=[
+                    # The title
+                    html.Div('Food Category',
+                             style={'font-size': '16px', 'color': '#000000',
+                                    'padding': '5px 30px 10px 15px'}),
+                    # Year Filters Choice Dropdown Menu
+                    html.Div(dcc.Dropdown(
+                        id='category-input',
+                        options=[{'label': i, 'value': i} for i in categories],
+                        value='All'
+                    ), style={'width': '90%', 'margin-left': '10px'})
+                ]),
+
+            ],
+                width={'size': 2},
+                style={'background-color': '#E8E8E8',
+                       'border-radius': '12px', 'padding': '0 0 100px 0',  # padding [top right bottom left]
+                       'margin-right': '30px', 'height': '400px'},
+                xs=6, sm=6, md=6, lg=2, xl=2
+            ),
 
-        # --------------------------------------------------------------------------------------------
-        # DASHBOARD ANALYSIS SECTION
-        dbc.Col(children=[
+            # --------------------------------------------------------------------------------------------
+            # DASHBOARD ANALYSIS SECTION
+            dbc.Col(children=[
 
-            # ----------------------------------------------------------------------------------------
-            # OVERVIEW SECTION
-            dbc.Row(children=[
-                # Total Food Value
-                dbc.Col([
+                # ----------------------------------------------------------------------------------------
+                # OVERVIEW SECTION
+                dbc.Row(children=[
                     # Total Food Value
-                    html.Div([
-                        html.Div(id='total-food-value',
-                                 style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
-
-                        html.Div('Total Food Value',
-                                 style={'color': '#000000'})
+                    dbc.Col([
+                        # Total Food Value
+                        html.Div([
+                            html.Div(id='total-food-value',
+                                     style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
+
+                            html.Div('Total Food Value',
+                                     style={'color': '#000000'})
+                        ],
+                            style={'text-align': 'center', 'padding': '30px 0 30px 0',
+                                   'background-color': '#D9D9D9', 'border-radius': '12px'}
+                        )
                     ],
-                        style={'text-align': 'center', 'padding': '30px 0 30px 0',
-                               'background-color': '#D9D9D9', 'border-radius': '12px'}
-                    )
-                ],
-                    width={'size': 4},
-                    style={'padding-right': '10px', 'padding-top': '10px'},
-                    xs=8, sm=8, md=8, lg=4, xl=4
-                ),
+                        width={'size': 4},
+                        style={'padding-right': '10px', 'padding-top': '10px'},
+                        xs=8, sm=8, md=8, lg=4, xl=4
+                    ),
 
-                # Average Food Value
-                dbc.Col([
                     # Average Food Value
-                    html.Div([
-                        html.Div(id='average-food-value',
-                                 style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
-
-                        html.Div('Average Food Value',
-                                 style={'color': '#000000'})
+                    dbc.Col([
+                        # Average Food Value
+                        html.Div([
+                            html.Div(id='average-food-value',
+                                     style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
+
+                            html.Div('Average Food Value',
+                                     style={'color': '#000000'})
+                        ],
+                            style={'text-align': 'center', 'padding': '30px 0 30px 0',
+                                   'background-color': '#D9D9D9', 'border-radius': '12px'}
+                        )
                     ],
-                        style={'text-align': 'center', 'padding': '30px 0 30px 0',
-                               'background-color': '#D9D9D9', 'border-radius': '12px'}
+                        width={'size': 4},
+                        style={'padding-right': '10px', 'padding-top': '10px'},
+                        xs=8, sm=8, md=8, lg=4, xl=4
+                    ),
+
+                    # Total Food Volume
+                    dbc.Col([
+                        # Total Food Value
+                        html.Div([
+                            html.Div(id='total-food-volume',
+                                     style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
+
+                            html.Div('Total Food Volume',
+                                     style={'color': '#000000'})
+                        ],
+                            style={'text-align': 'center', 'padding': '30px 0 30px 0',
+                                   'background-color': '#D9D9D9', 'border-radius': '12px'}
+                        )
+                    ],
+                        width={'size': 4},
+                        style={'padding-right': '10px', 'padding-top': '10px'},
+                        xs=8, sm=8, md=8, lg=4, xl=4
                     )
-                ],
-                    width={'size': 4},
-                    style={'padding-right': '10px', 'padding-top': '10px'},
-                    xs=8, sm=8, md=8, lg=4, xl=4
+                ], justify='center'),
+
+                # Space Break
+                dbc.Row(dbc.Col(html.Br())),
+
+                # ----------------------------------------------------------------------------------------
+                # FIRST ROW CHARTS
+                dbc.Row(children=[
+                    # Chart 1
+                    dbc.Col([
+                        # Total Food Value Over Time
+                        dcc.Graph(id='food-value-overtime',
+                                  style={'border-radius': '12px', 'overflow': 'hidden'})
+                    ],
+                        width={'size': 6},
+                        style={'padding-right': '10px', 'padding-bottom': '20px'},
+                        xs=12, sm=12, md=12, lg=6, xl=6
+                    ),
+
+                    # Chart 2
+                    dbc.Col([
+                        html.Div([
+                            # Total Food Volume Over Time
+                            html.Div(dcc.Graph(id='food-volume-overtime',
+                                               style={'border-radius': '12px', 'overflow': 'hidden'})),
+                        ])
+                    ],
+                        width={'size': 6},
+                        xs=12, sm=12, md=12, lg=6, xl=6
+                    )
+                ], justify='center'
                 ),
 
-                # Total Food Volume
-                dbc.Col([
-                    # Total Food Value
-                    html.Div([
-                        html.Div(id='total-food-volume',
-                                 style={'font-size': '38px', 'font-weight': 'bold', 'color': '#D94B2B'}),
-
-                        html.Div('Total Food Volume',
-                                 style={'color': '#000000'})
+                # Space Break
+                dbc.Row(dbc.Col(html.Br())),
+
+                # ----------------------------------------------------------------------------------------
+                # SECOND ROW CHARTS
+                dbc.Row(children=[
+                    # Chart 1
+                    dbc.Col([
+                        html.Div([
+                            # Total ...
+                            html.Div(dcc.Graph(id='food-value-countries',
+                                               style={'border-radius': '12px', 'overflow': 'hidden',
+                                                      'height': '700px'})),
+                        ])
+                    ],
+                        width={'size': 6},
+                        style={'padding-right': '10px', 'padding-bottom': '20px'},
+                        xs=12, sm=12, md=12, lg=6, xl=6
+                    ),
+
+                    # Chart 2
+                    dbc.Col([
+                        html.Div([
+                            # Total ...
+                            html.Div(dcc.Graph(id='food-value-types',
+                                               style={'border-radius': '12px', 'overflow': 'hidden',
+                                                      'height': '700px'})),
+                        ])
                     ],
-                        style={'text-align': 'center', 'padding': '30px 0 30px 0',
-                               'background-color': '#D9D9D9', 'border-radius': '12px'}
+                        width={'size': 6},
+                        style={'padding-right': '10px', 'padding-bottom': '20px'},
+                        xs=12, sm=12, md=12, lg=6, xl=6
                     )
-                ],
-                    width={'size': 4},
-                    style={'padding-right': '10px', 'padding-top': '10px'},
-                    xs=8, sm=8, md=8, lg=4, xl=4
-                )
-            ], justify='center'),
-
-            # Space Break
-            dbc.Row(dbc.Col(html.Br())),
-
-            # ----------------------------------------------------------------------------------------
-            # FIRST ROW CHARTS
-            dbc.Row(children=[
-                # Chart 1
-                dbc.Col([
-                    # Total Food Value Over Time
-                    dcc.Graph(id='food-value-overtime',
-                              style={'border-radius': '12px', 'overflow': 'hidden'})
-                ],
-                    width={'size': 6},
-                    style={'padding-right': '10px', 'padding-bottom': '20px'},
-                    xs=12, sm=12, md=12, lg=6, xl=6
-                ),
+                ]),
+
+                # ----------------------------------------------------------------------------------------
+                # THIRD ROW CHARTS
+                dbc.Row(children=[
+                    # Chart 1
+                    dbc.Col([
+                        # Food Value by Category, Category Type and Country (click to drill down)
+                        dcc.Graph(id='food-value-hierarchy',
+                                  style={'border-radius': '12px', 'overflow': 'hidden', 'height': '600px'})
+                    ],
+                        width={'size': 12},
+                        style={'padding-right': '10px', 'padding-bottom': '20px'}
+                    )
+                ])
 
-                # Chart 2
-                dbc.Col([
-                    html.Div([
-                        # Total Food Volume Over Time
-                        html.Div(dcc.Graph(id='food-volume-overtime',
-                                           style={'border-radius': '12px', 'overflow': 'hidden'})),
-                    ])
-                ],
-                    width={'size': 6},
-                    xs=12, sm=12, md=12, lg=6, xl=6
-                )
-            ], justify='center'
+            ] + downloads_panel(years),
+                width={'size': 8}
+            )
+
+        ], justify='center'),
+
+        # Space Break
+        dbc.Row(dbc.Col(html.Br())),
+        dbc.Row(dbc.Col(html.Br())),
+
+        # ------------------------------------------------------------------------------------------------
+        # FOOTER SECTION
+        dbc.Row(children=[
+            # Copyright and Data Source
+            dbc.Col([
+                html.Div([
+                    # Copyright
+                    html.Div('Made by',
+                             style={'color': 'white', 'margin-right': '5px'}),
+                    html.Div('Mike Musas',
+                             style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'bold',
+                                    'margin-right': '5px'}),
+                    html.Div('|',
+                             style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'regular',
+                                    'margin-right': '5px'}),
+
+                    # Data Source
+                    html.Div('Data Source:',
+                             style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'regular',
+                                    'margin-right': '5px'}),
+                    html.Div(html.A("data.gov", href='https://catalog.data.gov/dataset/u-s-food-imports',
+                                    style={'color': '#F2A444', 'font-family': 'Lato', 'font-weight': 'bold'}))
+
+                ], style={'display': 'flex', 'padding-top': '15px'})
+            ],
+                width={'size': 9},
+                xs=8, sm=8, md=8, lg=9, xl=9
             ),
 
-            # Space Break
-            dbc.Row(dbc.Col(html.Br())),
+            # Logo Section
+            dbc.Col(children=[
+                html.Div(html.Img(src=logo_url,
+                                  style={'width': '50%', 'height': '50%'}))
+            ],
+                width={'size': 1},
+                style={'float': 'right'},
+                xs=2, sm=2, md=2, lg=1, xl=1
+            )
+        ],
+            justify='center',
+            style={'background-color': '#023E73', 'padding': '10px 0 20px 10px'}
+        )
 
-            # ----------------------------------------------------------------------------------------
-            # SECOND ROW CHARTS
+    ] + extra_children, style={'background-color': '#F5F5F5'})
+
+
+# DOWNLOADS SECTION
+# Exports of the breakdowns and multi-year comparisons, built in the background (see exports.py).
+# Only shown when the background job packages are installed.
+def downloads_panel(years):
+    if not exports.enabled():
+        return []
+    return [dbc.Row(dbc.Col([
+        html.Div(id='downloads', children=[
+            # Panel Title
+            html.Div('Downloads',
+                     style={'font-size': '18px', 'font-weight': 'bold', 'color': '#000000',
+                            'padding': '10px 0 10px 0'}),
             dbc.Row(children=[
-                # Chart 1
+                # Kind of export
+                dbc.Col(dcc.Dropdown(
+                    id='export-kind',
+                    options=[{'label': label, 'value': kind} for kind, (label, _) in exports.KINDS.items()],
+                    value='breakdown-country',
+                    clearable=False
+                ), xs=12, sm=12, md=6, lg=4, xl=4),
+                # Years of the comparisons
+                dbc.Col(dcc.Dropdown(
+                    id='export-years',
+                    options=[{'label': i, 'value': i} for i in years if i != ALL],
+                    multi=True,
+                    placeholder='Years to compare'
+                ), xs=12, sm=12, md=6, lg=4, xl=4),
+                # File format
+                dbc.Col(dcc.RadioItems(
+                    id='export-format',
+                    options=[{'label': exports.FORMATS[i][0], 'value': i} for i in exports.available_formats()],
+                    value='csv',
+                    inline=True,
+                    inputStyle={'margin': '0 5px 0 10px'}
+                ), xs=6, sm=6, md=6, lg=2, xl=2, style={'padding-top': '6px'}),
+                # Start / cancel
                 dbc.Col([
-                    html.Div([
-                        # Total ...
-                        html.Div(dcc.Graph(id='food-value-countries',
-                                           style={'border-radius': '12px', 'overflow': 'hidden',
-                                                  'height': '700px'})),
-                    ])
-                ],
-                    width={'size': 6},
-                    style={'padding-right': '10px', 'padding-bottom': '20px'},
-                    xs=12, sm=12, md=12, lg=6, xl=6
-                ),
+                    dbc.Button('Export', id='export-button', size='sm', style={'margin-right': '5px'}),
+                    dbc.Button('Cancel', id='export-cancel', size='sm', color='secondary', disabled=True)
+                ], xs=6, sm=6, md=6, lg=2, xl=2)
+            ]),
+            # Progress of the running export and link to the file
+            dbc.Progress(id='export-progress', value=0, style={'height': '20px', 'margin-top': '15px'}),
+            html.Div(id='export-result', style={'padding': '10px 0 10px 0'})
+        ], style={'background-color': '#E8E8E8', 'border-radius': '12px', 'padding': '0 15px 0 15px'})
+    ]), style={'padding-right': '10px', 'padding-bottom': '20px'})]
 
-                # Chart 2
-                dbc.Col([
-                    html.Div([
-                        # Total ...
-                        html.Div(dcc.Graph(id='food-value-types',
-                                           style={'border-radius': '12px', 'overflow': 'hidden',
-                                                  'height': '700px'})),
-                    ])
-                ],
-                    width={'size': 6},
-                    style={'padding-right': '10px', 'padding-bottom': '20px'},
-                    xs=12, sm=12, md=12, lg=6, xl=6
-                )
-            ])
 
-        ],
-            width={'size': 8}
-        )
+# Layout served to the browser and its JSON, built on first use and rebuilt only after the data
+# changed. The JSON is sent as it is by the _dash-layout route (see create_app).
+current_layout = None
 
-    ], justify='center'),
-
-    # Space Break
-    dbc.Row(dbc.Col(html.Br())),
-    dbc.Row(dbc.Col(html.Br())),
-
-    # ------------------------------------------------------------------------------------------------
-    # FOOTER SECTION
-    dbc.Row(children=[
-        # Copyright and Data Source
-        dbc.Col([
-            html.Div([
-                # Copyright
-                html.Div('Made by',
-                         style={'color': 'white', 'margin-right': '5px'}),
-                html.Div('Mike Musas',
-                         style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'bold',
-                                'margin-right': '5px'}),
-                html.Div('|',
-                         style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'regular',
-                                'margin-right': '5px'}),
-
-                # Data Source
-                html.Div('Data Source:',
-                         style={'color': 'white', 'font-family': 'Lato', 'font-weight': 'regular',
-                                'margin-right': '5px'}),
-                html.Div(html.A("data.gov", href='https://catalog.data.gov/dataset/u-s-food-imports',
-                                style={'color': '#F2A444', 'font-family': 'Lato', 'font-weight': 'bold'}))
-
-            ], style={'display': 'flex', 'padding-top': '15px'})
-        ],
-            width={'size': 9},
-            xs=8, sm=8, md=8, lg=9, xl=9
-        ),
 
-        # Logo Section
-        dbc.Col(children=[
-            html.Div(html.Img(src='data:image/png;base64,{}'.format(encoded_image),
-                              style={'width': '50%', 'height': '50%'}))
-        ],
-            width={'size': 1},
-            style={'float': 'right'},
-            xs=2, sm=2, md=2, lg=1, xl=1
-        )
-    ],
-        justify='center',
-        style={'background-color': '#023E73', 'padding': '10px 0 20px 10px'}
-    )
+def built_layout():
+    global current_layout
+    built = current_layout
+    if built is None:
+        load_data()
+        with startup.phase('layout'):
+            layout = build_layout(cube['years'], cube['categories'], layout_extra_children())
+            built = current_layout = (layout, pio.json.to_json_plotly(layout))
+    return built
+
+
+def serve_layout():
+    return built_layout()[0]
 
-], style={'background-color': '#F5F5F5'})
+
+# Response of the _dash-layout route
+def serve_layout_json():
+    return flask.Response(built_layout()[1], mimetype='application/json')
+
+
+# Layout with every component of the page and no data, used by Dash to check the callbacks
+# (the layout function is not called before the data is needed)
+def validation_layout():
+    return build_layout([], [], layout_extra_children(with_data=False))
 
 
 # CALLBACK SECTION
 
+# Every callback is driven by the two filters
+FILTER_INPUTS = [
+    Input(component_id='year-input', component_property='value'),
+    Input(component_id='category-input', component_property='value')
+]
+
 # OVERVIEW VALUES
-@app.callback([
+OVERVIEW_OUTPUTS = [
     Output(component_id='total-food-value', component_property='children'),
     Output(component_id='average-food-value', component_property='children'),
     Output(component_id='total-food-volume', component_property='children')
-], [
-    Input(component_id='year-input', component_property='value'),
-    Input(component_id='category-input', component_property='value'),
-],
-)
-def update_food_value(year_input, category_input):
-    # Filter for year
-    if year_input == 'All':
-        # For this case 'All' is selected the category input
-        if category_input == 'All':
-            total_food_value = food_value['Total foods Value'].sum()
-            average_food_value = food_value['Total foods Value'].mean()
-            total_food_volume = food_volume['Total foods Volume'].sum()
-
-            return (
-                '{:,}M'.format(round(total_food_value / 1000, 1)),
-                '{:,}M'.format(round(average_food_value / 1000, 1)),
-                '{:,}M'.format(round(total_food_volume / 1000, 1))
-            )
-        # For cases where a specific category is selected
-        else:
-            total_food_value = food_value[category_input].sum()
-            average_food_value = food_value[category_input].mean()
-            total_food_volume = food_volume[category_input].sum()
-
-            return (
-                '{:,}M'.format(round(total_food_value / 1000, 1)),
-                '{:,}M'.format(round(average_food_value / 1000, 1)),
-                '{:,}M'.format(round(total_food_volume / 1000, 1))
-            )
+]
 
-    # Other Year Selected
-    else:
-        # If all the food categories are included
-        if category_input == 'All':
-            total_food_value = food_value.loc[food_value['Year'] == int(year_input), 'Total foods Value'].sum()
-            average_food_value = food_value.loc[food_value['Year'] == int(year_input), 'Average Food Value'].mean()
-            total_food_volume = food_volume.loc[food_volume['Year'] == int(year_input), 'Total foods Volume'].sum()
-
-            # Returns the results
-            return (
-                '{:,}M'.format(round(total_food_value / 1000, 1)),
-                '{:,}M'.format(round(average_food_value / 1000, 1)),
-                '{:,}M'.format(round(total_food_volume / 1000, 1))
-            )
 
-        # If a specific category is selected
-        else:
-            total_food_value = food_value.loc[food_value['Year'] == int(year_input), category_input].sum()
-            average_food_value = food_value.loc[food_value['Year'] == int(year_input), category_input].mean()
-            total_food_volume = food_volume.loc[food_volume['Year'] == int(year_input), category_input].sum()
-
-            # Returns the results
-            return (
-                '{:,}M'.format(round(total_food_value / 1000, 1)),
-                '{:,}M'.format(round(average_food_value, 1000)),
-                '{:,}M'.format(round(total_food_volume / 1000, 1))
-            )
+# Value in millions, as shown by the overview (one decimal)
+def millions_text(value):
+    return '{:,}M'.format(round(value / 1000000, 1))
+
+
+def update_food_value(year_input, category_input):
+    # One overview update per filter change
+    if access_stats is not None:
+        access_stats.record(year_input, category_input)
+
+    # Read the precomputed values (already scaled by the fact tables), every value in millions
+    overview = cube['overview'][(year_input, category_input)]
+    return tuple(millions_text(overview[i]) for i in ('total_value', 'average_value', 'total_volume'))
 
 
 # ------------------------------------------------------------------------------------------------
 # GRAPH 1: TOTAL FOOD VALUE OVER TIME
-@app.callback(
-    Output(component_id='food-value-overtime', component_property='figure')
-    , [
-        Input(component_id='year-input', component_property='value'),
-        Input(component_id='category-input', component_property='value')
-    ]
-)
+FOOD_VALUE_OVERTIME_OUTPUT = Output(component_id='food-value-overtime', component_property='figure')
+
+
+@figure_cache.cached('food-value-overtime')
 def food_value_over_time(year_input, category_input):
-    if year_input == 'All':
-        # In case all categories are included
-        if category_input == 'All':
-            return line_plot_food_value(data=food_value, column1="Year", column2="Total foods Value",
-                                        the_title="Total Value of Food Imported per Year",
-                                        x_label="Year", y_label="Total Food Value ($)")
-        # In case one category is selected
-        else:
-            return line_plot_food_value(data=food_value, column1="Year", column2=category_input,
-                                        the_title="Total Value of Food Imported per Year",
-                                        x_label="Year", y_label="Total Food Value ($)")
-
-    # In case a specific year is selected
-    else:
-        # In case all categories are included
-        if category_input == 'All':
-            return bar_plot_food_value(data=food_value_categories, column1="Food Category", column2="Food Value",
-                                       the_title="Total Value of Food Imported per Category",
-                                       y_label="Food Category", x_label="Total Food Value ($)", year_filter=year_input)
+    # In case a specific year is selected and all categories are included
+    if year_input != ALL and category_input == ALL:
+        return bar_plot_food_value(cube['value_by_category'][year_input], column1="Food Category",
+                                   column2="Food Value", the_title="Total Value of Food Imported per Category",
+                                   y_label="Food Category", x_label="Total Food Value ($)")
 
-        # In case one category is selected
-        else:
-            return line_plot_food_value(data=food_value, column1="Year", column2=category_input,
-                                        the_title="Total Value of Food Imported per Year",
-                                        x_label="Year", y_label="Total Food Value ($)")
+    # In every other case the value over time is plotted
+    return line_plot_food_value(data=cube['value_over_time'][category_input], column1="Year", column2="Food Value",
+                                the_title="Total Value of Food Imported per Year",
+                                x_label="Year", y_label="Total Food Value ($)")
 
 
 # ------------------------------------------------------------------------------------------------
 # GRAPH 2: TOTAL FOOD VOLUME OVER TIME
-@app.callback(
-    Output(component_id='food-volume-overtime', component_property='figure')
-    , [
-        Input(component_id='year-input', component_property='value'),
-        Input(component_id='category-input', component_property='value')
-    ]
-)
+FOOD_VOLUME_OVERTIME_OUTPUT = Output(component_id='food-volume-overtime', component_property='figure')
+
+
+@figure_cache.cached('food-volume-overtime')
 def food_volume_over_time(year_input, category_input):
-    # Includes all the years
-    if year_input == 'All':
-        # In case all categories are included
-        if category_input == 'All':
-            return line_plot_food_value(data=food_volume, column1="Year", column2="Total foods Volume",
-                                        the_title="Total Volume of Food Imported per Year",
-                                        x_label="Year", y_label="Total Volume Value (Metric Tons)")
-        # In case one category is selected
-        else:
-            return line_plot_food_value(data=food_volume, column1="Year", column2=category_input,
-                                        the_title="Total Volume of Food Imported per Year",
-                                        x_label="Year", y_label="Total Volume Value (Metric Tons)")
-
-    # In case a specific year is selected
-    else:
-        # In case all categories are included
-        if category_input == 'All':
-            return bar_plot_food_value(data=food_volume_categories, column1="Food Category", column2="Food Volume",
-                                       the_title="Total Volume of Food Imported per Year",
-                                       y_label="Food Category", x_label="Total Volume Value (Metric Tons)",
-                                       year_filter=year_input)
+    # In case a specific year is selected and all categories are included
+    if year_input != ALL and category_input == ALL:
+        return bar_plot_food_value(cube['volume_by_category'][year_input], column1="Food Category",
+                                   column2="Food Volume", the_title="Total Volume of Food Imported per Year",
+                                   y_label="Food Category", x_label="Total Volume Value (Metric Tons)")
 
-        # In case one category is selected
-        else:
-            return line_plot_food_value(data=food_volume, column1="Year", column2=category_input,
-                                        the_title="Total Volume of Food Imported per Year",
-                                        x_label="Year", y_label="Total Volume Value (Metric Tons)")
+    # In every other case the volume over time is plotted
+    return line_plot_food_value(data=cube['volume_over_time'][category_input], column1="Year", column2="Food Volume",
+                                the_title="Total Volume of Food Imported per Year",
+                                x_label="Year", y_label="Total Volume Value (Metric Tons)")
 
 
 # ------------------------------------------------------------------------------------------------
 
 # GRAPH 3: TOTAL FOOD VALUE BY COUNTRIES
-@app.callback(
-    Output(component_id='food-value-countries', component_property='figure'),
-    [
-        Input(component_id='year-input', component_property='value'),
-        Input(component_id='category-input', component_property='value')
-    ]
-)
-def food_value_countries_func(year_input, category_input):
-    if year_input == 'All':
-        if category_input == 'All':
-            return bar_plot_food_value_others(data=food_value_countries, column1="Country", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=None,
-                                              category_filter=None)
-        else:
-            return bar_plot_food_value_others(data=food_value_countries, column1="Country", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=None,
-                                              category_filter=category_input)
+FOOD_VALUE_COUNTRIES_OUTPUT = Output(component_id='food-value-countries', component_property='figure')
 
-    else:
-        if category_input == 'All':
-            return bar_plot_food_value_others(data=food_value_countries, column1="Country", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=year_input,
-                                              category_filter=None)
-        else:
-            return bar_plot_food_value_others(data=food_value_countries, column1="Country", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=year_input,
-                                              category_filter=category_input)
+
+@figure_cache.cached('food-value-countries')
+def food_value_countries_func(year_input, category_input):
+    return bar_plot_food_value_others(cube['countries'][(year_input, category_input)], column1="Country",
+                                      column2='Food Value', the_title=f"Total Value of Food Imported per Country",
+                                      x_label="Total Food Value ($)", y_label="Country")
 
 
 # ------------------------------------------------------------------------------------------------
 # GRAPH 4: TOTAL FOOD VOLUME BY CATEGORY TYPE
-@app.callback(
-    Output(component_id='food-value-types', component_property='figure'),
-    [
-        Input(component_id='year-input', component_property='value'),
-        Input(component_id='category-input', component_property='value')
-    ]
-)
+FOOD_VALUE_TYPES_OUTPUT = Output(component_id='food-value-types', component_property='figure')
+
+
+@figure_cache.cached('food-value-types')
 def food_value_types_func(year_input, category_input):
-    if year_input == 'All':
-        if category_input == 'All':
-            return bar_plot_food_value_others(data=food_value_countries, column1="Category Type", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=None,
-                                              category_filter=None)
-        else:
-            return bar_plot_food_value_others(data=food_value_countries, column1="Category Type", column2='Food Value',
-                                              the_title=f"Total Value of Food Imported per Country",
-                                              x_label="Total Food Value ($)", y_label="Country", year_filter=None,
-                                              category_filter=category_input)
+    return bar_plot_food_value_others(cube['types'][(year_input, category_input)], column1="Category Type",
+                                      column2='Food Value',
+                                      the_title=f"Total Value of Food Imported per Category Type",
+                                      x_label="Total Food Value ($)", y_label="Category Type")
+
+
+# ------------------------------------------------------------------------------------------------
+# GRAPH 5: FOOD VALUE BY CATEGORY, CATEGORY TYPE AND COUNTRY
+FOOD_VALUE_HIERARCHY_OUTPUT = Output(component_id='food-value-hierarchy', component_property='figure')
+
+
+@figure_cache.cached('food-value-hierarchy')
+def food_value_hierarchy_func(year_input, category_input):
+    nodes = cube['hierarchy'].treemap(None if year_input == ALL else year_input,
+                                      None if category_input == ALL else category_input)
+    return treemap_food_value(nodes, the_title="Food Value by Category, Category Type and Country")
 
 
+# ------------------------------------------------------------------------------------------------
+# PARTIAL FIGURE UPDATES
+# Most filter changes keep the chart type of a graph (line plot or bar chart): only the trace data
+# and the title are then sent as a dash Patch and the browser keeps the layout it already has.
+# The chart type shown by each graph is kept in a small dcc.Store of the page.
+
+# Graph id -> figure function
+FIGURE_CALLBACKS = {
+    FOOD_VALUE_OVERTIME_OUTPUT.component_id: food_value_over_time,
+    FOOD_VOLUME_OVERTIME_OUTPUT.component_id: food_volume_over_time,
+    FOOD_VALUE_COUNTRIES_OUTPUT.component_id: food_value_countries_func,
+    FOOD_VALUE_TYPES_OUTPUT.component_id: food_value_types_func,
+    FOOD_VALUE_HIERARCHY_OUTPUT.component_id: food_value_hierarchy_func,
+}
+
+
+# Id of the store holding the chart type shown by a graph
+def chart_store_id(graph_id):
+    return f'{graph_id}-chart'
+
+
+# Chart type of a figure (trace type, None without figure)
+def chart_type(figure):
+    return figure['data'][0].get('type') if figure else None
+
+
+# Patch replacing the trace data (values, labels, text, colors, tree nodes) and the title of a figure
+def figure_patch(figure):
+    patch = Patch()
+    trace = figure['data'][0]
+    for key in ('x', 'y', 'text', 'ids', 'labels', 'parents', 'values'):
+        if key in trace:
+            patch['data'][0][key] = trace[key]
+    if 'color' in trace.get('marker', {}):
+        patch['data'][0]['marker']['color'] = trace['marker']['color']
+    patch['layout']['title']['text'] = figure['layout'].get('title', {}).get('text')
+    # Fit the axes to the new data
+    if 'x' in trace:
+        patch['layout']['xaxis']['autorange'] = True
+        patch['layout']['yaxis']['autorange'] = True
+    return patch
+
+
+# Update of a graph currently showing current_chart: (full figure or Patch, chart type)
+def figure_update(figure, current_chart):
+    chart = chart_type(figure)
+    if chart is None or chart != current_chart:
+        return figure, chart
+    return figure_patch(figure), no_update
+
+
+# Figure callback with the chart type store as output and state (and the view store as state for
+# the over time graphs)
+def patched_figure_callback(graph_id, func):
+    @functools.wraps(func)
+    def callback(year_input, category_input, current_chart=None, view=None):
+        return figure_update(fit_to_view(graph_id, func(year_input, category_input), category_input, view),
+                             current_chart)
+
+    return callback
+
+
+# ------------------------------------------------------------------------------------------------
+# ZOOM ON THE OVER TIME GRAPHS
+# A downsampled series only has the points of the whole graph width: a zoom (relayoutData) sends
+# the points of the visible window, downsampled again, so the payload stays bounded whatever
+# the length of the history. A small clientside callback (assets/graph_view.js) copies each
+# relayout event with the width of the plot area in pixels to a view store: the zooms, resizes
+# and filter changes downsample to that width (DOWNSAMPLE_WIDTH until the graph is drawn).
+
+# Graph id -> series of the cube, x and y columns of its line plot
+OVERTIME_SERIES = {
+    FOOD_VALUE_OVERTIME_OUTPUT.component_id: ('value_over_time', 'Year', 'Food Value'),
+    FOOD_VOLUME_OVERTIME_OUTPUT.component_id: ('volume_over_time', 'Year', 'Food Volume'),
+}
+
+
+# Namespace and function of the clientside callback filling the view stores
+VIEW_NAMESPACE = 'graph_view'
+VIEW_FUNCTION = 'report_view'
+
+
+# Id of the store holding the last relayout event and plot area width of an over time graph
+def view_store_id(graph_id):
+    return f'{graph_id}-view'
+
+
+# Number of points drawn on a graph with the view of its view store
+def view_points(view):
+    return downsample.max_points((view or {}).get('width') or downsample.WIDTH)
+
+
+# Over time figure with its downsampled line rebuilt for the width of the graph in the browser
+# (the cached figures are downsampled to DOWNSAMPLE_WIDTH). Other figures are returned as they are.
+def fit_to_view(graph_id, figure, category_input, view):
+    if graph_id not in OVERTIME_SERIES or not (view or {}).get('width') or chart_type(figure) != 'scattergl':
+        return figure
+    key, column1, column2 = OVERTIME_SERIES[graph_id]
+    data = cube[key][category_input]
+    trace = figure['data'][0]
+    trace['x'], trace['y'] = downsample.downsample(column_array(data[column1]), column_array(data[column2]),
+                                                   view_points(view))
+    return figure
+
+
+# Range of an axis set by a relayoutData event: (start, end), (None, None) when the axis is
+# reset to the whole series, None when the event doesn't change the axis
+def zoom_range(relayout_data, axis):
+    relayout_data = relayout_data or {}
+    if f'{axis}.range[0]' in relayout_data and f'{axis}.range[1]' in relayout_data:
+        return relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']
+    if f'{axis}.range' in relayout_data:
+        return tuple(relayout_data[f'{axis}.range'])
+    if relayout_data.get(f'{axis}.autorange'):
+        return None, None
+    return None
+
+
+# Patch of the line of an over time graph for the visible window (view: data of its view store)
+def zoom_over_time(graph_id, year_input, category_input, view):
+    relayout_data = (view or {}).get('relayout')
+    x_range = zoom_range(relayout_data, 'xaxis')
+    # Event without x range, or bar chart shown
+    if x_range is None or (year_input != ALL and category_input == ALL):
+        return no_update
+    key, column1, column2 = OVERTIME_SERIES[graph_id]
+    data = cube[key][category_input]
+    # Every point is already drawn
+    if len(data) <= downsample.max_points():
+        return no_update
+
+    x, y = column_array(data[column1]), column_array(data[column2])
+    patch = Patch()
+    points = view_points(view)
+    if x_range == (None, None):
+        x, y = downsample.downsample(x, y, points)
+        patch['layout']['xaxis']['autorange'] = True
+    else:
+        x, y = downsample.window(x, y, downsample.axis_value(x, x_range[0]), downsample.axis_value(x, x_range[1]),
+                                 points)
+        patch['layout']['xaxis']['range'] = list(x_range)
+    patch['data'][0]['x'] = x
+    patch['data'][0]['y'] = y
+    # The figure sent replaces the axes of the browser: the y range of the zoom is kept
+    y_range = zoom_range(relayout_data, 'yaxis')
+    if y_range is not None and y_range != (None, None):
+        patch['layout']['yaxis']['range'] = list(y_range)
+    else:
+        patch['layout']['yaxis']['autorange'] = True
+    return patch
+
+
+# Zoom callback of a graph (view store input, filters as state), instrumented for /metrics
+def zoom_callback(graph_id):
+    func = metrics.instrument(f'zoom_{graph_id.replace("-", "_")}')(functools.partial(zoom_over_time, graph_id))
+
+    def callback(view, year_input, category_input):
+        return func(year_input, category_input, view)
+
+    return callback
+
+
+# ------------------------------------------------------------------------------------------------
+# DRILL-THROUGH FROM THE CATEGORY TYPES TO THE COUNTRIES
+# A click on a bar of the category type chart shows the countries of that type in the country
+# chart, a second click on the same bar shows every country again. The countries are the children
+# of the type in the precomputed hierarchy (index lookup, no grouping of the rows).
+
+# Store of the drilled category type: [year, category, category type], None without drill-through
+DRILL_STORE_ID = 'food-value-countries-drill'
+
+
+# Country chart of the countries of a category type
+def countries_of_type(year_input, category_input, category_type):
+    tree = cube['hierarchy']
+    node_id = tree.node_id(None if category_input == ALL else category_input, category_type)
+    data_new = hierarchy_breakdown(tree, node_id, 'Country', 'Food Value', None if year_input == ALL else year_input,
+                                   top_n.get('countries'))
+    return bar_plot_food_value_others(data_new, column1="Country", column2='Food Value',
+                                      the_title=f"Total Value of {category_type} Imported per Country",
+                                      x_label="Total Food Value ($)", y_label="Country")
+
+
+# Patch of the country chart and drilled category type after a click on the category type chart
+def drill_countries(year_input, category_input, click_data, drilled):
+    points = (click_data or {}).get('points') or [{}]
+    category_type = points[0].get('y')
+    if category_type is None or category_type == OTHERS:
+        return no_update, no_update
+
+    selection = [year_input, category_input, category_type]
+    if drilled == selection:
+        return figure_patch(food_value_countries_func(year_input, category_input)), None
+    return figure_patch(countries_of_type(year_input, category_input, category_type)), selection
+
+
+# Drill-through callback (clickData input, filters and drilled type as state), instrumented for /metrics
+def drill_callback():
+    func = metrics.instrument('drill_food_value_types')(drill_countries)
+
+    def callback(click_data, year_input, category_input, drilled):
+        return func(year_input, category_input, click_data, drilled)
+
+    return callback
+
+
+# ------------------------------------------------------------------------------------------------
+# EXPORT JOBS
+# The export button starts a background callback (in its own process, see exports.py). The
+# browser polls it every EXPORT_POLL_INTERVAL milliseconds for the progress and the result.
+EXPORT_POLL_INTERVAL = 500
+
+
+# Export of the downloads panel: link to the export file
+def export_job(set_progress, n_clicks, kind, file_format, years, year_input, category_input):
+    if kind.startswith('comparison') and not years:
+        return 'Select the years to compare'
+    name = exports.run_export(set_progress, load_data()['engine'], kind, file_format, years, year_input,
+                              category_input)
+    return html.A(f'Download {name}', href=app.get_relative_path(f'{exports.ROUTE}/{name}'), download=name)
+
+
+# Register the export callback with its background manager
+def register_export_callback(manager):
+    app.callback(Output('export-result', 'children'), Input('export-button', 'n_clicks'),
+                 [State('export-kind', 'value'), State('export-format', 'value'), State('export-years', 'value')] +
+                 [State(i.component_id, i.component_property) for i in FILTER_INPUTS],
+                 background=True, manager=manager, interval=EXPORT_POLL_INTERVAL, prevent_initial_call=True,
+                 running=[(Output('export-button', 'disabled'), True, False),
+                          (Output('export-cancel', 'disabled'), False, True)],
+                 cancel=[Input('export-cancel', 'n_clicks')],
+                 progress=[Output('export-progress', 'value'), Output('export-progress', 'label')],
+                 progress_default=[0, ''])(export_job)
+
+
+# ------------------------------------------------------------------------------------------------
+# WHOLE DASHBOARD (combined mode)
+# One callback updating the overview values and every graph: a filter change costs a
+# single HTTP round trip and a single lookup of the precomputed aggregates.
+# The figure outputs and chart type stores follow FIGURE_CALLBACKS, in the order update_dashboard returns them
+DASHBOARD_OUTPUTS = OVERVIEW_OUTPUTS + [Output(i, 'figure') for i in FIGURE_CALLBACKS] + \
+                    [Output(chart_store_id(i), 'data') for i in FIGURE_CALLBACKS]
+DASHBOARD_STATE = [State(chart_store_id(i), 'data') for i in FIGURE_CALLBACKS] + \
+                  [State(view_store_id(i), 'data') for i in OVERTIME_SERIES]
+
+
+# current_charts: chart type shown by each graph (same order as FIGURE_CALLBACKS)
+def update_dashboard(year_input, category_input, *states):
+    current_charts = states[:len(FIGURE_CALLBACKS)] or [None] * len(FIGURE_CALLBACKS)
+    views = dict(zip(OVERTIME_SERIES, states[len(FIGURE_CALLBACKS):]))
+    updates = [figure_update(fit_to_view(graph_id, func(year_input, category_input), category_input,
+                                         views.get(graph_id)), current_chart)
+               for (graph_id, func), current_chart in zip(FIGURE_CALLBACKS.items(), current_charts)]
+    return (
+        *update_food_value(year_input, category_input),
+        *[figure for figure, _ in updates],
+        *[chart for _, chart in updates]
+    )
+
+
+# ------------------------------------------------------------------------------------------------
+# DATA LOADING
+# The data is loaded once, on first use: the layout and every request of the server need it.
+data_lock = threading.Lock()
+
+# Watcher of the data directory, set by load_data
+data_watcher = None
+
+
+# Load the data and precompute the aggregates (only the first call does the work). The data is
+# read from the shared memory published by the gunicorn master (DATA_STORE=shared, see
+# gunicorn.conf.py), otherwise from the columnar snapshot when it is current or the CSV files.
+def load_data():
+    global facts, engine, load_report, data_segment, cube, data_version, data_watcher
+    if cube is not None:
+        return cube
+    with data_lock:
+        if cube is not None:
+            return cube
+        with startup.phase('data'):
+            if os.environ.get(SEGMENT_ENV):
+                facts, engine, load_report, data_segment = attach_data(os.environ[SEGMENT_ENV])
+            else:
+                facts, load_report = load_facts('data')
+        logger.info('Data loaded from %s in %.1f ms', load_report['source'], load_report['seconds'] * 1000)
+
+        # Precompute the aggregates for every (year, category) combination of the filters
+        with startup.phase('cube'):
+            new_cube = build_cube(facts, top_n=top_n, engine=engine)
+        figure_cache.version = figure_version(load_report['content_hash'])
+        data_version = load_report['content_hash']
+
+        # DATA_WATCH_INTERVAL: seconds between two checks of the data directory (unset or 0: no reload).
+        # The watcher is started by the first request of each process (see start_data_watcher).
+        data_watcher = DataWatcher('data', load_report['sources'],
+                                   interval=float(os.environ.get('DATA_WATCH_INTERVAL') or 0))
+
+        # Set last: the threads reading cube without the lock see the whole data
+        cube = new_cube
+    return cube
+
+
+# Start the watcher thread of the data directory in the current process (once per process). Called
+# by the requests, not by load_data: with gunicorn --preload the data is loaded in the master, and
+# a thread started there would not exist in the forked workers.
+def start_data_watcher():
+    if data_watcher is not None and data_watcher.interval > 0:
+        data_watcher.start(apply_data_changes)
+
+
+# ------------------------------------------------------------------------------------------------
+# DATA RELOAD
+# New USDA rows appended to the CSV files are picked up without restarting the app: only the
+# aggregates of the changed years are computed again and the new cube replaces the current one
+# in a single assignment, so a callback always reads one consistent version of the data.
+
+# Graphs showing every year (line plots) and graphs filtered by year, with the tables they are built from
+OVERTIME_GRAPHS = {'food-value-overtime': {'food_value_categories'},
+                   'food-volume-overtime': {'food_volume_categories'}}
+BREAKDOWN_GRAPHS = {'food-value-countries': {'food_value_countries'},
+                    'food-value-types': {'food_value_countries'},
+                    'food-value-hierarchy': {'food_value_countries'}}
+
+
+# Remove the cached figures built from the changed tables and years (every figure when changed_years is None)
+def invalidate_figures(changed_tables, changed_years, data_hash):
+    if changed_years is None or figure_cache.backend.name != 'memory':
+        # Figures of a shared backend are also read by the other workers: move to a new version
+        figure_cache.version = figure_version(data_hash)
+        if figure_cache.backend.name == 'memory':
+            figure_cache.clear()
+        return
+
+    changed = {str(i) for i in changed_years}
+    for year in cube['years']:
+        for category in cube['categories']:
+            # The line plots include every year, the bar charts of a year only that year
+            for graph_id, graph_tables in OVERTIME_GRAPHS.items():
+                if graph_tables & changed_tables and (year == ALL or category != ALL or year in changed):
+                    figure_cache.invalidate(graph_id, year, category)
+            for graph_id, graph_tables in BREAKDOWN_GRAPHS.items():
+                if graph_tables & changed_tables and (year == ALL or year in changed):
+                    figure_cache.invalidate(graph_id, year, category)
+
+
+# Apply the changes found by the data watcher: table name -> ('append', new rows) or ('reload', table)
+def apply_data_changes(changes):
+    global facts, cube, current_layout, data_version
+    with data_lock:
+        changed_years = set()
+        for kind, rows in changes.values():
+            if kind == 'append':
+                changed_years.update(int(i) for i in rows['Year'].unique())
+        # A rewritten file may change any year
+        if any(kind == 'reload' for kind, _ in changes.values()):
+            changed_years = None
+
+        new_facts = update_facts(facts, changes)
+        new_cube = update_cube(cube, new_facts, changed_years=changed_years, top_n=top_n)
+        new_version = content_hash(data_watcher.sources)
+
+        # Swap the data used by the callbacks, last: when anything above fails the current data is
+        # kept and the watcher finds the same changes again at its next poll
+        facts, cube, current_layout, data_version = new_facts, new_cube, None, new_version
+
+        # The changes are applied now: a failure must not reach the watcher, which would apply
+        # them a second time. The figures of every combination are then built again.
+        try:
+            invalidate_figures(set(changes), changed_years, data_version)
+        except Exception:
+            logger.exception('Invalidating the cached figures failed, every figure is built again')
+            figure_cache.version = figure_version(data_version)
+
+    logger.info('Data reloaded (%s)',
+                ', '.join(f'{name}: {kind} {len(rows)} rows' for name, (kind, rows) in changes.items()))
+
+
+# ------------------------------------------------------------------------------------------------
+# CALLBACK REGISTRATION
+# CALLBACK_MODE: 'separate' (default, one callback per overview row / graph), 'combined' or
+# 'clientside' (the aggregates are sent once with the page and the browser updates the dashboard)
+CALLBACK_MODE = os.environ.get('CALLBACK_MODE', 'separate')
+
+
+# Register a server callback, instrumented for the /metrics route
+def register_callback(outputs, func, state=()):
+    app.callback(outputs, FILTER_INPUTS + list(state))(metrics.instrument(func.__name__)(func))
+
+
+# Components added at the end of the layout: the chart type stores of the server callbacks or, in
+# clientside mode, the store of the aggregates (rebuilt with the layout after the data changed,
+# empty without with_data)
+def layout_extra_children(with_data=True):
+    if CALLBACK_MODE != 'clientside':
+        return [dcc.Store(id=chart_store_id(i)) for i in FIGURE_CALLBACKS] + \
+               [dcc.Store(id=view_store_id(i)) for i in OVERTIME_SERIES] + [dcc.Store(id=DRILL_STORE_ID)]
+    if not with_data:
+        return [dcc.Store(id=clientside.STORE_ID), dcc.Store(id=DRILL_STORE_ID)]
+    # Figure templates filled in by the browser (a line plot and a bar chart per graph)
+    specific_year = cube['years'][1]
+    figure_templates = {
+        'food-value-overtime': {'line': food_value_over_time(ALL, ALL), 'bar': food_value_over_time(specific_year, ALL)},
+        'food-volume-overtime': {'line': food_volume_over_time(ALL, ALL),
+                                 'bar': food_volume_over_time(specific_year, ALL)},
+        'food-value-countries': {'bar': food_value_countries_func(ALL, ALL)},
+        'food-value-types': {'bar': food_value_types_func(ALL, ALL)},
+        'food-value-hierarchy': {'treemap': food_value_hierarchy_func(ALL, ALL)},
+    }
+    return [dcc.Store(id=clientside.STORE_ID, data=clientside.clientside_data(cube, figure_templates)),
+            dcc.Store(id=DRILL_STORE_ID)]
+
+
+# ------------------------------------------------------------------------------------------------
+# APP FACTORY
+
+# Create the Dash app: routes, callbacks and layout function. The data is loaded on first use,
+# except for the cache warm-up which needs it before the app serves traffic.
+def create_app():
+    global app, access_stats, logo_url
+    if app is not None:
+        return app
+
+    with startup.phase('create_app'):
+        app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+
+        # FIGURE_CACHE_BACKEND: 'memory' (default), 'disk', 'disk:<path>' or 'redis://<host>:<port>/<db>'
+        figure_cache.backend = create_backend(os.environ.get('FIGURE_CACHE_BACKEND', 'memory'),
+                                              max_size=int(os.environ.get('FIGURE_CACHE_SIZE', DEFAULT_MAX_SIZE)))
+        # ACCESS_STATS: path of the SQLite file of the counts (unset: not recorded)
+        if os.environ.get('ACCESS_STATS'):
+            access_stats = AccessStats(os.environ['ACCESS_STATS'])
+        logo_url = http_cache.asset_url(app, 'mmk_logo_desgin.png')
+
+        metrics.register_metrics(app.server)
+        # Read-only data API for bulk consumers (see api.py)
+        api.register_api(app.server, lambda: cube, lambda: data_version)
+        # Cache headers, ETags and compression of the Dash responses (see http_cache.py). The callback
+        # outputs change with the data and with the settings of the figures.
+        http_cache.register_http_cache(app, lambda: f'{data_version}-{figure_cache.version}')
+        # Single-flight, superseded requests and concurrency limits of the callbacks (see coalescing.py),
+        # registered after the caching: the responses are shared before their compression
+        coalescing.register_coalescing(app)
+        startup.register_first_request(app.server)
+
+        # Every request reads the data, and keeps it up to date in the worker serving it
+        @app.server.before_request
+        def load_data_before_request():
+            load_data()
+            start_data_watcher()
+
+        register_callbacks()
+        # Downloads panel (see exports.py)
+        if exports.enabled():
+            exports.register_routes(app.server)
+            register_export_callback(exports.background_manager())
+
+        # The layout is checked against the skeleton layout (a layout function is otherwise called
+        # when assigned) and sent as the JSON built with it
+        app.validation_layout = validation_layout()
+        app.layout = serve_layout
+        app.server.view_functions[f'{app.config.routes_pathname_prefix}_dash-layout'] = serve_layout_json
+
+    # Build the figures before the worker serves traffic (see warmup.py)
+    # FIGURE_WARMUP: 'all', 'top:<N>' or unset, FIGURE_WARMUP_WORKERS: number of processes
+    if os.environ.get('FIGURE_WARMUP') and CALLBACK_MODE != 'clientside':
+        load_data()
+        with startup.phase('warmup'):
+            warmup_report = warm_up(figure_cache, FIGURE_CALLBACKS,
+                                    warmup_combinations(os.environ['FIGURE_WARMUP'], cube['years'],
+                                                        cube['categories'], access_stats),
+                                    workers=int(os.environ.get('FIGURE_WARMUP_WORKERS') or 0) or None)
+        logger.info('Cache warm-up: %d of %d figures built in %.1f ms', warmup_report['built'],
+                    warmup_report['figures'], warmup_report['seconds'] * 1000)
+    return app
+
+
+# Register the callbacks of the CALLBACK_MODE on the app
+def register_callbacks():
+    if CALLBACK_MODE == 'combined':
+        register_callback(DASHBOARD_OUTPUTS, update_dashboard, DASHBOARD_STATE)
+    elif CALLBACK_MODE == 'clientside':
+
+        # The store never changes, it is read as a state
+        clientside_inputs = FILTER_INPUTS + [State(component_id=clientside.STORE_ID, component_property='data')]
+        for function_name, outputs in [('update_overview', OVERVIEW_OUTPUTS),
+                                       ('food_value_over_time', FOOD_VALUE_OVERTIME_OUTPUT),
+                                       ('food_volume_over_time', FOOD_VOLUME_OVERTIME_OUTPUT),
+                                       ('food_value_countries', FOOD_VALUE_COUNTRIES_OUTPUT),
+                                       ('food_value_types', FOOD_VALUE_TYPES_OUTPUT),
+                                       ('food_value_hierarchy', FOOD_VALUE_HIERARCHY_OUTPUT)]:
+            app.clientside_callback(ClientsideFunction(namespace=clientside.NAMESPACE, function_name=function_name),
+                                    outputs, clientside_inputs)
+    else:
+        register_callback(OVERVIEW_OUTPUTS, update_food_value)
+        for graph_id, func in FIGURE_CALLBACKS.items():
+            state = [State(chart_store_id(graph_id), 'data')]
+            if graph_id in OVERTIME_SERIES:
+                state.append(State(view_store_id(graph_id), 'data'))
+            register_callback([Output(graph_id, 'figure'), Output(chart_store_id(graph_id), 'data')],
+                              patched_figure_callback(graph_id, func), state)
+
+    # Zoom on the over time graphs, at the width of the graphs in the browser (the clientside
+    # figures already have every point)
+    if CALLBACK_MODE != 'clientside':
+        for graph_id in OVERTIME_SERIES:
+            app.clientside_callback(ClientsideFunction(namespace=VIEW_NAMESPACE, function_name=VIEW_FUNCTION),
+                                    Output(view_store_id(graph_id), 'data'), Input(graph_id, 'relayoutData'),
+                                    State(graph_id, 'id'), prevent_initial_call=True)
+            app.callback(Output(graph_id, 'figure', allow_duplicate=True), Input(view_store_id(graph_id), 'data'),
+                         [State(i.component_id, i.component_property) for i in FILTER_INPUTS],
+                         prevent_initial_call=True)(zoom_callback(graph_id))
+
+    # Drill-through from a category type to its countries (every mode: read from the hierarchy)
+    app.callback([Output(FOOD_VALUE_COUNTRIES_OUTPUT.component_id, 'figure', allow_duplicate=True),
+                  Output(DRILL_STORE_ID, 'data')],
+                 Input(FOOD_VALUE_TYPES_OUTPUT.component_id, 'clickData'),
+                 [State(i.component_id, i.component_property) for i in FILTER_INPUTS] + [State(DRILL_STORE_ID, 'data')],
+                 prevent_initial_call=True)(drill_callback())
+
+
+# WSGI application served by gunicorn (gunicorn app:server): the app is created on first access
+def __getattr__(name):
+    if name == 'server':
+        return create_app().server
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+startup.record('import', startup.elapsed())
+
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    logging.basicConfig(level=logging.INFO)
+    create_app().run_server(debug=True)
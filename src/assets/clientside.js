@@ -0,0 +1,140 @@
+// PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+// AUTHOR: MIKE MUSAS
+// CLIENTSIDE CALLBACKS: used when the app runs with CALLBACK_MODE=clientside
+// The aggregates and figure templates come from the 'dashboard-data' store (see clientside.py)
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: (function () {
+        const ALL = 'All';
+        const OTHERS = 'Others';
+        const HIGHLIGHT_COLOR = '#D9560B';
+        const MUTED_COLOR = '#B4BEC9';
+
+        // Same rounding as round(value, 1) in Python: toFixed rounds the exact binary value,
+        // exact ties (e.g. 0.25) are rounded half to even
+        function roundOne(value) {
+            if (Number.isInteger(value * 4) && !Number.isInteger(value * 2)) {
+                const lower = Math.floor(value * 10);
+                return (lower % 2 === 0 ? lower : lower + 1) / 10;
+            }
+            return Number(value.toFixed(1));
+        }
+
+        // Same format as '{:,}M'.format(round(value, 1)) in app.py
+        function formatMillions(value) {
+            const rounded = roundOne(value);
+            return rounded.toLocaleString('en-US', {minimumFractionDigits: 1, maximumFractionDigits: 1}) + 'M';
+        }
+
+        // Bar colors by rank, same rule as rank_colors in app.py
+        function rankColors(labels) {
+            const ranked = labels.filter(function (label) { return label !== OTHERS; }).length;
+            const highlight = Math.min(Math.max(ranked - 3, 0), ranked);
+            let position = 0;
+            return labels.map(function (label) {
+                if (label === OTHERS) {
+                    return MUTED_COLOR;
+                }
+                position += 1;
+                return position > ranked - highlight ? HIGHLIGHT_COLOR : MUTED_COLOR;
+            });
+        }
+
+        // Copy of a figure template (Plotly only redraws when it receives a new object)
+        function copyTemplate(data, graphId, chart) {
+            return JSON.parse(JSON.stringify(data.templates[graphId][chart]));
+        }
+
+        // Line plot of a yearly series
+        function linePlot(data, graphId, series) {
+            const figure = copyTemplate(data, graphId, 'line');
+            figure.data[0].x = series.x;
+            figure.data[0].y = series.y;
+            return figure;
+        }
+
+        // Horizontal bar chart of grouped values (already sorted)
+        function barPlot(data, graphId, bars) {
+            const figure = copyTemplate(data, graphId, 'bar');
+            figure.data[0].x = bars.values;
+            figure.data[0].y = bars.labels;
+            figure.data[0].marker.color = rankColors(bars.labels);
+            figure.data[0].text = bars.values.map(function (value) {
+                return formatMillions(value / 1000000);
+            });
+            return figure;
+        }
+
+        // Line plot over time, or bar chart per category when only a year is selected
+        function overTime(data, graphId, prefix, yearInput, categoryInput) {
+            if (yearInput !== ALL && categoryInput === ALL) {
+                return barPlot(data, graphId, data[prefix + '_by_category'][yearInput]);
+            }
+            return linePlot(data, graphId, data[prefix + '_over_time'][categoryInput]);
+        }
+
+        // Treemap of the hierarchy for one combination, same nodes as SumTree.treemap in hierarchy.py:
+        // the subtree of the category, or the categories below the 'All' node
+        function treemap(data, yearInput, categoryInput) {
+            const tree = data.hierarchy;
+            const values = tree.values[yearInput] || [];
+            const root = tree.ids.indexOf(categoryInput);
+            const figure = copyTemplate(data, 'food-value-hierarchy', 'treemap');
+            const trace = figure.data[0];
+            trace.ids = [];
+            trace.labels = [];
+            trace.parents = [];
+            trace.values = [];
+            trace.text = [];
+            tree.ids.forEach(function (id, position) {
+                const branch = tree.branches[position];
+                const selected = categoryInput === ALL ? branch !== root || position === root : branch === root;
+                if (root < 0 || !selected || values[position] === null || values[position] === undefined) {
+                    return;
+                }
+                const belowAll = categoryInput === ALL && tree.depths[position] === 0 && position !== root;
+                trace.ids.push(id);
+                trace.labels.push(tree.labels[position]);
+                trace.parents.push(belowAll ? tree.ids[root] : tree.parents[position]);
+                trace.values.push(values[position]);
+                trace.text.push(formatMillions(values[position] / 1000000));
+            });
+            return figure;
+        }
+
+        return {
+            // OVERVIEW VALUES
+            update_overview: function (yearInput, categoryInput, data) {
+                const overview = data.overview[yearInput + '|' + categoryInput];
+                return overview.map(function (value) {
+                    return formatMillions(value / 1000000);
+                });
+            },
+
+            // GRAPH 1: TOTAL FOOD VALUE OVER TIME
+            food_value_over_time: function (yearInput, categoryInput, data) {
+                return overTime(data, 'food-value-overtime', 'value', yearInput, categoryInput);
+            },
+
+            // GRAPH 2: TOTAL FOOD VOLUME OVER TIME
+            food_volume_over_time: function (yearInput, categoryInput, data) {
+                return overTime(data, 'food-volume-overtime', 'volume', yearInput, categoryInput);
+            },
+
+            // GRAPH 3: TOTAL FOOD VALUE BY COUNTRIES
+            food_value_countries: function (yearInput, categoryInput, data) {
+                return barPlot(data, 'food-value-countries', data.countries[yearInput + '|' + categoryInput]);
+            },
+
+            // GRAPH 4: TOTAL FOOD VALUE BY CATEGORY TYPE
+            food_value_types: function (yearInput, categoryInput, data) {
+                return barPlot(data, 'food-value-types', data.types[yearInput + '|' + categoryInput]);
+            },
+
+            // GRAPH 5: FOOD VALUE BY CATEGORY, CATEGORY TYPE AND COUNTRY
+            food_value_hierarchy: function (yearInput, categoryInput, data) {
+                return treemap(data, yearInput, categoryInput);
+            }
+        };
+    })()
+});
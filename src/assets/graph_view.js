@@ -0,0 +1,29 @@
+// PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+// AUTHOR: MIKE MUSAS
+// GRAPH VIEW: relayout event of an over time graph with the width of its plot area in pixels
+// The server downsamples the series to that width (see the zoom section of app.py).
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    graph_view: {
+        report_view: function (relayoutData, graphId) {
+            const graph = document.getElementById(graphId);
+            const plot = graph && (graph.classList.contains('js-plotly-plot') ? graph :
+                graph.querySelector('.js-plotly-plot'));
+            const size = plot && plot._fullLayout && plot._fullLayout._size;
+            const relayout = Object.assign({}, relayoutData);
+
+            // A resize (or the first drawing) keeps the axes: their current ranges are sent with it
+            if (relayout.autosize && plot && plot.layout) {
+                ['xaxis', 'yaxis'].forEach(function (axis) {
+                    const layout = plot.layout[axis] || {};
+                    if (layout.autorange === false && layout.range) {
+                        relayout[axis + '.range'] = layout.range;
+                    } else {
+                        relayout[axis + '.autorange'] = true;
+                    }
+                });
+            }
+            return {width: size ? Math.round(size.w) : null, relayout: relayout};
+        }
+    }
+});
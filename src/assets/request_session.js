@@ -0,0 +1,23 @@
+// PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+// AUTHOR: MIKE MUSAS
+// REQUEST SESSION: id of the browser tab sent with the callback requests (see coalescing.py)
+// The server drops the requests of a tab superseded by a newer request for the same callback.
+
+(function () {
+    const SESSION_HEADER = 'X-Dash-Session';
+    const CALLBACK_PATH = '_dash-update-component';
+
+    // New id for every page load: two tabs of the same browser are two sessions
+    const sessionId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    const browserFetch = window.fetch;
+
+    window.fetch = function (resource, options) {
+        const url = typeof resource === 'string' ? resource : resource.url;
+        if (url && url.indexOf(CALLBACK_PATH) !== -1) {
+            const headers = new Headers((options && options.headers) || {});
+            headers.set(SESSION_HEADER, sessionId);
+            options = Object.assign({}, options, {headers: headers});
+        }
+        return browserFetch.call(this, resource, options);
+    };
+})();
@@ -0,0 +1,198 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# CACHE BACKENDS: storage used by the figure cache (in-process, local disk, Redis)
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Default number of entries kept by a backend
+DEFAULT_MAX_SIZE = 1024
+
+# Default location of the shared disk cache
+DEFAULT_DISK_PATH = 'cache/figures.sqlite'
+
+# Seconds before a hit of the disk cache records its access time again: the hits of an entry in
+# between are reads only, so the workers don't take the write lock on every hit
+DEFAULT_ACCESS_REFRESH = 60
+
+
+# ------------------------------------------------------------------------------------------------
+# IN-PROCESS BACKEND
+
+# LRU dictionary private to the current process
+class MemoryBackend:
+    name = 'memory'
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                # Mark the entry as the most recently used
+                self._values.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._values),
+                'max_size': self.max_size,
+                'evictions': self.evictions,
+                'bytes': sum(len(i) for i in self._values.values()),
+            }
+
+
+# ------------------------------------------------------------------------------------------------
+# LOCAL DISK BACKEND
+
+# SQLite file shared by every worker process of the host.
+# WAL mode lets the workers read concurrently while one of them writes a new entry.
+# The eviction is LRU up to access_refresh seconds (see DEFAULT_ACCESS_REFRESH).
+class DiskBackend:
+    name = 'disk'
+
+    def __init__(self, path=DEFAULT_DISK_PATH, max_size=DEFAULT_MAX_SIZE, access_refresh=DEFAULT_ACCESS_REFRESH):
+        self.path = path
+        self.max_size = max_size
+        self.access_refresh = access_refresh
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    # One connection per thread and per process: sqlite3 connections can't be shared between threads,
+    # nor used on both sides of a fork. A worker forked by gunicorn --preload opens its own connection
+    # and keeps the one of the master referenced, unused (closing it could touch the master's files).
+    def _connection(self):
+        connections = self._local.__dict__.setdefault('connections', {})
+        connection = connections.get(os.getpid())
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connections[os.getpid()] = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute('SELECT value, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] >= self.access_refresh:
+            # Mark the entry as the most recently used
+            with self._connection() as connection:
+                connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def set(self, key, value):
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO cache (key, value, accessed) VALUES (?, ?, ?)',
+                               (key, value, time.time()))
+            # Evict the least recently used entries above the size bound
+            connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC '
+                               'LIMIT -1 OFFSET ?)', (self.max_size,))
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def stats(self):
+        size, size_bytes = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache').fetchone()
+        return {'size': size, 'max_size': self.max_size, 'bytes': size_bytes, 'path': self.path}
+
+
+# ------------------------------------------------------------------------------------------------
+# REDIS BACKEND
+
+# Redis (or any Redis protocol compatible server) shared by every worker and host.
+# The size bound is left to the server (maxmemory with the allkeys-lru policy).
+class RedisBackend:
+    name = 'redis'
+
+    def __init__(self, url, prefix='us-food-imports', ttl=None):
+        try:
+            import redis
+        except ImportError as error:
+            raise ImportError('The redis cache backend requires the redis package (pip install redis)') from error
+
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def get(self, key):
+        value = self._client.get(self._key(key))
+        return None if value is None else value.decode('utf-8')
+
+    def set(self, key, value):
+        self._client.set(self._key(key), value, ex=self.ttl)
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self._key('*')))
+        if keys:
+            self._client.delete(*keys)
+
+    def stats(self):
+        keys = list(self._client.scan_iter(match=self._key('*')))
+        return {'size': len(keys), 'url': self.url}
+
+
+# ------------------------------------------------------------------------------------------------
+# BACKEND SELECTION
+
+# Create the backend described by a setting such as
+#   'memory', 'disk', 'disk:/var/cache/figures.sqlite' or 'redis://localhost:6379/0'
+def create_backend(setting='memory', max_size=DEFAULT_MAX_SIZE):
+    if setting is None or setting == 'memory':
+        return MemoryBackend(max_size=max_size)
+    if setting == 'disk':
+        return DiskBackend(max_size=max_size)
+    if setting.startswith('disk:'):
+        return DiskBackend(path=setting[len('disk:'):], max_size=max_size)
+    if setting.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(setting)
+    raise ValueError(f'Unknown cache backend: {setting}')
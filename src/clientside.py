@@ -0,0 +1,91 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# CLIENTSIDE MODE: compact aggregates shipped to the browser once (see assets/clientside.js)
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import json
+
+import plotly.io as pio
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Id of the dcc.Store holding the aggregates in the page
+STORE_ID = 'dashboard-data'
+
+# Namespace of the JavaScript functions in assets/clientside.js
+NAMESPACE = 'dashboard'
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Key of a (year, category) combination in the browser data
+def combination_key(year, category):
+    return f'{year}|{category}'
+
+
+# Labels and values of a grouped table (already scaled and sorted by the data layer)
+def bars(data, column1, column2):
+    return {'labels': data[column1].astype(str).tolist(), 'values': data[column2].astype(float).tolist()}
+
+
+# Years and values of a yearly series (already scaled by the fact tables)
+def series(data, column):
+    return {'x': data['Year'].astype(int).tolist(), 'y': data[column].astype(float).tolist()}
+
+
+# Nodes of the Food Category -> Category Type -> Country hierarchy (see hierarchy.py) and their sums
+# per year (None for the nodes without data in the year)
+def hierarchy(tree):
+    return {
+        'ids': tree.ids.tolist(),
+        'labels': tree.labels.tolist(),
+        'parents': tree.parent_ids.tolist(),
+        'branches': tree.branches.tolist(),
+        'depths': tree.depths.tolist(),
+        'values': {year: [float(value) if count else None for value, count in zip(tree.sums[row], tree.counts[row])]
+                   for year, row in tree.year_index.items()},
+    }
+
+
+# Plain JSON version of a figure (used as a template the browser fills with new data)
+def figure_template(figure):
+    return json.loads(pio.to_json(figure, validate=False))
+
+
+# ------------------------------------------------------------------------------------------------
+# BROWSER DATA SECTION
+
+# Build the content of the dcc.Store: every aggregate of the cube plus the figure templates
+# (graph id -> chart type ('line' / 'bar') -> figure) the browser fills with new data
+def clientside_data(cube, templates):
+    years = cube['years']
+    categories = cube['categories']
+
+    data = {
+        'years': years,
+        'categories': categories,
+        'overview': {},
+        'countries': {},
+        'types': {},
+        'value_over_time': {i: series(cube['value_over_time'][i], 'Food Value') for i in categories},
+        'volume_over_time': {i: series(cube['volume_over_time'][i], 'Food Volume') for i in categories},
+        'value_by_category': {i: bars(cube['value_by_category'][i], 'Food Category', 'Food Value')
+                              for i in years[1:]},
+        'volume_by_category': {i: bars(cube['volume_by_category'][i], 'Food Category', 'Food Volume')
+                               for i in years[1:]},
+        'hierarchy': hierarchy(cube['hierarchy']),
+        'templates': {graph_id: {chart: figure_template(figure) for chart, figure in charts.items()}
+                      for graph_id, charts in templates.items()},
+    }
+
+    for (year, category), overview in cube['overview'].items():
+        key = combination_key(year, category)
+        data['overview'][key] = [float(overview['total_value']), float(overview['average_value']),
+                                 float(overview['total_volume'])]
+        data['countries'][key] = bars(cube['countries'][(year, category)], 'Country', 'Food Value')
+        data['types'][key] = bars(cube['types'][(year, category)], 'Category Type', 'Food Value')
+
+    return data
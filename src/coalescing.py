@@ -0,0 +1,196 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# REQUEST COALESCING: shared, dropped and limited requests of the server callbacks
+#
+#     single-flight   identical callback requests in flight (same callback, inputs and states), from
+#                     any browser, wait for the first one and are answered with its response
+#     superseded      a request of a browser tab (X-Dash-Session header, set by
+#                     assets/request_session.js) is dropped when a newer request of the same tab for
+#                     the same callback arrives before it runs or before it is answered: it gets a 204
+#                     (no update, as PreventUpdate) and the tab shows the result of the newer one
+#     concurrency     opt-in: with CALLBACK_CONCURRENCY set (default 0, no limit), at most that many
+#                     requests of a callback run at the same time in a worker. The others wait for a
+#                     free slot up to CALLBACK_QUEUE_TIMEOUT seconds (default 10), then get a 503.
+#     debounce        with CALLBACK_DEBOUNCE milliseconds (default 0), a request of a tab waits that
+#                     long before it runs: a quick series of filter changes only runs the last one
+# A waiting request holds a thread of the worker: the waits need a threaded server (gunicorn
+# --threads, the Flask development server). The state is kept per worker process.
+# Background callbacks (job polling with a query string) are left alone.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import hashlib
+import itertools
+import os
+import threading
+import time
+
+from flask import request
+
+import metrics
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+CONCURRENCY = int(os.environ.get('CALLBACK_CONCURRENCY', 0))
+QUEUE_TIMEOUT = float(os.environ.get('CALLBACK_QUEUE_TIMEOUT', 10))
+DEBOUNCE = float(os.environ.get('CALLBACK_DEBOUNCE', 0)) / 1000
+
+# Header holding the id of the browser tab
+SESSION_HEADER = 'X-Dash-Session'
+
+# Seconds between two checks of a waiting request (superseded, response ready, free slot)
+WAIT_INTERVAL = 0.01
+
+# Seconds a client should wait before sending again a request rejected for lack of slot
+RETRY_AFTER = 1
+
+
+# ------------------------------------------------------------------------------------------------
+# FLIGHTS SECTION
+
+# Computation of a callback request shared by the identical requests arriving while it runs
+class Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        # (body, mimetype) of the response, None when the request failed or was dropped before
+        # running (the waiting requests then run it themselves)
+        self.response = None
+
+
+# ------------------------------------------------------------------------------------------------
+# REQUESTS SECTION
+
+# Register the coalescing of the callback requests on the Flask server of a Dash app
+def register_coalescing(app):
+    server = app.server
+    callback_path = f'{app.config.routes_pathname_prefix}_dash-update-component'
+
+    # Request body hash -> flight in progress
+    flights = {}
+    # (tab, callback output) -> ticket of the latest request
+    latest = {}
+    # Callback output -> semaphore of its running requests
+    slots = {}
+    tickets = itertools.count()
+    lock = threading.Lock()
+
+    # Callback request handled here: not the background callbacks
+    def coalesced_request():
+        if request.path != callback_path or request.method != 'POST' or request.query_string:
+            return False
+        body = request.get_json(silent=True) or {}
+        return not app.callback_map.get(body.get('output'), {}).get('long')
+
+    def slot_semaphore(output):
+        with lock:
+            if output not in slots:
+                slots[output] = threading.BoundedSemaphore(CONCURRENCY)
+            return slots[output]
+
+    def superseded(state):
+        ticket = state['ticket']
+        return ticket is not None and latest.get(ticket[0]) != ticket[1]
+
+    def dropped(state):
+        metrics.CALLBACK_DROPPED.inc(output=state['output'])
+        return server.response_class(status=204)
+
+    # End the flight led by the request: the waiting requests get its response (or run themselves)
+    def finish_flight(state, response=None):
+        flight = state.pop('flight', None)
+        if flight is None:
+            return
+        flight.response = response
+        with lock:
+            flights.pop(state['key'], None)
+        flight.done.set()
+
+    @server.before_request
+    def coalesce_callback():
+        if not coalesced_request():
+            return None
+        output = (request.get_json(silent=True) or {}).get('output', '')
+        session = request.headers.get(SESSION_HEADER)
+        state = request.environ['dashboard.coalescing'] = {
+            'output': output,
+            'key': hashlib.sha256(request.get_data()).hexdigest(),
+            'ticket': None,
+        }
+        if session:
+            state['ticket'] = ((session, output), next(tickets))
+            with lock:
+                latest[state['ticket'][0]] = state['ticket'][1]
+
+        # Debounce: a newer request of the tab in the meantime replaces this one
+        if DEBOUNCE and state['ticket'] is not None:
+            deadline = time.perf_counter() + DEBOUNCE
+            while time.perf_counter() < deadline:
+                if superseded(state):
+                    return dropped(state)
+                time.sleep(min(WAIT_INTERVAL, max(deadline - time.perf_counter(), 0)))
+
+        # Single-flight: lead the computation, or wait for the identical one in flight
+        while True:
+            with lock:
+                flight = flights.get(state['key'])
+                if flight is None:
+                    flight = state['flight'] = flights[state['key']] = Flight()
+                    break
+            while not flight.done.wait(WAIT_INTERVAL):
+                if superseded(state):
+                    return dropped(state)
+            if flight.response is not None:
+                metrics.CALLBACK_COALESCED.inc(output=output)
+                body, mimetype = flight.response
+                return server.response_class(body, mimetype=mimetype)
+
+        # Concurrency limit of the callback
+        if CONCURRENCY > 0:
+            semaphore = slot_semaphore(output)
+            deadline = time.perf_counter() + QUEUE_TIMEOUT
+            while not semaphore.acquire(timeout=WAIT_INTERVAL):
+                if superseded(state):
+                    finish_flight(state)
+                    return dropped(state)
+                if time.perf_counter() > deadline:
+                    finish_flight(state)
+                    metrics.CALLBACK_REJECTED.inc(output=output)
+                    response = server.response_class('Too many requests for this callback, retry later', status=503,
+                                                     mimetype='text/plain')
+                    response.headers['Retry-After'] = str(RETRY_AFTER)
+                    return response
+            state['semaphore'] = semaphore
+        return None
+
+    # Share the response of a flight (before the compression: the waiting requests may accept
+    # other encodings), drop it when a newer request of the tab arrived while it ran
+    @server.after_request
+    def share_callback_response(response):
+        state = request.environ.get('dashboard.coalescing')
+        if state is None or 'flight' not in state:
+            return response
+        shared = None
+        if response.status_code == 200 and not response.direct_passthrough:
+            shared = (response.get_data(), response.mimetype)
+        finish_flight(state, shared)
+        if superseded(state):
+            return dropped(state)
+        return response
+
+    @server.teardown_request
+    def release_callback(exception=None):
+        state = request.environ.get('dashboard.coalescing')
+        if state is None:
+            return
+        finish_flight(state)
+        semaphore = state.pop('semaphore', None)
+        if semaphore is not None:
+            semaphore.release()
+        # Forget the tab once its latest request is answered
+        ticket = state['ticket']
+        if ticket is not None:
+            with lock:
+                if latest.get(ticket[0]) == ticket[1]:
+                    del latest[ticket[0]]
@@ -0,0 +1,210 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA LAYER: precomputed aggregates served to the dashboard callbacks
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pandas as pd
+
+from facts import pivot
+from hierarchy import SumTree
+from query_engine import QueryEngine, top_groups
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Value used by the dropdown menus to select every year / every category
+ALL = 'All'
+
+# Label of the bar adding up the groups outside of the top N
+OTHERS = 'Others'
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# List the year filter values ('All' first, then the most recent year first)
+def year_options(years):
+    return [ALL] + [str(i) for i in sorted(years, reverse=True)]
+
+
+# List the food category filter values ('All' first, then the order of the fact table)
+def category_options(categories):
+    return [ALL] + list(categories)
+
+
+# Group the country level data (countries, category types) for one year / category combination
+# (the measures of the fact tables are already scaled)
+def group_food_value(data, column1, column2, year_filter=None, category_filter=None):
+    # Filter the data by the specified year and category
+    mask = pd.Series(True, index=data.index)
+    if year_filter is not None:
+        mask &= data['Year'] == int(year_filter)
+    if category_filter is not None:
+        mask &= data['Food Category'] == category_filter
+    data_new = data.loc[mask, [column1, column2]]
+
+    # Pivot the data (only the categories present in the filtered rows)
+    return data_new.groupby(column1, observed=True)[column2].sum().reset_index().sort_values(by=column2)
+
+
+# Breakdown of the food value per group (countries, category types) from the query engine.
+# With top_n the groups outside of the top_n largest are added up in an 'Others' row.
+def engine_breakdown(engine, column1, column2, year_filter=None, category_filter=None, top_n=None):
+    return engine.group_by(column1, column2, year_filter, category_filter, top_n=top_n, others_label=OTHERS)
+
+
+# Breakdown of the food value of the children of a node of the hierarchy (e.g. the countries of a
+# category type), read from the precomputed sums. With top_n the other children are added up in
+# an 'Others' row.
+def hierarchy_breakdown(tree, node_id, column1, column2, year_filter=None, top_n=None):
+    labels, sums = tree.children(node_id, year_filter)
+    return top_groups(labels, sums, column1, column2, top_n, OTHERS)
+
+
+# Values of every category for one year (row of the wide view), sorted in ascending order
+def categories_for_year(categories, values, column1, column2):
+    present = ~np.isnan(values)
+    data_new = pd.DataFrame({column1: np.asarray(categories, dtype=object)[present], column2: values[present]})
+    return data_new.sort_values(by=[column2], ignore_index=True)
+
+
+# Yearly series of one category, or of the total of every category (column of the wide view)
+def series_over_time(years, matrix, category_position, column):
+    values = np.nansum(matrix, axis=1) if category_position is None else matrix[:, category_position]
+    return pd.DataFrame({'Year': years, column: values})
+
+
+# ------------------------------------------------------------------------------------------------
+# KPI SECTION
+
+# Measures of the KPI table
+KPI_MEASURES = ['total_value', 'average_value', 'total_volume', 'value_growth', 'value_share']
+
+
+# Matrix of a year x category matrix with its totals: an extra row (every year) and an extra
+# column (every category)
+def with_totals(matrix):
+    totals = np.zeros((matrix.shape[0] + 1, matrix.shape[1] + 1), dtype=matrix.dtype)
+    totals[:-1, :-1] = matrix
+    totals[-1, :-1] = matrix.sum(axis=0)
+    totals[:-1, -1] = matrix.sum(axis=1)
+    totals[-1, -1] = matrix.sum()
+    return totals
+
+
+# Compute the KPIs of every (year, category) combination, 'All' included, in one pass over the wide
+# views (year x category matrices, years in ascending order). Measures:
+#     total_value, total_volume   sums of the measures
+#     average_value               average of the values present: categories of a year, years of a
+#                                 category, yearly totals for every year and every category
+#     value_growth                growth of the total value over the previous year (fraction), average
+#                                 yearly growth of the whole period for every year
+#     value_share                 share of the total value of the year(s) selected (fraction)
+# Returns a table indexed by (year, category) with the filter values as labels
+def kpi_table(fact_years, fact_categories, value_matrix, volume_matrix):
+    present = ~np.isnan(value_matrix)
+    total_value = with_totals(np.nan_to_num(value_matrix))
+    total_volume = with_totals(np.nan_to_num(volume_matrix))
+    counts = with_totals(present.astype(np.int64))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_value = total_value / np.where(counts > 0, counts, np.nan)
+        average_value[-1, -1] = total_value[-1, -1] / max(np.count_nonzero(counts[:-1, -1]), 1)
+
+        value_growth = np.full(total_value.shape, np.nan)
+        value_growth[1:-1] = total_value[1:-1] / np.where(total_value[:-2] != 0, total_value[:-2], np.nan) - 1
+        if len(fact_years) > 1:
+            value_growth[-1] = (total_value[-2] / np.where(total_value[0] != 0, total_value[0], np.nan)) \
+                ** (1 / (len(fact_years) - 1)) - 1
+
+        value_share = total_value / np.where(total_value[:, -1:] != 0, total_value[:, -1:], np.nan)
+
+    index = pd.MultiIndex.from_product([[str(i) for i in fact_years] + [ALL], list(fact_categories) + [ALL]],
+                                       names=['year', 'category'])
+    measures = [total_value, average_value, total_volume, value_growth, value_share]
+    return pd.DataFrame({name: values.ravel().astype(np.float64) for name, values in zip(KPI_MEASURES, measures)},
+                        index=index)
+
+
+# ------------------------------------------------------------------------------------------------
+# AGGREGATE CUBE SECTION
+
+# Build every aggregate the callbacks need, once, for each (year, category) combination.
+# The callbacks then read their data from the returned dictionaries instead of filtering
+# and grouping the fact tables on every dropdown change.
+# facts: fact tables (see facts.py)
+# top_n: number of bars of the breakdown charts ({'countries': N, 'types': N}, None for every bar)
+# engine: query engine already built from the country facts (e.g. attached from shared memory)
+def build_cube(facts, top_n=None, engine=None):
+    return update_cube(None, facts, top_n=top_n, engine=engine)
+
+
+# Return a new cube where only the aggregates of the changed years (and of 'All') are computed
+# again, the others are shared with the current cube. The current cube is left untouched, so
+# the requests using it finish with consistent data.
+# changed_years: years with new rows (None rebuilds every aggregate)
+def update_cube(cube, facts, changed_years=None, top_n=None, engine=None):
+    top_n = top_n or {}
+    # Wide views of the category facts
+    fact_years, fact_categories, value_matrix = pivot(facts['categories'], 'Food Value')
+    _, _, volume_matrix = pivot(facts['categories'], 'Food Volume')
+    years = year_options(fact_years)
+    categories = category_options(fact_categories)
+    year_positions = {str(year): position for position, year in enumerate(fact_years)}
+    category_positions = {category: position for position, category in enumerate(fact_categories)}
+
+    if cube is None or changed_years is None or categories != cube['categories']:
+        update_years = years
+        cube = {
+            # (year, category) -> food value per country / per category type
+            'countries': {},
+            'types': {},
+            # category -> yearly food value / volume (columns: Year, Food Value / Food Volume)
+            'value_over_time': {},
+            'volume_over_time': {},
+            # year -> food value / volume per category for that year
+            'value_by_category': {},
+            'volume_by_category': {},
+        }
+    else:
+        update_years = [ALL] + [i for i in years if i in {str(j) for j in changed_years}]
+        cube = {key: dict(value) if isinstance(value, dict) else value for key, value in cube.items()}
+
+    cube['years'] = years
+    cube['categories'] = categories
+    # KPIs of every (year, category) combination (every one computed again, a single vectorized pass),
+    # and the same values as (year, category) -> {measure: value} for the callbacks
+    cube['kpis'] = kpi_table(fact_years, fact_categories, value_matrix, volume_matrix)
+    cube['overview'] = cube['kpis'].to_dict('index')
+    # Indexed storage of the country level data
+    engine = cube['engine'] = engine if engine is not None else QueryEngine(facts['countries'])
+    # Food Category -> Category Type -> Country sums of every year (rebuilt, a few vectorized passes)
+    cube['hierarchy'] = SumTree(engine, ALL)
+
+    for year in update_years:
+        year_filter = None if year == ALL else year
+        for category in categories:
+            category_filter = None if category == ALL else category
+            key = (year, category)
+            cube['countries'][key] = engine_breakdown(engine, 'Country', 'Food Value', year_filter, category_filter,
+                                                      top_n.get('countries'))
+            cube['types'][key] = engine_breakdown(engine, 'Category Type', 'Food Value', year_filter, category_filter,
+                                                  top_n.get('types'))
+
+        if year_filter is not None:
+            cube['value_by_category'][year] = categories_for_year(fact_categories, value_matrix[year_positions[year]],
+                                                                  'Food Category', 'Food Value')
+            cube['volume_by_category'][year] = categories_for_year(fact_categories,
+                                                                   volume_matrix[year_positions[year]],
+                                                                   'Food Category', 'Food Volume')
+
+    # Every yearly series gets the new years
+    for category in categories:
+        cube['value_over_time'][category] = series_over_time(fact_years, value_matrix,
+                                                             category_positions.get(category), 'Food Value')
+        cube['volume_over_time'][category] = series_over_time(fact_years, volume_matrix,
+                                                              category_positions.get(category), 'Food Volume')
+
+    return cube
@@ -0,0 +1,142 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA WATCHER: detects changes of the CSV files and reads only the appended rows
+#
+# A file is checked with its size and modification time, then with its content hash.
+# When the previous content is unchanged at the start of the file (the new USDA rows were
+# appended) only the new bytes are parsed, otherwise the whole file is read again.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import hashlib
+import io
+import logging
+import os
+import threading
+
+import pandas as pd
+
+from snapshot import TABLES, apply_dtypes, source_info
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# SHA-256 of the first `size` bytes of a file, and whether those bytes end with a new line
+def prefix_hash(path, size):
+    digest = hashlib.sha256()
+    last = b''
+    with open(path, 'rb') as file:
+        remaining = size
+        while remaining > 0:
+            chunk = file.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            last = chunk[-1:]
+            remaining -= len(chunk)
+    return digest.hexdigest(), last == b'\n'
+
+
+# Parse the complete lines appended to a CSV file after `offset` (columns of the header line).
+# Returns the rows and the number of bytes read (a line still being written is left for the
+# next poll).
+def read_appended_rows(path, offset):
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        content = file.read()
+    content = content[:content.rfind(b'\n') + 1]
+    if not content.strip():
+        return None, len(content)
+    rows = pd.read_csv(io.BytesIO(content), header=None, names=list(columns))
+    return apply_dtypes(rows), len(content)
+
+
+# ------------------------------------------------------------------------------------------------
+# WATCHER SECTION
+
+class DataWatcher:
+
+    # sources: file -> {'size', 'mtime_ns', 'sha256'} of the files the current tables were read from
+    def __init__(self, data_dir, sources, interval=5.0):
+        self.data_dir = data_dir
+        self.sources = {file: dict(info) for file, info in sources.items()}
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    # Compare the files with the recorded state. Returns table name -> (kind, rows) where kind is
+    # 'append' (rows: the new rows only) or 'reload' (rows: the whole table).
+    def poll(self):
+        changes = {}
+        for name, file in TABLES.items():
+            path = os.path.join(self.data_dir, file)
+            recorded = self.sources.get(file)
+            if not os.path.exists(path):
+                continue
+            status = os.stat(path)
+            if recorded is not None and status.st_size == recorded['size'] and \
+                    status.st_mtime_ns == recorded['mtime_ns']:
+                continue
+
+            current = source_info(path)
+            if recorded is not None and current['sha256'] == recorded['sha256']:
+                # Touched but unchanged
+                self.sources[file] = current
+                continue
+
+            if recorded is not None and current['size'] > recorded['size']:
+                previous_hash, ends_with_line = prefix_hash(path, recorded['size'])
+                if previous_hash == recorded['sha256'] and ends_with_line:
+                    rows, size = read_appended_rows(path, recorded['size'])
+                    if rows is not None:
+                        changes[name] = ('append', rows)
+                    # Record the state of the bytes read so far
+                    size += recorded['size']
+                    self.sources[file] = {'size': size, 'mtime_ns': status.st_mtime_ns,
+                                          'sha256': prefix_hash(path, size)[0]}
+                    continue
+
+            changes[name] = ('reload', apply_dtypes(pd.read_csv(path)))
+            self.sources[file] = current
+        return changes
+
+    # Poll the files and pass the changes to on_change(changes). When the poll or on_change fails,
+    # the recorded state of the files is restored, so the next poll finds the same changes again
+    # (on_change must leave the data untouched when it raises).
+    def check(self, on_change):
+        previous = {file: dict(info) for file, info in self.sources.items()}
+        try:
+            changes = self.poll()
+            if changes:
+                on_change(changes)
+        except Exception:
+            self.sources = previous
+            raise
+
+    # Check the files every `interval` seconds in a background thread of the current process. Does
+    # nothing when the thread already runs in this process: a thread started before a fork (gunicorn
+    # --preload) doesn't exist in the forked worker, which starts its own.
+    def start(self, on_change):
+        with self._start_lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.check(on_change)
+                except Exception:
+                    logger.exception('Reloading the data failed, retried at the next poll')
+
+        self._thread = threading.Thread(target=run, name='data-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
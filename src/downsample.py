@@ -0,0 +1,129 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DOWNSAMPLING: long time series reduced to the points a graph can show
+#
+# A line plot can't show more points than its width in pixels: longer series (monthly, weekly
+# or daily granularity) are downsampled on the server before they are sent to the browser.
+#     'lttb'    Largest Triangle Three Buckets: one point per bucket, the one keeping the
+#               shape of the line (the point forming the largest triangle with its neighbours)
+#     'minmax'  the lowest and the highest point of every bucket (keeps every peak)
+#
+# The number of points follows the width of the graph in the browser when it is known (reported
+# by assets/graph_view.js, see app.py), DOWNSAMPLE_WIDTH otherwise.
+#
+# DOWNSAMPLE_WIDTH: width of the line plots in pixels while their real width is unknown (default 800)
+# DOWNSAMPLE_METHOD: 'lttb' (default) or 'minmax'
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+DEFAULT_WIDTH = 800
+METHODS = ('lttb', 'minmax')
+
+WIDTH = int(os.environ.get('DOWNSAMPLE_WIDTH') or DEFAULT_WIDTH)
+METHOD = os.environ.get('DOWNSAMPLE_METHOD', 'lttb')
+if METHOD not in METHODS:
+    raise ValueError(f'Unknown DOWNSAMPLE_METHOD: {METHOD}')
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Number of points drawn on a graph of width pixels: one per pixel with LTTB, the lowest and the
+# highest point of every pixel with min-max
+def max_points(width=WIDTH, method=METHOD):
+    return width if method == 'lttb' else 2 * width
+
+
+# Numeric values of an x array (datetimes as nanoseconds) for the triangle areas
+def numeric(x):
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+# Value of the x array type for an axis range value of relayoutData (a date text on date axes)
+def axis_value(x, value):
+    if np.issubdtype(x.dtype, np.datetime64):
+        return np.datetime64(pd.Timestamp(value))
+    return float(value)
+
+
+# Series sorted by x (the arrays are returned as they are when already sorted)
+def sort_series(x, y):
+    if len(x) < 2 or np.all(x[1:] >= x[:-1]):
+        return x, y
+    order = np.argsort(x, kind='stable')
+    return x[order], y[order]
+
+
+# ------------------------------------------------------------------------------------------------
+# DOWNSAMPLING SECTION
+
+# Positions of the points kept by LTTB: the first and last points, and one point of every bucket
+# in between
+def lttb(x, y, points):
+    size = len(x)
+    if points >= size or points < 3:
+        return np.arange(size)
+    x, y = numeric(x), y.astype(np.float64)
+
+    # points - 2 buckets between the first and the last point, and the average point of each
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    lengths = np.diff(edges)
+    average_x = np.add.reduceat(x[:-1], edges[:-1]) / lengths
+    average_y = np.add.reduceat(y[:-1], edges[:-1]) / lengths
+    # The last bucket is compared with the last point
+    average_x = np.r_[average_x[1:], x[-1]]
+    average_y = np.r_[average_y[1:], y[-1]]
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Twice the area of the triangles (previous point, candidate, average of the next bucket)
+        areas = np.abs((x[previous] - average_x[bucket]) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (average_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        selected[bucket + 1] = previous
+    return selected
+
+
+# Positions of the lowest and highest points of (points - 2) / 2 buckets and of the first and
+# last points, in x order
+def min_max(y, points):
+    size = len(y)
+    buckets = (points - 2) // 2
+    if points >= size or buckets < 1:
+        return np.arange(size)
+    bucket = np.arange(size) * buckets // size
+    # Sorted by bucket then by value: the first and last position of each bucket are its extremes
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket, np.arange(buckets))
+    ends = np.r_[starts[1:], size]
+    return np.unique(np.r_[0, order[starts], order[ends - 1], size - 1])
+
+
+# Series (x, y) reduced to at most points points, sorted by x
+def downsample(x, y, points=None, method=METHOD):
+    points = points or max_points(method=method)
+    x, y = sort_series(x, y)
+    selected = lttb(x, y, points) if method == 'lttb' else min_max(y, points)
+    return x[selected], y[selected]
+
+
+# Points of the x range [start, end] of a series, downsampled. The points next to the range are
+# kept so the line reaches the edges of the graph.
+def window(x, y, start, end, points=None, method=METHOD):
+    x, y = sort_series(x, y)
+    first = max(int(np.searchsorted(x, start, side='left')) - 1, 0)
+    last = min(int(np.searchsorted(x, end, side='right')) + 1, len(x))
+    return downsample(x[first:last], y[first:last], points, method)
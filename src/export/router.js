@@ -0,0 +1,80 @@
+// PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+// AUTHOR: MIKE MUSAS
+// STATIC ROUTER: shows the pre-rendered figures of the selected (year, category) combination
+// Part of the static export (see export_static.py). The selection is kept in the URL hash
+// (#year=2020&category=Fruits) so every view of the dashboard can be linked.
+
+(function () {
+    const OVERVIEW_IDS = ['total-food-value', 'average-food-value', 'total-food-volume'];
+    const FILTER_IDS = {year: 'year-input', category: 'category-input'};
+    const PLOT_CONFIG = {responsive: true};
+
+    // Figure files already requested (figure hash -> promise of the figure)
+    const figures = {};
+    let manifest = null;
+
+    // Selected combination: from the URL hash, the default one when it is missing or unknown
+    function readSelection() {
+        const params = new URLSearchParams(window.location.hash.slice(1));
+        const selection = {
+            year: params.get('year') || manifest.default.year,
+            category: params.get('category') || manifest.default.category
+        };
+        return manifest.combinations[selection.year + '|' + selection.category] ? selection : manifest.default;
+    }
+
+    function loadFigure(hash) {
+        if (!figures[hash]) {
+            figures[hash] = fetch('figures/' + hash + '.json').then(function (response) {
+                return response.json();
+            });
+        }
+        return figures[hash];
+    }
+
+    // Draw a graph, unless another figure was selected for it while this one was loading
+    function showFigure(graphId, hash) {
+        const element = document.getElementById(graphId);
+        element.dataset.figure = hash;
+        if (hash === null) {
+            Plotly.react(element, [], {}, PLOT_CONFIG);
+            return;
+        }
+        loadFigure(hash).then(function (figure) {
+            if (element.dataset.figure === hash) {
+                Plotly.react(element, figure.data, figure.layout, PLOT_CONFIG);
+            }
+        });
+    }
+
+    function render() {
+        const selection = readSelection();
+        const combination = manifest.combinations[selection.year + '|' + selection.category];
+        document.getElementById(FILTER_IDS.year).value = selection.year;
+        document.getElementById(FILTER_IDS.category).value = selection.category;
+        OVERVIEW_IDS.forEach(function (id, position) {
+            document.getElementById(id).textContent = combination.overview[position];
+        });
+        Object.keys(combination.figures).forEach(function (graphId) {
+            showFigure(graphId, combination.figures[graphId]);
+        });
+    }
+
+    // A filter change only updates the URL hash, the hashchange event renders the new selection
+    function selectionChanged() {
+        window.location.hash = new URLSearchParams({
+            year: document.getElementById(FILTER_IDS.year).value,
+            category: document.getElementById(FILTER_IDS.category).value
+        }).toString();
+    }
+
+    fetch('combinations.json').then(function (response) {
+        return response.json();
+    }).then(function (data) {
+        manifest = data;
+        document.getElementById(FILTER_IDS.year).addEventListener('change', selectionChanged);
+        document.getElementById(FILTER_IDS.category).addEventListener('change', selectionChanged);
+        window.addEventListener('hashchange', render);
+        render();
+    });
+})();
@@ -0,0 +1,279 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# STATIC EXPORT: pre-renders every (year, category) combination into a static bundle
+#
+# Build the bundle (from the src directory):
+#     python export_static.py [--output-dir build] [--workers 4]
+#
+# The bundle is served by any file server or CDN, without Python in the request path:
+#     index.html           the dashboard layout (same layout function as the app)
+#     router.js            reads the selection from the filters / URL hash and draws the figures
+#     plotly.min.js        the Plotly.js bundle of the installed plotly package
+#     assets/              the asset files of the app used by the layout (the logo)
+#     combinations.json    overview values and figure file of each graph, for every combination
+#     figures/<hash>.json  figure JSON, named after its content (identical figures are written once)
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import argparse
+import concurrent.futures
+import hashlib
+import html
+import json
+import os
+import shutil
+import time
+
+import plotly
+
+from figure_cache import NO_FIGURE, figure_to_json
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Files of the export directory copied to the bundle
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'export')
+ROUTER_FILE = 'router.js'
+PLOTLY_FILE = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+# Tags without closing tag
+VOID_TAGS = {'br', 'hr', 'img'}
+
+# Parts of the page needing the app server (left out of the bundle)
+SERVER_ONLY_IDS = {'downloads'}
+
+# dbc.Col size properties and their Bootstrap class prefix
+COLUMN_SIZES = [('xs', 'col'), ('sm', 'col-sm'), ('md', 'col-md'), ('lg', 'col-lg'), ('xl', 'col-xl')]
+
+# Height of a dcc.Graph without a height in its style
+DEFAULT_GRAPH_HEIGHT = '450px'
+
+
+# ------------------------------------------------------------------------------------------------
+# STATIC HTML SECTION
+
+# CSS text of a Dash style dictionary (the layout already uses the CSS property names)
+def style_text(style):
+    return '; '.join(f'{key}: {value}' for key, value in style.items())
+
+
+# URL relative to the bundle of an asset URL of the app ('/assets/x.png' -> 'assets/x.png')
+def bundle_url(url):
+    return url.lstrip('/') if url else url
+
+
+# Opening tag attributes (None values are left out)
+def attributes_text(attributes):
+    return ''.join(f' {key}="{html.escape(str(value))}"' for key, value in attributes.items()
+                   if value not in (None, '', {}))
+
+
+# Bootstrap classes of a dbc.Col (width is the size of the smallest screens when xs is not set)
+def column_classes(props):
+    classes = []
+    sizes = dict(props)
+    if sizes.get('xs') is None and sizes.get('width') is not None:
+        sizes['xs'] = sizes['width']
+    for name, prefix in COLUMN_SIZES:
+        size = sizes.get(name)
+        if isinstance(size, dict):
+            size = size.get('size')
+        if size is not None:
+            classes.append(f'{prefix}-{size}')
+    return classes or ['col']
+
+
+# Static HTML of a Dash layout: the html components become their tag, dbc rows / columns Bootstrap
+# divs, the dropdowns <select> menus and the graphs empty divs filled by router.js
+def layout_html(component):
+    if component is None:
+        return ''
+    if isinstance(component, (list, tuple)):
+        return ''.join(layout_html(i) for i in component)
+    if isinstance(component, (str, int, float)):
+        return html.escape(str(component))
+
+    name = type(component).__name__
+    props = component.to_plotly_json()['props']
+    style = dict(props.get('style') or {})
+    classes = [props['className']] if props.get('className') else []
+    attributes = {'id': props.get('id')}
+
+    if name == 'Store' or props.get('id') in SERVER_ONLY_IDS:
+        return ''
+    if name == 'Dropdown':
+        options = ''.join('<option value="{}"{}>{}</option>'.format(
+            html.escape(str(i['value'])), ' selected' if i['value'] == props.get('value') else '',
+            html.escape(str(i['label']))) for i in props.get('options', []))
+        return f'<select class="form-select"{attributes_text(attributes)}>{options}</select>'
+    if name == 'Graph':
+        style.setdefault('height', DEFAULT_GRAPH_HEIGHT)
+        attributes.update({'class': 'dash-graph', 'style': style_text(style)})
+        return f'<div{attributes_text(attributes)}></div>'
+
+    if name == 'Row':
+        tag = 'div'
+        classes.append('row')
+        if props.get('justify'):
+            classes.append(f"justify-content-{props['justify']}")
+    elif name == 'Col':
+        tag = 'div'
+        classes.extend(column_classes(props))
+    else:
+        tag = name.lower()
+        attributes.update({'src': bundle_url(props.get('src')), 'href': props.get('href')})
+
+    attributes.update({'class': ' '.join(classes), 'style': style_text(style)})
+    if tag in VOID_TAGS:
+        return f'<{tag}{attributes_text(attributes)}>'
+    return f'<{tag}{attributes_text(attributes)}>{layout_html(props.get("children"))}</{tag}>'
+
+
+# Whole page: the app title and stylesheets, the layout and the scripts of the bundle
+def page_html(app, layout):
+    stylesheets = ''.join(f'<link rel="stylesheet" href="{html.escape(i)}">'
+                          for i in app.config.external_stylesheets if isinstance(i, str))
+    return ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+            '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+            f'<title>{html.escape(app.title)}</title>\n{stylesheets}\n</head>\n<body>\n'
+            f'{layout_html(layout)}\n'
+            '<script src="plotly.min.js"></script>\n<script src="router.js"></script>\n</body>\n</html>\n')
+
+
+# ------------------------------------------------------------------------------------------------
+# RENDER SECTION
+
+# The dashboard module with its app created and its data loaded, once per process of the pool
+# (inherited from the parent process when the pool forks)
+def load_dashboard():
+    import app
+    app.create_app()
+    app.load_data()
+    return app
+
+
+# Render every combination of one year: [(year, category, overview values, {graph id: figure JSON})]
+# and the CPU time spent in seconds (not the elapsed time, which grows when the processes share CPUs)
+def render_year(year):
+    start = time.process_time()
+    dashboard = load_dashboard()
+    results = []
+    for category in dashboard.cube['categories']:
+        overview = list(dashboard.update_food_value(year, category))
+        figures = {graph_id: figure_to_json(func.__wrapped__(year, category))
+                   for graph_id, func in dashboard.FIGURE_CALLBACKS.items()}
+        results.append((year, category, overview, figures))
+    return results, time.process_time() - start
+
+
+# Render every year, in a process pool when workers > 1. Returns the results of every year and
+# the CPU time spent rendering (sum over every year).
+def render_all(years, workers):
+    if workers <= 1:
+        rendered = [render_year(i) for i in years]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=load_dashboard) as pool:
+            rendered = list(pool.map(render_year, years))
+    return [i for results, _ in rendered for i in results], sum(seconds for _, seconds in rendered)
+
+
+# ------------------------------------------------------------------------------------------------
+# BUNDLE SECTION
+
+# Write a figure file named after its content, return the name (None for no figure)
+def write_figure(figures_dir, figure_json, written):
+    if figure_json == NO_FIGURE:
+        return None
+    name = hashlib.sha256(figure_json.encode('utf-8')).hexdigest()[:16]
+    if name not in written:
+        with open(os.path.join(figures_dir, f'{name}.json'), 'w', encoding='utf-8') as file:
+            file.write(figure_json)
+        written.add(name)
+    return name
+
+
+# Copy the asset files of the app referenced by the page to the assets directory of the bundle
+def copy_assets(app, page, output_dir):
+    assets_dir = os.path.join(output_dir, 'assets')
+    for name in sorted(os.listdir(app.config.assets_folder)):
+        if f'"{bundle_url(app.get_asset_url(name))}' in page:
+            os.makedirs(assets_dir, exist_ok=True)
+            shutil.copy(os.path.join(app.config.assets_folder, name), assets_dir)
+
+
+# Build the static bundle of the dashboard in output_dir, return a report of the build
+def export(output_dir, workers):
+    start = time.perf_counter()
+    dashboard = load_dashboard()
+    years, categories = dashboard.cube['years'], dashboard.cube['categories']
+
+    render_start = time.perf_counter()
+    results, render_seconds = render_all(years, workers)
+    render_wall = time.perf_counter() - render_start
+
+    # Serial baseline of the same renders, timed next to the pooled run (the speedup is the serial
+    # time / the pooled time, pool start included)
+    serial_wall = render_wall
+    if workers > 1:
+        serial_start = time.perf_counter()
+        render_all(years, 1)
+        serial_wall = time.perf_counter() - serial_start
+
+    # Start from an empty directory so no figure of a previous build is left
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    figures_dir = os.path.join(output_dir, 'figures')
+    os.makedirs(figures_dir)
+
+    written = set()
+    combinations = {}
+    for year, category, overview, figures in results:
+        combinations[f'{year}|{category}'] = {
+            'overview': overview,
+            'figures': {graph_id: write_figure(figures_dir, figure_json, written)
+                        for graph_id, figure_json in figures.items()},
+        }
+    manifest = {'years': years, 'categories': categories,
+                'default': {'year': years[0], 'category': categories[0]}, 'combinations': combinations}
+    with open(os.path.join(output_dir, 'combinations.json'), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, separators=(',', ':'))
+
+    page = page_html(dashboard.app, dashboard.serve_layout())
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(page)
+    copy_assets(dashboard.app, page, output_dir)
+    shutil.copy(os.path.join(EXPORT_DIR, ROUTER_FILE), output_dir)
+    shutil.copy(PLOTLY_FILE, output_dir)
+
+    size = sum(os.path.getsize(os.path.join(root, i)) for root, _, files in os.walk(output_dir) for i in files)
+    return {
+        'combinations': len(combinations),
+        'figure_files': len(written),
+        'bytes': size,
+        'workers': workers,
+        'render_wall_seconds': render_wall,
+        'render_seconds': render_seconds,
+        'serial_wall_seconds': serial_wall,
+        'speedup': serial_wall / render_wall if render_wall else 1.0,
+        # CPU time of the renders / CPU time available to the workers during the render phase
+        'utilization': render_seconds / (render_wall * workers) if render_wall else 1.0,
+        'wall_seconds': time.perf_counter() - start,
+    }
+
+
+# ------------------------------------------------------------------------------------------------
+# COMMAND LINE SECTION
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-render the dashboard into a static bundle')
+    parser.add_argument('--output-dir', default='build')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='processes of the pool')
+    args = parser.parse_args()
+
+    report = export(args.output_dir, args.workers)
+    print(f"{report['combinations']} combinations, {report['figure_files']} figure files, "
+          f"{report['bytes'] / 1e6:.1f} MB written to {args.output_dir}")
+    print(f"Render {report['render_wall_seconds']:.2f} s with {report['workers']} workers "
+          f"(serial {report['serial_wall_seconds']:.2f} s, speedup {report['speedup']:.2f}x, "
+          f"{report['utilization']:.0%} utilization), "
+          f"total {report['wall_seconds']:.2f} s")
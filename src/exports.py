@@ -0,0 +1,254 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# EXPORT JOBS: downloads of the breakdowns and multi-year comparisons, built in the background
+#
+# Kinds of export (country level data, for the selected category):
+#     breakdown    food value per group (country or category type) for the selected year
+#     comparison   food value per group for several years, one column per year
+# Formats: CSV, Excel (openpyxl package)
+#
+# A job runs as a Dash background callback (DiskcacheManager): in its own process, forked from
+# the worker, with a lower CPU priority, so the workers keep answering the interactive callbacks.
+# The browser polls the progress of the job and gets a download link at the end. The rows are
+# written to the export file in chunks.
+#
+# EXPORT_JOBS: jobs running at the same time (default 2, the others wait for a slot), 0 removes
+#     the downloads panel
+# EXPORT_DIR: directory of the export files (default cache/exports), removed after EXPORT_MAX_AGE
+#     seconds (default one day)
+# Background jobs need the diskcache, multiprocess and psutil packages (pip install "dash[diskcache]"):
+# the downloads panel is only shown when they are installed.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from flask import send_from_directory
+
+from data_layer import ALL
+
+try:
+    import diskcache
+    import psutil
+    from dash import DiskcacheManager
+except ImportError:  # optional: no downloads panel without them
+    diskcache = None
+
+try:
+    import openpyxl
+except ImportError:  # optional: CSV only
+    openpyxl = None
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+DEFAULT_JOBS = 2
+JOBS = int(os.environ.get('EXPORT_JOBS', DEFAULT_JOBS))
+EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join('cache', 'exports')
+MAX_AGE = float(os.environ.get('EXPORT_MAX_AGE') or 24 * 3600)
+
+# Directory of the job results and progress (diskcache)
+JOBS_DIR = os.path.join('cache', 'jobs')
+
+# Route of the export files
+ROUTE = '/exports'
+
+# Kind of export -> (label, group column)
+KINDS = {
+    'breakdown-country': ('Food value by country', 'Country'),
+    'breakdown-type': ('Food value by category type', 'Category Type'),
+    'comparison-country': ('Multi-year comparison by country', 'Country'),
+    'comparison-type': ('Multi-year comparison by category type', 'Category Type'),
+}
+
+# Format -> (label, file extension)
+FORMATS = {'csv': ('CSV', 'csv'), 'xlsx': ('Excel', 'xlsx')}
+
+MEASURE = 'Food Value'
+
+# Rows written per chunk
+CHUNK_ROWS = 1000
+
+# Priority of the job processes (added to the priority of the worker, higher is lower)
+NICENESS = 10
+
+# Seconds between two checks for a free job slot
+SLOT_POLL_INTERVAL = 0.5
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Downloads panel shown (background job packages installed and jobs enabled)
+def enabled():
+    return diskcache is not None and JOBS > 0
+
+
+# Formats available (Excel needs openpyxl)
+def available_formats():
+    return [name for name in FORMATS if name != 'xlsx' or openpyxl is not None]
+
+
+# Background callback manager of the export jobs
+def background_manager():
+    return DiskcacheManager(diskcache.Cache(JOBS_DIR))
+
+
+# File name of an export: kind, filters and creation time
+def export_name(kind, years, category, file_format):
+    years_text = '-'.join(str(i) for i in years)
+    category_text = ''.join(i if i.isalnum() else '_' for i in category)
+    return f'{kind}_{years_text}_{category_text}_{time.strftime("%Y%m%d-%H%M%S")}_{os.getpid()}.{FORMATS[file_format][1]}'
+
+
+# Remove the export files older than MAX_AGE
+def remove_old_exports():
+    limit = time.time() - MAX_AGE
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if os.path.getmtime(path) < limit:
+            os.remove(path)
+
+
+# ------------------------------------------------------------------------------------------------
+# JOB SLOTS SECTION
+
+# Process of a slot still running (a cancelled job is killed, its slot becomes free)
+def process_alive(pid):
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+# Take a free job slot: the slot key, None when every slot is taken
+def acquire_slot(cache):
+    for slot in range(JOBS):
+        key = f'export-slot-{slot}'
+        with cache.transact():
+            holder = cache.get(key)
+            if holder is None or not process_alive(holder):
+                cache.set(key, os.getpid())
+                return key
+    return None
+
+
+# Free the slot taken by this process
+def release_slot(cache, key):
+    with cache.transact():
+        if cache.get(key) == os.getpid():
+            cache.delete(key)
+
+
+# ------------------------------------------------------------------------------------------------
+# QUERY SECTION
+
+# Food value per group for one year / category (ALL for every one), largest first
+def breakdown_rows(engine, group_column, year, category):
+    data = engine.group_by(group_column, MEASURE, None if year == ALL else year, None if category == ALL else category)
+    return data.iloc[::-1].reset_index(drop=True)
+
+
+# Food value per group for several years (one column per year, oldest first), largest in the
+# latest year first. report(done) is called after each year.
+def comparison_rows(engine, group_column, years, category, report):
+    labels = engine.labels[group_column]
+    matrix = np.zeros((len(labels), len(years)))
+    present = np.zeros(len(labels), dtype=bool)
+    for position, year in enumerate(years):
+        codes, sums = engine.group_sums(group_column, MEASURE, year, None if category == ALL else category)
+        matrix[codes, position] = sums
+        present[codes] = True
+        report(position + 1)
+
+    data = pd.DataFrame(matrix[present], columns=[str(i) for i in years])
+    data.insert(0, group_column, labels[present])
+    if len(years) > 1:
+        data['Change'] = data[str(years[-1])] - data[str(years[0])]
+    return data.sort_values(by=str(years[-1]), ascending=False, kind='stable', ignore_index=True)
+
+
+# ------------------------------------------------------------------------------------------------
+# WRITERS SECTION
+
+# Write a table to a CSV file in chunks. report(rows) is called after each chunk.
+def write_csv(data, path, report):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        for start in range(0, max(len(data), 1), CHUNK_ROWS):
+            data.iloc[start:start + CHUNK_ROWS].to_csv(file, header=start == 0, index=False)
+            report(min(start + CHUNK_ROWS, len(data)))
+
+
+# Write a table to an Excel file (rows streamed to the sheet in chunks)
+def write_xlsx(data, path, report, title):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.append(list(data.columns))
+    for start in range(0, len(data), CHUNK_ROWS):
+        for row in data.iloc[start:start + CHUNK_ROWS].itertuples(index=False):
+            sheet.append([i.item() if isinstance(i, np.generic) else i for i in row])
+        report(min(start + CHUNK_ROWS, len(data)))
+    workbook.save(path)
+
+
+# ------------------------------------------------------------------------------------------------
+# JOBS SECTION
+
+# Run an export in the job process and return the name of the export file.
+# set_progress((percent, label)): progress of the background callback
+# years: years compared (comparison kinds), year / category: selected filters
+def run_export(set_progress, engine, kind, file_format, years, year, category):
+    os.nice(NICENESS)
+    title, group_column = KINDS[kind]
+    comparison = kind.startswith('comparison')
+    years = sorted(years or [], key=int) if comparison else [year]
+    if comparison and not years:
+        raise ValueError('Select the years to compare')
+
+    cache = diskcache.Cache(JOBS_DIR)
+    slot = acquire_slot(cache)
+    while slot is None:
+        set_progress((0, 'Waiting for a running export to finish'))
+        time.sleep(SLOT_POLL_INTERVAL)
+        slot = acquire_slot(cache)
+    try:
+        # Query: first half of the progress, writing: second half
+        set_progress((0, 'Querying'))
+        if comparison:
+            data = comparison_rows(engine, group_column, years, category,
+                                   lambda done: set_progress((50 * done // len(years), 'Querying')))
+        else:
+            data = breakdown_rows(engine, group_column, year, category)
+
+        def report_rows(rows):
+            set_progress((50 + 50 * rows // max(len(data), 1), f'Writing {rows:,} of {len(data):,} rows'))
+
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        remove_old_exports()
+        name = export_name(kind, years, category, file_format)
+        path = os.path.join(EXPORT_DIR, name)
+        # Written under a temporary name: the download link only exists once the file is complete
+        temporary = f'{path}.part'
+        if file_format == 'xlsx':
+            write_xlsx(data, temporary, report_rows, title)
+        else:
+            write_csv(data, temporary, report_rows)
+        os.replace(temporary, path)
+        set_progress((100, f'{len(data):,} rows'))
+        return name
+    finally:
+        release_slot(cache, slot)
+
+
+# ------------------------------------------------------------------------------------------------
+# ROUTES SECTION
+
+# Register the download route of the export files on the Flask server
+def register_routes(server):
+
+    @server.route(f'{ROUTE}/<path:name>', endpoint='exports_download')
+    def download(name):
+        return send_from_directory(os.path.abspath(EXPORT_DIR), name, as_attachment=True)
@@ -0,0 +1,157 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# FACT TABLES: normalized long-format model of the import data
+#
+# Every number of the dashboard is read from two fact tables built from the long CSV files:
+#     categories  one row per (Year, Food Category): Food Value and Food Volume
+#     countries   one row per (Year, Country, Category Type, Food Category): Food Value
+# The two tables have a different grain (the country detail only covers some categories and
+# doesn't add up to the category totals), so they are not mixed in one table.
+#
+# Years are stored as int16, text columns as categorical codes and the measures as float32,
+# already multiplied by the scale of the charts. The wide tables (one column per category,
+# totals and averages) are views derived from the categories table by the data layer.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+YEAR_COLUMN = 'Year'
+CATEGORY_COLUMN = 'Food Category'
+VALUE_COLUMN = 'Food Value'
+VOLUME_COLUMN = 'Food Volume'
+
+# Factor applied once to the measures of the CSV files (the charts show them x1000)
+SCALE = 1000
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Years as int16
+def year_values(column):
+    return column.to_numpy().astype(np.int16)
+
+
+# Measure multiplied by the chart scale, stored as float32
+def scaled_measure(column):
+    return (column.to_numpy(dtype=np.float64) * SCALE).astype(np.float32)
+
+
+# Categorical column, the categories keeping their existing order (order of first appearance
+# for a text column)
+def categorical(column, categories=None):
+    if categories is None:
+        categories = column.cat.categories if isinstance(column.dtype, pd.CategoricalDtype) else pd.unique(column)
+    return pd.Categorical(column, categories=categories)
+
+
+# ------------------------------------------------------------------------------------------------
+# FACT TABLES SECTION
+
+# Category facts from a table of their columns (Year, Food Category as text, scaled measures),
+# sorted by year and category
+def category_table(data, categories):
+    facts = pd.DataFrame({
+        YEAR_COLUMN: data[YEAR_COLUMN].to_numpy().astype(np.int16),
+        CATEGORY_COLUMN: pd.Categorical(data[CATEGORY_COLUMN], categories=categories),
+        VALUE_COLUMN: data[VALUE_COLUMN].to_numpy(dtype=np.float32),
+        VOLUME_COLUMN: data[VOLUME_COLUMN].to_numpy(dtype=np.float32),
+    })
+    return facts.sort_values([YEAR_COLUMN, CATEGORY_COLUMN], ignore_index=True)
+
+
+# Scaled rows of a long source table (Year, Food Category as text, one measure)
+def measure_rows(data, measure):
+    return pd.DataFrame({YEAR_COLUMN: year_values(data[YEAR_COLUMN]),
+                         CATEGORY_COLUMN: data[CATEGORY_COLUMN].astype(str).to_numpy(),
+                         measure: scaled_measure(data[measure])})
+
+
+# Category level facts from the long value and volume tables. The categories keep the order of
+# the value file (the order of the dropdown menu).
+def category_facts(food_value_categories, food_volume_categories):
+    value = measure_rows(food_value_categories, VALUE_COLUMN)
+    volume = measure_rows(food_volume_categories, VOLUME_COLUMN)
+    categories = list(pd.unique(pd.concat([value[CATEGORY_COLUMN], volume[CATEGORY_COLUMN]])))
+    return category_table(value.merge(volume, on=[YEAR_COLUMN, CATEGORY_COLUMN], how='outer'), categories)
+
+
+# Country level facts (the text columns keep their categorical codes)
+def country_facts(food_value_countries):
+    return pd.DataFrame({
+        column: year_values(values) if column == YEAR_COLUMN else
+        scaled_measure(values) if column == VALUE_COLUMN else categorical(values)
+        for column, values in food_value_countries.items()
+    })
+
+
+# Fact tables of the source tables loaded from the data directory
+def build_facts(tables):
+    return {
+        'categories': category_facts(tables['food_value_categories'], tables['food_volume_categories']),
+        'countries': country_facts(tables['food_value_countries']),
+    }
+
+
+# ------------------------------------------------------------------------------------------------
+# DATA CHANGES SECTION
+
+# Source table -> measure of the category facts it holds
+CATEGORY_SOURCES = {'food_value_categories': VALUE_COLUMN, 'food_volume_categories': VOLUME_COLUMN}
+
+
+# Category facts with the rows of one measure added or replaced (every row of that measure is
+# replaced when replace is True). The new categories are added after the existing ones.
+def upsert_category_facts(facts, measure, rows, replace=False):
+    keys = [YEAR_COLUMN, CATEGORY_COLUMN]
+    current = facts.astype({CATEGORY_COLUMN: str})
+    if replace:
+        current[measure] = np.nan
+    new = measure_rows(rows, measure)
+    data = current.merge(new, on=keys, how='outer', suffixes=('', ' (new)'))
+    data[measure] = data[f'{measure} (new)'].where(data[f'{measure} (new)'].notna(), data[measure])
+    data = data.loc[data[[VALUE_COLUMN, VOLUME_COLUMN]].notna().any(axis=1)]
+
+    categories = facts[CATEGORY_COLUMN].cat.categories.tolist()
+    categories += [i for i in pd.unique(new[CATEGORY_COLUMN]) if i not in categories]
+    categories = [i for i in categories if i in set(data[CATEGORY_COLUMN])]
+    return category_table(data, categories)
+
+
+# Country facts with new rows (the categorical columns keep the categories of both)
+def append_country_facts(facts, rows):
+    data = pd.concat([facts, country_facts(rows)], ignore_index=True)
+    return data.astype({column: 'category' for column in data.columns if column not in (YEAR_COLUMN, VALUE_COLUMN)})
+
+
+# New fact tables with the changes of the source tables applied (the current ones are left
+# untouched). changes: table name -> ('append', new rows) or ('reload', whole table)
+def update_facts(facts, changes):
+    facts = dict(facts)
+    for name, (kind, rows) in changes.items():
+        if name in CATEGORY_SOURCES:
+            facts['categories'] = upsert_category_facts(facts['categories'], CATEGORY_SOURCES[name], rows,
+                                                        replace=kind == 'reload')
+        elif kind == 'append':
+            facts['countries'] = append_country_facts(facts['countries'], rows)
+        else:
+            facts['countries'] = country_facts(rows)
+    return facts
+
+
+# ------------------------------------------------------------------------------------------------
+# DERIVED VIEWS SECTION
+
+# Wide view of a measure of the category facts: the years (ascending), the categories and a
+# (year x category) float64 matrix of the values (NaN where a combination has no row)
+def pivot(facts, measure):
+    years, year_index = np.unique(facts[YEAR_COLUMN].to_numpy(), return_inverse=True)
+    categories = facts[CATEGORY_COLUMN].cat.categories.tolist()
+    matrix = np.full((len(years), len(categories)), np.nan)
+    matrix[year_index, facts[CATEGORY_COLUMN].cat.codes.to_numpy()] = facts[measure].to_numpy()
+    return years, categories, matrix
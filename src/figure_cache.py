@@ -0,0 +1,120 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# FIGURE CACHE: memoized figures keyed on (graph id, year, category)
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import functools
+import json
+import threading
+
+import plotly.io as pio
+
+import metrics
+from cache_backends import DEFAULT_MAX_SIZE, MemoryBackend
+
+try:
+    import orjson
+except ImportError:  # optional: the Plotly JSON encoder is used instead
+    orjson = None
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Stored in place of a callback returning no figure
+NO_FIGURE = 'null'
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Serialize a figure (go.Figure, dict or None) to its JSON text. Plain figures are encoded
+# with orjson when installed (NumPy arrays natively), the Plotly JSON encoder is the fallback.
+def figure_to_json(figure):
+    if figure is None:
+        return NO_FIGURE
+    if orjson is not None and isinstance(figure, dict):
+        try:
+            return orjson.dumps(figure, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+        except TypeError:
+            # e.g. a NumPy array of Python objects
+            pass
+    return pio.to_json(figure, validate=False)
+
+
+# Parse a figure JSON text back to a plain figure
+def figure_from_json(figure_json):
+    return orjson.loads(figure_json) if orjson is not None else json.loads(figure_json)
+
+
+# Build the backend key of a (graph id, year, category) combination
+def cache_key(version, graph_id, year_input, category_input):
+    return f'{version}|{graph_id}|{year_input}|{category_input}'
+
+
+# ------------------------------------------------------------------------------------------------
+# FIGURE CACHE SECTION
+
+# Cache of serialized figures stored in a pluggable backend (see cache_backends.py).
+# A cached figure is returned as a plain dictionary so Dash neither rebuilds the Plotly
+# objects nor validates them again on a repeat view. With a disk or Redis backend a figure
+# built by one gunicorn worker is reused by all the others.
+# The version (the data content hash) is part of every key, so figures built from older
+# data are never served from a shared backend.
+class FigureCache:
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, backend=None, version=''):
+        self.backend = backend if backend is not None else MemoryBackend(max_size=max_size)
+        self.version = version
+        self._lock = threading.Lock()
+        # Counters (for the current process)
+        self.hits = 0
+        self.misses = 0
+
+    # Return the cached figure JSON for the key, or None if it is not cached
+    def get(self, key):
+        figure_json = self.backend.get(key)
+        with self._lock:
+            if figure_json is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return figure_json
+
+    # Store the figure JSON for the key
+    def set(self, key, figure_json):
+        self.backend.set(key, figure_json)
+
+    # Remove the cached figure of one (graph id, year, category) combination
+    def invalidate(self, graph_id, year_input, category_input):
+        self.backend.delete(cache_key(self.version, graph_id, year_input, category_input))
+
+    # Remove every cached figure
+    def clear(self):
+        self.backend.clear()
+
+    # Hit / miss counters and backend usage
+    def stats(self):
+        with self._lock:
+            counters = {'backend': self.backend.name, 'hits': self.hits, 'misses': self.misses}
+        counters.update(self.backend.stats())
+        return counters
+
+    # Decorator memoizing a figure callback taking (year_input, category_input)
+    def cached(self, graph_id):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(year_input, category_input):
+                key = cache_key(self.version, graph_id, year_input, category_input)
+                figure_json = self.get(key)
+                metrics.record_cache(graph_id, figure_json is not None)
+                if figure_json is None:
+                    figure = func(year_input, category_input)
+                    with metrics.stage('serialize'):
+                        figure_json = figure_to_json(figure)
+                    self.set(key, figure_json)
+                return figure_from_json(figure_json)
+
+            return wrapper
+
+        return decorator
@@ -0,0 +1,49 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# GUNICORN CONFIGURATION: server hooks of the dashboard
+#
+# Run from the src directory:
+#     gunicorn -c gunicorn.conf.py app:server
+#
+# DATA_STORE=shared: the master process loads the data once into shared memory before the
+# workers are started, the workers attach to it instead of loading their own copy.
+# --preload: the master creates the app and loads the data before forking the workers, which
+# start serving without any startup work (otherwise each worker loads the data on its first request).
+# Nothing started in the master survives the fork as is: each worker starts its own data watcher
+# thread (first request) and opens its own SQLite connections (figure cache, access counts).
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+import sys
+
+# The configuration is read before gunicorn changes to the --chdir directory
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SRC_DIR)
+
+import shared_store  # noqa: E402
+
+# Shared memory segment published by the master
+segment = None
+
+
+def on_starting(server):
+    global segment
+    if os.environ.get('DATA_STORE') == 'shared':
+        segment = shared_store.publish_data(os.path.join(SRC_DIR, 'data'))
+        # Inherited by the workers
+        os.environ[shared_store.SEGMENT_ENV] = segment.name
+        server.log.info('Data published in shared memory segment %s (%.1f MB)', segment.name, segment.size / 1e6)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        app.load_data()
+        app.serve_layout()
+
+
+def on_exit(server):
+    if segment is not None:
+        segment.close()
+        segment.unlink()
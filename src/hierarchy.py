@@ -0,0 +1,148 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# HIERARCHY: precomputed rollup of the country level data, Food Category -> Category Type -> Country
+#
+# The nodes are stored level by level and sorted by path, so the children of a node are a
+# contiguous slice of the next level (child_start, child_end) and the sums of every node are
+# computed once per year (and for every year) from the leaves. The children of a node, or the
+# nodes of a treemap, are then read by index lookup and slicing, whatever the number of rows.
+# Next to the categories, an 'All' branch adds up the types and countries of every category.
+#
+# Node ids are the paths of labels joined with '/' (e.g. 'Beverages/Wine/France').
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+
+from query_engine import PARTITION_COLUMN, YEAR_COLUMN
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Columns of the levels below the food category
+LEVEL_COLUMNS = ('Category Type', 'Country')
+MEASURE = 'Food Value'
+
+# Separator of the labels of a node id
+SEPARATOR = '/'
+
+
+# ------------------------------------------------------------------------------------------------
+# SUM TREE SECTION
+
+class SumTree:
+
+    # engine: query engine of the country level data (encoded columns and labels)
+    # all_label: label of the branch adding up every category (and of the every year row)
+    def __init__(self, engine, all_label):
+        self.all_label = all_label
+        years = engine.columns[YEAR_COLUMN]
+        values = engine.columns[MEASURE].astype(np.float64)
+        level_labels = [np.append(engine.categories, all_label)] + [engine.labels[i] for i in LEVEL_COLUMNS]
+
+        # Every row twice: in its category and in the 'All' branch (last category code)
+        all_code = len(engine.categories)
+        codes = [np.r_[engine.columns[PARTITION_COLUMN], np.full(len(years), all_code)].astype(np.int64)]
+        codes += [np.tile(engine.columns[i], 2).astype(np.int64) for i in LEVEL_COLUMNS]
+        self.year_labels = [str(i) for i in np.unique(years)] + [all_label]
+        self.year_index = {label: position for position, label in enumerate(self.year_labels)}
+        year_rows = np.tile(np.searchsorted(np.unique(years), years), 2)
+
+        # Nodes of each level: unique paths of codes (path key of a level = key of the parent
+        # level * number of labels + code), sorted by path
+        paths = []
+        path_key = np.zeros(len(year_rows), dtype=np.int64)
+        for depth, level_codes in enumerate(codes):
+            path_key = path_key * len(level_labels[depth]) + level_codes
+            level_paths, leaf_of_row = np.unique(path_key, return_inverse=True)
+            paths.append(level_paths)
+
+        ids, labels, parents = [], [], []
+        offset = 0
+        for depth, level_paths in enumerate(paths):
+            node_labels = level_labels[depth][level_paths % len(level_labels[depth])].astype(object)
+            if depth == 0:
+                node_ids = node_labels
+                node_parents = np.full(len(level_paths), -1, dtype=np.int64)
+            else:
+                parent_positions = np.searchsorted(paths[depth - 1], level_paths // len(level_labels[depth]))
+                node_ids = ids[-1][parent_positions] + SEPARATOR + node_labels
+                node_parents = offset - len(paths[depth - 1]) + parent_positions
+            ids.append(node_ids)
+            labels.append(node_labels)
+            parents.append(node_parents)
+            offset += len(level_paths)
+
+        self.ids = np.concatenate(ids)
+        self.labels = np.concatenate(labels)
+        self.parents = np.concatenate(parents)
+        self.parent_ids = np.where(self.parents >= 0, self.ids[np.maximum(self.parents, 0)], '')
+        self.node_index = {node_id: position for position, node_id in enumerate(self.ids)}
+        self.depths = np.concatenate([np.full(len(i), depth) for depth, i in enumerate(paths)])
+        level_starts = np.r_[0, np.cumsum([len(i) for i in paths])]
+
+        # The parents are sorted (level by level, then by path): children are contiguous slices
+        positions = np.arange(len(self.ids))
+        self.child_start = np.searchsorted(self.parents, positions, side='left')
+        self.child_end = np.searchsorted(self.parents, positions, side='right')
+
+        # Top level node (category or 'All') of every node
+        self.branches = positions.copy()
+        for depth in range(1, len(paths)):
+            level = slice(level_starts[depth], level_starts[depth + 1])
+            self.branches[level] = self.branches[self.parents[level]]
+
+        # Sums and row counts of every (year, node), the every year row last: leaves from the
+        # rows, the levels above from their children (contiguous, added up with reduceat)
+        leaves = len(paths[-1])
+        shape = (len(self.year_labels), len(self.ids))
+        self.sums = np.zeros(shape)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        flat = year_rows * leaves + leaf_of_row
+        self.sums[:-1, level_starts[-2]:] = np.bincount(flat, weights=np.tile(values, 2),
+                                                        minlength=(shape[0] - 1) * leaves).reshape(-1, leaves)
+        self.counts[:-1, level_starts[-2]:] = np.bincount(flat, minlength=(shape[0] - 1) * leaves).reshape(-1, leaves)
+        for depth in range(len(paths) - 2, -1, -1):
+            level = slice(level_starts[depth], level_starts[depth + 1])
+            children = slice(level_starts[depth + 1], level_starts[depth + 2])
+            starts = self.child_start[level] - level_starts[depth + 1]
+            self.sums[:-1, level] = np.add.reduceat(self.sums[:-1, children], starts, axis=1)
+            self.counts[:-1, level] = np.add.reduceat(self.counts[:-1, children], starts, axis=1)
+        self.sums[-1] = self.sums[:-1].sum(axis=0)
+        self.counts[-1] = self.counts[:-1].sum(axis=0)
+
+    # Row of a year (None for every year), None for a year without data
+    def year_row(self, year=None):
+        return self.year_index.get(self.all_label if year is None else str(year))
+
+    # Id of the node of a path of labels (category: None for the 'All' branch)
+    def node_id(self, category=None, *labels):
+        return SEPARATOR.join([self.all_label if category is None else category, *labels])
+
+    # Labels and sums of the children of a node present in the year (None for every year)
+    def children(self, node_id, year=None):
+        position = self.node_index.get(node_id)
+        row = self.year_row(year)
+        if position is None or row is None:
+            return np.zeros(0, dtype=object), np.zeros(0)
+        start, end = self.child_start[position], self.child_end[position]
+        present = self.counts[row, start:end] > 0
+        return self.labels[start:end][present], self.sums[row, start:end][present]
+
+    # Nodes of a treemap of one year / category (None: every year / every category, the categories
+    # below the 'All' node): ids, labels, parent ids ('' for the root) and sums
+    def treemap(self, year=None, category=None):
+        row = self.year_row(year)
+        root = self.node_index.get(self.node_id(category))
+        if root is None or row is None:
+            return {'ids': [], 'labels': [], 'parents': [], 'values': np.zeros(0)}
+        parents = self.parent_ids
+        if category is None:
+            selected = (self.branches != root) | (np.arange(len(self.ids)) == root)
+            # The categories are placed below the 'All' node
+            parents = np.where((self.depths == 0) & (np.arange(len(self.ids)) != root), self.ids[root], parents)
+        else:
+            selected = self.branches == root
+        selected &= self.counts[row] > 0
+        return {'ids': self.ids[selected].tolist(), 'labels': self.labels[selected].tolist(),
+                'parents': parents[selected].tolist(), 'values': self.sums[row, selected]}
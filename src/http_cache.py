@@ -0,0 +1,155 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# HTTP CACHING: cache headers, ETags and compression of the responses of the Dash server
+#
+#     assets (?v= / ?m= version)   cached for a year by browsers and proxies (immutable): the URL
+#                                  changes with the content (asset_url, Dash fingerprints)
+#     _dash-layout,                ETag of the content: If-None-Match answers 304
+#     _dash-dependencies
+#     _dash-update-component       ETag derived from the data version and the request body: the
+#                                  callbacks are deterministic, so If-None-Match answers 304
+#                                  before the callback runs (not for the background callbacks)
+# Text responses (page, layout, callbacks, scripts, styles) are compressed with brotli (brotli
+# package) or gzip when the client accepts it. The compressed scripts of the component suites
+# are kept in memory (their content never changes while the app runs).
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used instead
+    brotli = None
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# One year, the longest lifetime of the HTTP caches
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Smaller responses are sent as they are (compression would not save a network packet)
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compressed media types
+COMPRESSED_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson')
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Content encoding accepted by the client ('br', 'gzip' or None)
+def response_encoding():
+    offered = (['br'] if brotli is not None else []) + ['gzip']
+    accepted = [i for i in offered if request.accept_encodings[i] > 0]
+    return max(accepted, key=lambda i: request.accept_encodings[i], default=None)
+
+
+# Compress a content with an encoding of response_encoding()
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=GZIP_LEVEL)
+
+
+# Short hash of a file content
+def file_version(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:12]
+
+
+# URL of an asset of the app with its content version: the URL changes with the file, so the
+# asset can be cached forever
+def asset_url(app, path):
+    return f'{app.get_asset_url(path)}?v={file_version(os.path.join(app.config.assets_folder, path))}'
+
+
+# ------------------------------------------------------------------------------------------------
+# RESPONSES SECTION
+
+# Register the caching and compression of the responses on the Flask server of a Dash app.
+# get_version(): version of the data the callbacks currently read (content hash)
+def register_http_cache(app, get_version):
+    server = app.server
+    prefix = app.config.routes_pathname_prefix
+    assets_prefix = f'{prefix}{app.config.assets_url_path.strip("/")}/'
+    suites_prefix = f'{prefix}_dash-component-suites/'
+    callback_path = f'{prefix}_dash-update-component'
+    content_paths = {f'{prefix}_dash-layout', f'{prefix}_dash-dependencies'}
+
+    # (path, encoding) -> compressed component suite script
+    compressed_suites = {}
+    lock = threading.Lock()
+
+    # ETag of a callback request: same data and same inputs give the same response
+    def callback_etag():
+        return hashlib.sha256(get_version().encode('ascii') + request.get_data()).hexdigest()[:32]
+
+    # Callback request answered from the data and the inputs only: not the background callbacks
+    # (their responses are the state of a job, polled with the job in the query string)
+    def deterministic_callback():
+        if request.query_string:
+            return False
+        body = request.get_json(silent=True) or {}
+        return not app.callback_map.get(body.get('output'), {}).get('long')
+
+    @server.before_request
+    def answer_unchanged_callback():
+        if request.path == callback_path and request.if_none_match and deterministic_callback():
+            etag = callback_etag()
+            if request.if_none_match.contains_weak(etag):
+                response = server.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+        return None
+
+    def compressed_body(response, encoding):
+        if not request.path.startswith(suites_prefix):
+            return compress(response.get_data(), encoding)
+        key = (request.full_path, encoding)
+        with lock:
+            body = compressed_suites.get(key)
+        if body is None:
+            body = compress(response.get_data(), encoding)
+            with lock:
+                compressed_suites[key] = body
+        return body
+
+    @server.after_request
+    def cache_and_compress(response):
+        if response.status_code != 200:
+            return response
+
+        if request.path.startswith(assets_prefix) and ('v' in request.args or 'm' in request.args):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        elif request.path in content_paths:
+            response.add_etag(weak=True)
+            response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+            response.make_conditional(request)
+            if response.status_code != 200:
+                return response
+        elif request.path == callback_path and deterministic_callback():
+            response.set_etag(callback_etag(), weak=True)
+            response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+
+        # Compression of the text responses (files are read, generated streams are left alone)
+        encoding = response_encoding()
+        if encoding is None or 'Content-Encoding' in response.headers or \
+                not response.mimetype.startswith(COMPRESSED_TYPES) or \
+                (response.is_streamed and not response.direct_passthrough):
+            return response
+        response.direct_passthrough = False
+        if len(response.get_data()) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compressed_body(response, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,261 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# METRICS: callback latency instrumentation exposed in the Prometheus text format on /metrics
+#
+# Stages recorded for a callback:
+#   figure    - Plotly figure construction (the plot functions of app.py)
+#   serialize - figure JSON serialization (figure cache misses)
+#   data      - the rest of the callback (aggregate lookups, overview formatting)
+#   total     - the whole callback
+# METRICS_SAMPLE_RATE (0 to 1, default 1) sets the share of the callbacks that are timed,
+# the counters are always updated.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, request
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Histogram buckets (seconds and bytes)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BYTES_BUCKETS = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000)
+
+# Share of the callbacks that are timed
+SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1.0))
+
+# Dash endpoint answering the server callbacks
+CALLBACK_PATH = '/_dash-update-component'
+
+
+# ------------------------------------------------------------------------------------------------
+# METRIC TYPES SECTION
+
+# Escape a label value for the Prometheus text format
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Render a set of labels ({name="value",...})
+def render_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+# Counter with labels
+class Counter:
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[i] for i in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{render_labels(zip(self.label_names, key))} {value}')
+        return lines
+
+
+# Gauge with labels (last value set)
+class Gauge:
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(labels[i] for i in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{render_labels(zip(self.label_names, key))} {value}')
+        return lines
+
+
+# Histogram with labels (cumulative buckets, sum and count)
+class Histogram:
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[i] for i in self.label_names)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts['buckets'][position] += 1
+            counts['sum'] += value
+            counts['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, counts in sorted(self._values.items()):
+                labels = list(zip(self.label_names, key))
+                for bound, count in zip(self.buckets, counts['buckets']):
+                    lines.append(f'{self.name}_bucket{render_labels(labels + [("le", bound)])} {count}')
+                lines.append(f'{self.name}_bucket{render_labels(labels + [("le", "+Inf")])} {counts["count"]}')
+                lines.append(f'{self.name}_sum{render_labels(labels)} {counts["sum"]}')
+                lines.append(f'{self.name}_count{render_labels(labels)} {counts["count"]}')
+        return lines
+
+
+# ------------------------------------------------------------------------------------------------
+# METRICS SECTION
+
+CALLBACK_SECONDS = Histogram('dashboard_callback_seconds', 'Time spent in the dashboard callbacks per stage',
+                             ['callback', 'stage'], SECONDS_BUCKETS)
+CALLBACK_CALLS = Counter('dashboard_callback_calls_total', 'Dashboard callback calls per filter combination',
+                         ['callback', 'year', 'category'])
+FIGURE_CACHE = Counter('dashboard_figure_cache_total', 'Figure cache lookups', ['graph', 'result'])
+REQUEST_SECONDS = Histogram('dashboard_request_seconds', 'Time spent answering the callback requests',
+                            ['output'], SECONDS_BUCKETS)
+RESPONSE_BYTES = Histogram('dashboard_response_bytes', 'Size of the callback responses', ['output'],
+                           BYTES_BUCKETS)
+CALLBACK_COALESCED = Counter('dashboard_callback_coalesced_total',
+                             'Callback requests answered with the response of an identical request in flight',
+                             ['output'])
+CALLBACK_DROPPED = Counter('dashboard_callback_dropped_total',
+                           'Callback requests dropped, superseded by a newer request of the same tab', ['output'])
+CALLBACK_REJECTED = Counter('dashboard_callback_rejected_total',
+                            'Callback requests rejected after waiting for a free slot', ['output'])
+
+WARMUP_FIGURES = Gauge('dashboard_warmup_figures', 'Figures of the cache warm-up (total, built, cached)', ['state'])
+WARMUP_SECONDS = Gauge('dashboard_warmup_seconds', 'Duration of the cache warm-up', [])
+API_REQUESTS = Counter('dashboard_api_requests_total', 'Data API requests per route and status', ['route', 'status'])
+STARTUP_SECONDS = Gauge('dashboard_startup_seconds', 'Duration of the startup phases of the worker', ['phase'])
+
+REGISTRY = [CALLBACK_SECONDS, CALLBACK_CALLS, FIGURE_CACHE, REQUEST_SECONDS, RESPONSE_BYTES, CALLBACK_COALESCED,
+            CALLBACK_DROPPED, CALLBACK_REJECTED, WARMUP_FIGURES, WARMUP_SECONDS, API_REQUESTS, STARTUP_SECONDS]
+
+# Stage timings of the callback running in the current request (None when not sampled)
+_current_stages = contextvars.ContextVar('current_stages', default=None)
+
+
+# ------------------------------------------------------------------------------------------------
+# INSTRUMENTATION SECTION
+
+# Time a stage of the running callback
+@contextmanager
+def stage(name):
+    stages = _current_stages.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+# Decorator timing a function as a stage of the running callback
+def timed_stage(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# Count a figure cache lookup
+def record_cache(graph_id, hit):
+    FIGURE_CACHE.inc(graph=graph_id, result='hit' if hit else 'miss')
+
+
+# Decorator instrumenting a callback taking (year_input, category_input, *state values)
+def instrument(callback_name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(year_input, category_input, *state):
+            CALLBACK_CALLS.inc(callback=callback_name, year=year_input, category=category_input)
+            # Nested or not sampled: no timing
+            if _current_stages.get() is not None or random.random() >= SAMPLE_RATE:
+                return func(year_input, category_input, *state)
+
+            stages = {}
+            token = _current_stages.set(stages)
+            start = time.perf_counter()
+            try:
+                return func(year_input, category_input, *state)
+            finally:
+                total = time.perf_counter() - start
+                _current_stages.reset(token)
+                stages['data'] = max(total - sum(stages.values()), 0.0)
+                stages['total'] = total
+                for name, seconds in stages.items():
+                    CALLBACK_SECONDS.observe(seconds, callback=callback_name, stage=name)
+
+        return wrapper
+
+    return decorator
+
+
+# Render every metric in the Prometheus text format
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Add the /metrics route and the request / response size measures to the Flask server
+def register_metrics(server):
+
+    @server.before_request
+    def start_timer():
+        if request.path == CALLBACK_PATH:
+            request.environ['dashboard.start'] = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        start = request.environ.get('dashboard.start')
+        if start is not None and random.random() < SAMPLE_RATE:
+            body = request.get_json(silent=True) or {}
+            output = body.get('output', '')
+            REQUEST_SECONDS.observe(time.perf_counter() - start, output=output)
+            if not response.direct_passthrough:
+                RESPONSE_BYTES.observe(response.calculate_content_length() or 0, output=output)
+        return response
+
+    @server.route('/metrics')
+    def metrics_route():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
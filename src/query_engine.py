@@ -0,0 +1,189 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# QUERY ENGINE: indexed storage of the country level import data
+#
+# The rows are sorted and partitioned by (Year, Food Category). Text columns are dictionary
+# encoded (integer codes + labels) and, for every partition, the sums of each measure per
+# group (Country, Category Type, ...) are computed once when the engine is built.
+# A breakdown query then adds up the pre-built vectors of the selected partitions, so its
+# cost depends on the number of partitions and groups, not on the number of rows. This keeps
+# the country / category type charts fast on the full (year, month, country, HS code) detail.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Columns the rows are partitioned by
+YEAR_COLUMN = 'Year'
+PARTITION_COLUMN = 'Food Category'
+
+# Default group columns and measures of the countries table
+GROUP_COLUMNS = ('Country', 'Category Type')
+MEASURES = ('Food Value',)
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Dictionary encode a column: integer codes and the sorted labels they refer to
+def encode(column):
+    if isinstance(column.dtype, pd.CategoricalDtype) and column.cat.categories.is_monotonic_increasing:
+        return column.cat.codes.to_numpy(), column.cat.categories.to_numpy(dtype=object)
+    codes, labels = pd.factorize(column, sort=True)
+    return codes, np.asarray(labels, dtype=object)
+
+
+# Smallest unsigned integer type able to store the codes
+def code_dtype(size):
+    return np.min_scalar_type(max(size - 1, 0))
+
+
+# ------------------------------------------------------------------------------------------------
+# QUERY ENGINE SECTION
+
+class QueryEngine:
+
+    def __init__(self, data, group_columns=GROUP_COLUMNS, measures=MEASURES):
+        self.group_columns = list(group_columns)
+        self.measures = list(measures)
+
+        # Dictionary encoding of the partition and group columns
+        years = data[YEAR_COLUMN].to_numpy().astype(np.int32)
+        category_codes, self.categories = encode(data[PARTITION_COLUMN])
+        self.category_index = {label: code for code, label in enumerate(self.categories)}
+        self.labels = {}
+        group_codes = {}
+        for column in self.group_columns:
+            codes, self.labels[column] = encode(data[column])
+            group_codes[column] = codes
+
+        # Sort the rows by (Year, Food Category) so every partition is a contiguous slice
+        order = np.lexsort((category_codes, years))
+        years = years[order]
+        category_codes = category_codes[order]
+        self.columns = {YEAR_COLUMN: years,
+                        PARTITION_COLUMN: category_codes.astype(code_dtype(len(self.categories)))}
+        for column in self.group_columns:
+            self.columns[column] = group_codes[column][order].astype(code_dtype(len(self.labels[column])))
+        # The measures keep their dtype (float32 in the fact tables), the sums are float64
+        for measure in self.measures:
+            self.columns[measure] = data[measure].to_numpy()[order]
+
+        # Partition boundaries (start of each partition and end of the last one)
+        partition_keys = years.astype(np.int64) * max(len(self.categories), 1) + category_codes
+        starts = np.flatnonzero(np.r_[True, partition_keys[1:] != partition_keys[:-1]]) if len(years) else \
+            np.zeros(0, dtype=np.int64)
+        self.bounds = np.r_[starts, len(years)]
+        self.partition_year = years[starts]
+        self.partition_category = category_codes[starts]
+        self.partition_index = {(int(year), int(category)): position for position, (year, category)
+                                in enumerate(zip(self.partition_year, self.partition_category))}
+        partition_ids = np.repeat(np.arange(len(starts)), np.diff(self.bounds))
+
+        # Pre-built index: sums of every measure and row counts per (partition, group)
+        self.sums = {}
+        self.counts = {}
+        for column in self.group_columns:
+            size = len(self.labels[column])
+            flat = partition_ids * size + self.columns[column]
+            self.counts[column] = np.bincount(flat, minlength=len(starts) * size).reshape(len(starts), size)
+            for measure in self.measures:
+                self.sums[(column, measure)] = np.bincount(
+                    flat, weights=self.columns[measure], minlength=len(starts) * size).reshape(len(starts), size)
+
+    # Numeric arrays of the engine (name -> array) and the metadata needed to restore it (labels, columns)
+    def to_arrays(self):
+        arrays = {'bounds': self.bounds, 'partition_year': self.partition_year,
+                  'partition_category': self.partition_category}
+        for column, values in self.columns.items():
+            arrays[f'column/{column}'] = values
+        for column, values in self.counts.items():
+            arrays[f'counts/{column}'] = values
+        for (column, measure), values in self.sums.items():
+            arrays[f'sums/{column}/{measure}'] = values
+        meta = {'group_columns': self.group_columns, 'measures': self.measures,
+                'categories': self.categories.tolist(),
+                'labels': {column: labels.tolist() for column, labels in self.labels.items()}}
+        return arrays, meta
+
+    # Restore an engine from to_arrays() without copying the arrays (they may be read only views)
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        engine = cls.__new__(cls)
+        engine.group_columns = list(meta['group_columns'])
+        engine.measures = list(meta['measures'])
+        engine.categories = np.asarray(meta['categories'], dtype=object)
+        engine.category_index = {label: code for code, label in enumerate(engine.categories)}
+        engine.labels = {column: np.asarray(labels, dtype=object) for column, labels in meta['labels'].items()}
+        engine.columns = {YEAR_COLUMN: arrays[f'column/{YEAR_COLUMN}'],
+                          PARTITION_COLUMN: arrays[f'column/{PARTITION_COLUMN}']}
+        for column in engine.group_columns + engine.measures:
+            engine.columns[column] = arrays[f'column/{column}']
+        engine.bounds = arrays['bounds']
+        engine.partition_year = arrays['partition_year']
+        engine.partition_category = arrays['partition_category']
+        engine.partition_index = {(int(year), int(category)): position for position, (year, category)
+                                  in enumerate(zip(engine.partition_year, engine.partition_category))}
+        engine.counts = {column: arrays[f'counts/{column}'] for column in engine.group_columns}
+        engine.sums = {(column, measure): arrays[f'sums/{column}/{measure}']
+                       for column in engine.group_columns for measure in engine.measures}
+        return engine
+
+    def __len__(self):
+        return int(self.bounds[-1])
+
+    # Partitions matching the filters (None selects every year / every category)
+    def select_partitions(self, year=None, category=None):
+        selected = np.ones(len(self.partition_year), dtype=bool)
+        if year is not None:
+            selected &= self.partition_year == int(year)
+        if category is not None:
+            code = self.category_index.get(category)
+            if code is None:
+                return np.zeros(len(self.partition_year), dtype=bool)
+            selected &= self.partition_category == code
+        return selected
+
+    # Sum of a measure per group for the matching rows, as arrays (group codes, sums).
+    # Only the groups with at least one matching row are returned.
+    def group_sums(self, group_column, measure, year=None, category=None):
+        selected = self.select_partitions(year, category)
+        counts = self.counts[group_column][selected].sum(axis=0)
+        sums = self.sums[(group_column, measure)][selected].sum(axis=0)
+        codes = np.flatnonzero(counts)
+        return codes, sums[codes]
+
+    # Breakdown of a measure per group (columns: group_column, measure) sorted in ascending
+    # order, top_n / others_label: see top_groups
+    def group_by(self, group_column, measure, year=None, category=None, top_n=None, others_label=None):
+        codes, sums = self.group_sums(group_column, measure, year, category)
+        return top_groups(self.labels[group_column][codes], sums, group_column, measure, top_n, others_label)
+
+
+# ------------------------------------------------------------------------------------------------
+# BREAKDOWN SECTION
+
+# Breakdown table of group sums (labels, sums) sorted in ascending order. With top_n only the
+# top_n largest groups are returned, selected with a partial selection (linear in the number of
+# groups, only the top_n rows are sorted). With others_label the remaining groups are added up in
+# one row placed first (at the bottom of a horizontal bar chart).
+def top_groups(labels, sums, group_column, measure, top_n=None, others_label=None):
+    others = None
+    if top_n is not None and top_n < len(sums):
+        cut = len(sums) - top_n
+        partition = np.argpartition(sums, cut - 1)
+        top, rest = partition[cut:], partition[:cut]
+        others = sums[rest].sum()
+        labels, sums = labels[top], sums[top]
+
+    # Sorted before the frame is built (same order and index as DataFrame.sort_values)
+    order = np.argsort(sums, kind='quicksort')
+    result = pd.DataFrame({group_column: labels[order], measure: sums[order]}, index=order)
+    if others is not None and others_label is not None:
+        result = pd.concat([pd.DataFrame({group_column: [others_label], measure: [others]}), result],
+                           ignore_index=True)
+    return result
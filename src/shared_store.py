@@ -0,0 +1,154 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# SHARED STORE: typed column buffers published once in shared memory for every gunicorn worker
+#
+# Run gunicorn with the configuration of the src directory:
+#     DATA_STORE=shared gunicorn -c gunicorn.conf.py app:server
+#
+# The master process loads the fact tables and builds the query engine index, then copies every
+# numeric array into a single shared memory segment. The workers attach to the segment and
+# build their DataFrames on read only views of it (no copy), so the memory used by the data
+# stays the same whatever the number of workers.
+#
+# Segment layout: a header (offset and size of the manifest), the arrays (64 bytes aligned),
+# then the manifest (JSON: dtype, shape and offset of each array, categories, load report).
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import json
+import logging
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from query_engine import QueryEngine
+from snapshot import load_facts
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Environment variable holding the segment name (set by the gunicorn master, read by the workers)
+SEGMENT_ENV = 'SHARED_STORE'
+
+# Header: offset and size of the manifest
+HEADER = struct.Struct('<QQ')
+ALIGNMENT = 64
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Round up an offset to the alignment of the arrays
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Split the tables into numeric arrays (categorical columns as codes) and their description
+def table_arrays(tables):
+    arrays = {}
+    meta = {}
+    for name, data in tables.items():
+        columns = []
+        for position, column in enumerate(data.columns):
+            key = f'table/{name}/{position}'
+            entry = {'name': column, 'array': key}
+            if isinstance(data[column].dtype, pd.CategoricalDtype):
+                arrays[key] = data[column].cat.codes.to_numpy()
+                entry['categories'] = data[column].cat.categories.tolist()
+            else:
+                arrays[key] = data[column].to_numpy()
+            columns.append(entry)
+        meta[name] = columns
+    return arrays, meta
+
+
+# Build the DataFrames back from the arrays (no copy of the arrays)
+def tables_from_arrays(arrays, meta):
+    tables = {}
+    for name, columns in meta.items():
+        data = {}
+        for entry in columns:
+            values = arrays[entry['array']]
+            if 'categories' in entry:
+                values = pd.Categorical.from_codes(values, categories=entry['categories'])
+            data[entry['name']] = values
+        # copy=False also keeps every column in its own block (no consolidation copy)
+        tables[name] = pd.DataFrame(data, copy=False)
+    return tables
+
+
+# ------------------------------------------------------------------------------------------------
+# SHARED MEMORY SECTION
+
+# Copy the arrays into a new shared memory segment. meta (JSON) is stored with them.
+# The caller owns the returned segment and unlinks it when the workers are stopped.
+def publish(arrays, meta):
+    entries = {}
+    offset = align(HEADER.size)
+    for key, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        entries[key] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset = align(offset + values.nbytes)
+    manifest = json.dumps({'arrays': entries, 'meta': meta}).encode('utf-8')
+
+    segment = shared_memory.SharedMemory(create=True, size=offset + len(manifest))
+    HEADER.pack_into(segment.buf, 0, offset, len(manifest))
+    segment.buf[offset:offset + len(manifest)] = manifest
+    for key, values in arrays.items():
+        entry = entries[key]
+        target = np.ndarray(entry['shape'], dtype=entry['dtype'], buffer=segment.buf, offset=entry['offset'])
+        target[...] = values
+        del target
+    return segment
+
+
+# Attach to a published segment. Returns the segment (keep a reference while the arrays are
+# used), the arrays as read only views and the metadata.
+def attach(name):
+    segment = shared_memory.SharedMemory(name=name)
+    offset, size = HEADER.unpack_from(segment.buf, 0)
+    manifest = json.loads(bytes(segment.buf[offset:offset + size]))
+
+    arrays = {}
+    for key, entry in manifest['arrays'].items():
+        values = np.ndarray(entry['shape'], dtype=entry['dtype'], buffer=segment.buf, offset=entry['offset'])
+        values.flags.writeable = False
+        arrays[key] = values
+    return segment, arrays, manifest['meta']
+
+
+# ------------------------------------------------------------------------------------------------
+# DASHBOARD DATA SECTION
+
+# Load the fact tables, build the query engine of the country facts and publish both
+def publish_data(data_dir='data'):
+    start = time.perf_counter()
+    facts, report = load_facts(data_dir)
+    engine = QueryEngine(facts['countries'])
+
+    arrays, fact_meta = table_arrays(facts)
+    engine_arrays, engine_meta = engine.to_arrays()
+    arrays.update({f'engine/{key}': values for key, values in engine_arrays.items()})
+    report = {'content_hash': report['content_hash'], 'sources': report['sources']}
+    segment = publish(arrays, {'facts': fact_meta, 'engine': engine_meta, 'report': report})
+
+    logger.info('Published %.1f MB of data in shared memory segment %s in %.1f ms',
+                segment.size / 1e6, segment.name, (time.perf_counter() - start) * 1000)
+    return segment
+
+
+# Attach to the published data. Returns the fact tables, the query engine, the load report and
+# the segment (keep a reference to it while the data is used).
+def attach_data(name):
+    start = time.perf_counter()
+    segment, arrays, meta = attach(name)
+    facts = tables_from_arrays(arrays, meta['facts'])
+    engine = QueryEngine.from_arrays({key[len('engine/'):]: values for key, values in arrays.items()
+                                      if key.startswith('engine/')}, meta['engine'])
+    report = dict(meta['report'], source='shared memory', seconds=time.perf_counter() - start)
+    return facts, engine, report, segment
@@ -0,0 +1,222 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA SNAPSHOT: fact tables built from the CSV files, memory mapped at startup
+#
+# Build the snapshot (from the src directory):
+#     python snapshot.py
+#
+# Every column of the fact tables (see facts.py) is stored as a .npy file with its final dtype:
+# int16 years, float32 measures already scaled, categorical codes of the text columns. The
+# columns are memory mapped and used as they are, without conversion or copy. The manifest
+# records the dtypes, the categories and the SHA-256 of each CSV file, so a snapshot older
+# than its CSV files is never used.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from facts import build_facts
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Table name -> CSV file of the data directory. Only the long files are read: the wide files
+# (one column per category) hold the same numbers and are derived from the fact tables.
+TABLES = {
+    'food_value_categories': 'us_food_imports_food_value_categories.csv',
+    'food_volume_categories': 'us_food_imports_food_volume_categories.csv',
+    'food_value_countries': 'countries.csv',
+}
+
+# Text columns stored as categorical codes
+CATEGORICAL_COLUMNS = ['Country', 'Category Type', 'Food Category']
+
+# Snapshot location inside the data directory
+SNAPSHOT_DIR = 'snapshot'
+MANIFEST_FILE = 'manifest.json'
+SNAPSHOT_VERSION = 3
+
+# Fact tables stored in the snapshot
+FACT_TABLES = ('categories', 'countries')
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# SHA-256 of a file's content
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Size, modification time and content hash of a source CSV file
+def source_info(path):
+    status = os.stat(path)
+    return {'size': status.st_size, 'mtime_ns': status.st_mtime_ns, 'sha256': file_hash(path)}
+
+
+# Check a source file against the manifest (the hash is only computed when size or mtime changed)
+def source_is_current(path, recorded):
+    if not os.path.exists(path):
+        return False
+    status = os.stat(path)
+    if status.st_size == recorded['size'] and status.st_mtime_ns == recorded['mtime_ns']:
+        return True
+    return status.st_size == recorded['size'] and file_hash(path) == recorded['sha256']
+
+
+# Combined hash of every source file (identifies the data version of the snapshot)
+def content_hash(sources):
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(name.encode('utf-8'))
+        digest.update(sources[name]['sha256'].encode('ascii'))
+    return digest.hexdigest()
+
+
+# Convert a table read from CSV to the snapshot dtypes (categorical text columns, smallest integer type)
+def apply_dtypes(data):
+    for column in data.columns:
+        if column in CATEGORICAL_COLUMNS:
+            data[column] = data[column].astype('category')
+        elif pd.api.types.is_integer_dtype(data[column]):
+            data[column] = pd.to_numeric(data[column], downcast='integer')
+    return data
+
+
+# Read one CSV file with the snapshot dtypes
+def read_typed_csv(path):
+    return apply_dtypes(pd.read_csv(path))
+
+
+# Read every table from the CSV files
+def read_csv_tables(data_dir):
+    return {name: read_typed_csv(os.path.join(data_dir, file)) for name, file in TABLES.items()}
+
+
+# ------------------------------------------------------------------------------------------------
+# BUILD SECTION
+
+# Convert the CSV files of the data directory into a snapshot of the fact tables and return its manifest
+def build_snapshot(data_dir='data', snapshot_dir=None):
+    snapshot_dir = snapshot_dir or os.path.join(data_dir, SNAPSHOT_DIR)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    sources = {file: source_info(os.path.join(data_dir, file)) for file in TABLES.values()}
+    facts = build_facts(read_csv_tables(data_dir))
+
+    manifest = {'version': SNAPSHOT_VERSION, 'sources': sources, 'tables': {}}
+    for name, data in facts.items():
+        columns = []
+        for position, column in enumerate(data.columns):
+            column_file = f'{name}.{position}.npy'
+            entry = {'name': column, 'file': column_file}
+            if isinstance(data[column].dtype, pd.CategoricalDtype):
+                values = data[column].cat.codes.to_numpy()
+                entry['categories'] = data[column].cat.categories.tolist()
+            else:
+                values = data[column].to_numpy()
+            entry['dtype'] = values.dtype.str
+            np.save(os.path.join(snapshot_dir, column_file), values, allow_pickle=False)
+            columns.append(entry)
+
+        manifest['tables'][name] = {'rows': len(data), 'columns': columns}
+
+    manifest['content_hash'] = content_hash(manifest['sources'])
+
+    # Write the manifest last so a partially written snapshot is never loaded
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    return manifest
+
+
+# ------------------------------------------------------------------------------------------------
+# LOAD SECTION
+
+# Read the manifest of a snapshot, or None if the snapshot is missing, outdated or stale
+def read_manifest(data_dir='data', snapshot_dir=None):
+    snapshot_dir = snapshot_dir or os.path.join(data_dir, SNAPSHOT_DIR)
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+
+    if manifest.get('version') != SNAPSHOT_VERSION or set(manifest['tables']) != set(FACT_TABLES):
+        return None
+    for file, recorded in manifest['sources'].items():
+        if not source_is_current(os.path.join(data_dir, file), recorded):
+            return None
+
+    return manifest
+
+
+# Load the fact tables of a snapshot. The column files are memory mapped (read only) and used
+# in place: the dtypes are already the final ones and the categorical codes are wrapped as they are.
+def load_snapshot(manifest, snapshot_dir):
+    facts = {}
+    for name, table in manifest['tables'].items():
+        columns = {}
+        for entry in table['columns']:
+            values = np.load(os.path.join(snapshot_dir, entry['file']), mmap_mode='r', allow_pickle=False)
+            if 'categories' in entry:
+                values = pd.Categorical.from_codes(values, categories=entry['categories'])
+            columns[entry['name']] = values
+        facts[name] = pd.DataFrame(columns, copy=False)
+    return facts
+
+
+# Load the fact tables from the snapshot when it is current, otherwise build them from the CSV
+# files (the source tables are not kept). Returns the fact tables and a report of the load
+# (source, content hash, source files, load time in seconds).
+def load_facts(data_dir='data', snapshot_dir=None):
+    snapshot_dir = snapshot_dir or os.path.join(data_dir, SNAPSHOT_DIR)
+    start = time.perf_counter()
+
+    manifest = read_manifest(data_dir, snapshot_dir)
+    if manifest is not None:
+        facts = load_snapshot(manifest, snapshot_dir)
+        report = {'source': 'snapshot', 'content_hash': manifest['content_hash'], 'sources': manifest['sources']}
+    else:
+        facts = build_facts(read_csv_tables(data_dir))
+        sources = {file: source_info(os.path.join(data_dir, file)) for file in TABLES.values()}
+        report = {'source': 'csv', 'content_hash': content_hash(sources), 'sources': sources}
+
+    report['seconds'] = time.perf_counter() - start
+    logger.info('Loaded the data from %s in %.1f ms', report['source'], report['seconds'] * 1000)
+    return facts, report
+
+
+# ------------------------------------------------------------------------------------------------
+# COMMAND LINE SECTION
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the columnar data snapshot from the CSV files')
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--snapshot-dir', default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = build_snapshot(args.data_dir, args.snapshot_dir)
+    print(f"Snapshot {snapshot['content_hash'][:12]} built in {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    load_facts(args.data_dir, args.snapshot_dir)
+    print(f'Snapshot loaded in {time.perf_counter() - start:.3f}s')
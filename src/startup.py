@@ -0,0 +1,81 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# STARTUP TIMING: duration of the startup phases of a worker, exposed on /metrics and logged
+#
+# Phases (seconds):
+#     import         import of app.py and of the packages it needs
+#     create_app     Dash app, routes, callbacks and validation layout (create_app)
+#     data           fact tables loaded from the snapshot / CSV files or the shared memory
+#     cube           aggregates of every (year, category) combination
+#     layout         layout built and serialized (last build)
+#     warmup         figure cache warm-up (FIGURE_WARMUP)
+#     first_request  from the start of the import to the end of the first request served
+# Only stdlib modules are imported here: app.py imports this module first, so the clock starts
+# before the heavy imports.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Start of the startup clock (import of this module)
+STARTED = time.perf_counter()
+
+# Phase name -> duration in seconds, in the order they ended
+phases = {}
+_lock = threading.Lock()
+
+
+# ------------------------------------------------------------------------------------------------
+# PHASES SECTION
+
+# Record the duration of a phase (also exposed on /metrics)
+def record(name, seconds):
+    import metrics  # imports flask, after the clock started
+    with _lock:
+        phases[name] = seconds
+    metrics.STARTUP_SECONDS.set(seconds, phase=name)
+
+
+# Time a phase
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+# Seconds since the clock started
+def elapsed():
+    return time.perf_counter() - STARTED
+
+
+# One line breakdown of the recorded phases (milliseconds)
+def summary():
+    with _lock:
+        return ', '.join(f'{name} {seconds * 1000:.1f} ms' for name, seconds in phases.items())
+
+
+# Record the first_request phase at the end of the first request served by the Flask server
+def register_first_request(server):
+    done = []
+
+    @server.after_request
+    def first_request(response):
+        if not done:
+            with _lock:
+                if done:
+                    return response
+                done.append(True)
+            record('first_request', elapsed())
+            logger.info('Startup: %s', summary())
+        return response
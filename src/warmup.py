@@ -0,0 +1,175 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# CACHE WARM-UP: figures of the filter combinations built before a worker serves traffic
+#
+# FIGURE_WARMUP: 'all' (every combination), 'top:<N>' (the N combinations requested the most
+#     according to the access statistics) or unset (no warm-up)
+# FIGURE_WARMUP_WORKERS: processes building the figures (default: number of CPUs)
+# ACCESS_STATS: SQLite file where the requested combinations are counted (unset: not recorded)
+#
+# The figures are built in a pool of processes forked from the worker, then stored in the
+# figure cache of the worker. With a disk or Redis backend the figures already cached by
+# another worker are not built again.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import atexit
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+from figure_cache import cache_key, figure_to_json
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Chunks of figures per pool process (smaller chunks give a finer progress)
+CHUNKS_PER_WORKER = 4
+
+# Seconds between two writes of the access counts
+FLUSH_INTERVAL = 30.0
+
+
+# ------------------------------------------------------------------------------------------------
+# ACCESS STATISTICS SECTION
+
+# Number of requests of each (year, category) combination. The counts are kept in memory and added
+# to a SQLite file shared by every worker at most every flush_interval seconds, and at exit.
+class AccessStats:
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flushed = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS access (year TEXT NOT NULL, category TEXT NOT NULL, '
+                               'count INTEGER NOT NULL, PRIMARY KEY (year, category))')
+        atexit.register(self.flush)
+
+    # One connection per thread and per process: sqlite3 connections can't be shared between threads,
+    # nor used on both sides of a fork. A worker forked by gunicorn --preload opens its own connection
+    # and keeps the one of the master referenced, unused (closing it could touch the master's files).
+    def _connection(self):
+        connections = self._local.__dict__.setdefault('connections', {})
+        connection = connections.get(os.getpid())
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connections[os.getpid()] = connection
+        return connection
+
+    # Count a request of a combination
+    def record(self, year_input, category_input):
+        key = (year_input, category_input)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    # Add the counts kept in memory to the file
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        with self._connection() as connection:
+            connection.executemany('INSERT INTO access (year, category, count) VALUES (?, ?, ?) '
+                                   'ON CONFLICT (year, category) DO UPDATE SET count = count + excluded.count',
+                                   [(year, category, count) for (year, category), count in pending.items()])
+
+    # The n combinations requested the most, most requested first
+    def top(self, n):
+        self.flush()
+        rows = self._connection().execute('SELECT year, category FROM access ORDER BY count DESC, year, category '
+                                          'LIMIT ?', (n,)).fetchall()
+        return [tuple(i) for i in rows]
+
+
+# ------------------------------------------------------------------------------------------------
+# WARM-UP SECTION
+
+# Figure functions of the app (graph id -> cached figure function), set before the pool forks
+_figure_functions = {}
+
+
+# Combinations to warm up for a FIGURE_WARMUP setting. 'top:<N>' is completed with the
+# combinations of the filters in their order ('All' first) when less than N have been recorded.
+def warmup_combinations(setting, years, categories, access_stats=None):
+    combinations = [(year, category) for year in years for category in categories]
+    if setting == 'all':
+        return combinations
+    if setting.startswith('top:'):
+        count = int(setting[len('top:'):])
+        known = set(combinations)
+        top = [i for i in access_stats.top(count) if i in known] if access_stats is not None else []
+        return top + [i for i in combinations if i not in top][:count - len(top)]
+    raise ValueError(f'Unknown FIGURE_WARMUP setting: {setting}')
+
+
+# Build the figure JSON of (graph id, year, category) tasks, in a pool process
+def build_figures(tasks):
+    return [(graph_id, year_input, category_input,
+             figure_to_json(_figure_functions[graph_id].__wrapped__(year_input, category_input)))
+            for graph_id, year_input, category_input in tasks]
+
+
+# Store built figures in the cache, return their number
+def store_figures(figure_cache, figures):
+    for graph_id, year_input, category_input, figure_json in figures:
+        figure_cache.set(cache_key(figure_cache.version, graph_id, year_input, category_input), figure_json)
+    return len(figures)
+
+
+# Build the figures of the combinations missing from the cache and store them in the cache.
+# figure_functions: graph id -> figure function decorated with figure_cache.cached
+def warm_up(figure_cache, figure_functions, combinations, workers=None):
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    tasks = [(graph_id, year_input, category_input) for year_input, category_input in combinations
+             for graph_id in figure_functions
+             if figure_cache.backend.get(cache_key(figure_cache.version, graph_id, year_input, category_input)) is None]
+    total = len(combinations) * len(figure_functions)
+    metrics.WARMUP_FIGURES.set(total, state='total')
+    metrics.WARMUP_FIGURES.set(total - len(tasks), state='cached')
+    metrics.WARMUP_FIGURES.set(0, state='built')
+
+    _figure_functions.clear()
+    _figure_functions.update(figure_functions)
+    chunk_size = max(1, -(-len(tasks) // (workers * CHUNKS_PER_WORKER)))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+
+    built = 0
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods() and len(chunks) > 1:
+        # Forked processes share the data and the aggregates of the worker
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context('fork')) as pool:
+            results = (future.result() for future in
+                       concurrent.futures.as_completed([pool.submit(build_figures, i) for i in chunks]))
+            for figures in results:
+                built += store_figures(figure_cache, figures)
+                metrics.WARMUP_FIGURES.set(built, state='built')
+                logger.info('Cache warm-up: %d / %d figures built', built, len(tasks))
+    else:
+        for chunk in chunks:
+            built += store_figures(figure_cache, build_figures(chunk))
+            metrics.WARMUP_FIGURES.set(built, state='built')
+
+    seconds = time.perf_counter() - start
+    metrics.WARMUP_SECONDS.set(seconds)
+    return {'combinations': len(combinations), 'figures': total, 'built': built, 'workers': workers,
+            'seconds': seconds}
@@ -0,0 +1,36 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# TEST FIXTURES: the modules of src are imported as the app imports them (run pytest from the repository)
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+import sys
+
+import pytest
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+DATA_DIR = os.path.join(SRC_DIR, 'data')
+
+sys.path.insert(0, SRC_DIR)
+
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Fact tables built from the CSV files of the repository (never from a local snapshot)
+@pytest.fixture(scope='session')
+def facts():
+    from facts import build_facts
+    from snapshot import read_csv_tables
+    return build_facts(read_csv_tables(DATA_DIR))
+
+
+# Aggregate cube of the fact tables
+@pytest.fixture(scope='session')
+def cube(facts):
+    from data_layer import build_cube
+    return build_cube(facts)
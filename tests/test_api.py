@@ -0,0 +1,103 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA API TESTS: pagination, ETag and parameter errors of the table routes
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from api import API_PREFIX, MAX_LIMIT, register_api
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Test client of a Flask server serving the API of the repository data
+@pytest.fixture
+def client(cube):
+    server = Flask(__name__)
+    register_api(server, lambda: cube, lambda: 'version-1')
+    return server.test_client()
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+def rows(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+# Follow the Link headers from a first page, return the rows of every page
+def all_pages(client, url):
+    pages = []
+    while url is not None:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append(rows(response))
+        link = response.headers.get('Link')
+        url = link[link.index('<') + 1:link.index('>')] if link else None
+    return pages
+
+
+# ------------------------------------------------------------------------------------------------
+# PAGINATION SECTION
+
+# Pages of limit rows, the last one shorter, together the full table in the same order
+def test_pagination(client):
+    full = client.get(f'{API_PREFIX}/breakdown?group_by=country')
+    total = int(full.headers['X-Total-Count'])
+    expected = rows(full)
+    assert len(expected) == total > 7
+    assert 'Link' not in full.headers
+
+    pages = all_pages(client, f'{API_PREFIX}/breakdown?group_by=country&limit=7')
+    assert [len(page) for page in pages[:-1]] == [7] * (len(pages) - 1)
+    assert 0 < len(pages[-1]) <= 7
+    assert [row for page in pages for row in page] == expected
+
+
+def test_offset_past_end(client):
+    response = client.get(f'{API_PREFIX}/overview?year=2023&offset=1000')
+    assert response.status_code == 200
+    assert rows(response) == []
+    assert int(response.headers['X-Total-Count']) > 0
+
+
+# The Link header keeps the other parameters, repeated ones included
+def test_next_link_parameters(client):
+    response = client.get(f'{API_PREFIX}/overview?year=2023&year=2022&limit=2')
+    assert int(response.headers['X-Total-Count']) > 2
+    link = response.headers['Link']
+    assert 'year=2023' in link and 'year=2022' in link and 'limit=2' in link and 'offset=2' in link
+    assert link.endswith('; rel="next"')
+
+
+@pytest.mark.parametrize('query', ['limit=0', f'limit={MAX_LIMIT + 1}', 'limit=ten', 'offset=-1'])
+def test_invalid_pagination(client, query):
+    response = client.get(f'{API_PREFIX}/overview?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+# ------------------------------------------------------------------------------------------------
+# CACHING SECTION
+
+# Each page has its own ETag, a repeated request with it is answered 304 without a body
+def test_etag_not_modified(client):
+    url = f'{API_PREFIX}/overview?limit=5'
+    etag = client.get(url).headers['ETag']
+    assert etag != client.get(f'{url}&offset=5').headers['ETag']
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_gzip_response(client):
+    url = f'{API_PREFIX}/overview?year=2023'
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == client.get(url).get_data()
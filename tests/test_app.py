@@ -0,0 +1,105 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# APP TESTS: layout and callback requests of every CALLBACK_MODE
+#
+# CALLBACK_MODE is read when the app module is imported, so every mode runs in its own process.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SRC_DIR
+
+# ------------------------------------------------------------------------------------------------
+# CONSTANTS SECTION
+
+# Run in the src directory: loads the app, checks that every callback input / state is in the
+# layout and sends every server callback triggered by the filters. Prints a JSON report.
+SMOKE_SCRIPT = '''
+import json
+import app
+
+app.create_app()
+client = app.server.test_client()
+layout = client.get('/_dash-layout').get_json()
+dependencies = client.get('/_dash-dependencies').get_json()
+
+ids = set()
+components = [layout]
+while components:
+    component = components.pop()
+    if isinstance(component, list):
+        components.extend(component)
+    elif isinstance(component, dict) and 'props' in component:
+        if 'id' in component['props']:
+            ids.add(component['props']['id'])
+        components.extend(component['props'].values())
+
+filters = {'year-input': app.ALL, 'category-input': app.ALL}
+responses = {}
+for dependency in dependencies:
+    if dependency.get('clientside_function') or not any(i['id'] in filters for i in dependency['inputs']):
+        continue
+    outputs = [i.rsplit('.', 1) for i in dependency['output'].split('@')[0].strip('.').split('...')]
+    body = {'output': dependency['output'],
+            'outputs': [{'id': output, 'property': prop} for output, prop in outputs],
+            'inputs': [dict(i, value=filters.get(i['id'])) for i in dependency['inputs']],
+            'state': [dict(i, value=None) for i in dependency['state']],
+            'changedPropIds': ['year-input.value']}
+    response = client.post('/_dash-update-component', json=body)
+    responses[dependency['output']] = [response.status_code, sorted(response.get_json()['response'])
+                                       if response.status_code == 200 else []]
+
+print(json.dumps({
+    'layout_ids': sorted(ids),
+    'missing': sorted({i['id'] for d in dependencies for i in d['inputs'] + d['state']} - ids),
+    'clientside': sum(1 for d in dependencies if d.get('clientside_function')),
+    'responses': responses,
+    'overview': list(app.update_food_value(app.ALL, app.ALL)),
+}))
+'''
+
+GRAPH_IDS = ['food-value-overtime', 'food-volume-overtime', 'food-value-countries', 'food-value-types',
+             'food-value-hierarchy']
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+def run_app(mode):
+    env = dict(os.environ, CALLBACK_MODE=mode)
+    for variable in ('DATA_WATCH_INTERVAL', 'FIGURE_WARMUP', 'DATA_STORE'):
+        env.pop(variable, None)
+    result = subprocess.run([sys.executable, '-c', SMOKE_SCRIPT], cwd=SRC_DIR, env=env, capture_output=True,
+                            text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# ------------------------------------------------------------------------------------------------
+# CALLBACK MODES SECTION
+
+@pytest.mark.parametrize('mode', ['separate', 'combined', 'clientside'])
+def test_callback_mode(mode):
+    report = run_app(mode)
+
+    assert report['missing'] == []
+    assert set(GRAPH_IDS) <= set(report['layout_ids'])
+    assert report['overview'] == ['1,871.7M', '133.7M', '1,010.0M']
+    for output, (status, ids) in report['responses'].items():
+        assert status == 200, output
+
+    # Every graph is updated by a server callback, or by a clientside one in clientside mode
+    updated = {i for _, ids in report['responses'].values() for i in ids}
+    if mode == 'clientside':
+        assert report['responses'] == {}
+        assert report['clientside'] >= len(GRAPH_IDS) + 1
+    else:
+        assert set(GRAPH_IDS) <= updated
+    if mode == 'combined':
+        assert len(report['responses']) == 1
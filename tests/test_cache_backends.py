@@ -0,0 +1,64 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# CACHE BACKEND TESTS: LRU eviction of the memory and disk backends
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import time
+
+import pytest
+
+from cache_backends import DiskBackend, MemoryBackend, create_backend
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+@pytest.fixture(params=['memory', 'disk'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend(max_size=2)
+    return DiskBackend(str(tmp_path / 'figures.sqlite'), max_size=2, access_refresh=0)
+
+
+# ------------------------------------------------------------------------------------------------
+# EVICTION SECTION
+
+def test_set_get_delete(backend):
+    assert backend.get('a') is None
+    backend.set('a', '1')
+    assert backend.get('a') == '1'
+    backend.delete('a')
+    assert backend.get('a') is None
+
+
+# A key read after the others were written is kept, the least recently used one is evicted
+def test_recently_read_key_kept(backend):
+    backend.set('a', '1')
+    time.sleep(0.01)
+    backend.set('b', '2')
+    time.sleep(0.01)
+    assert backend.get('a') == '1'
+    time.sleep(0.01)
+    backend.set('c', '3')
+
+    assert backend.get('a') == '1'
+    assert backend.get('b') is None
+    assert backend.get('c') == '3'
+    assert backend.stats()['size'] == 2
+
+
+# Within access_refresh seconds a hit doesn't write the access time
+def test_disk_hit_refresh_throttled(tmp_path):
+    backend = DiskBackend(str(tmp_path / 'figures.sqlite'), max_size=2, access_refresh=60)
+    backend.set('a', '1')
+    accessed = backend._connection().execute('SELECT accessed FROM cache WHERE key = ?', ('a',)).fetchone()[0]
+    time.sleep(0.01)
+    assert backend.get('a') == '1'
+    assert backend._connection().execute('SELECT accessed FROM cache WHERE key = ?', ('a',)).fetchone()[0] == accessed
+
+
+def test_create_backend(tmp_path):
+    assert create_backend('memory').name == 'memory'
+    assert create_backend(f'disk:{tmp_path / "figures.sqlite"}').name == 'disk'
+    with pytest.raises(ValueError):
+        create_backend('unknown')
@@ -0,0 +1,117 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# REQUEST COALESCING TESTS: single-flight of identical callback requests and superseded requests
+#
+# The requests are sent from threads, as a threaded server runs them.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import json
+import threading
+import time
+
+import pytest
+from dash import Dash, Input, Output, dcc, html
+
+from coalescing import SESSION_HEADER, register_coalescing
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Dash app with one callback counting its calls. A call with the 'slow' value waits for the release
+# event, so the other requests arrive while it runs.
+@pytest.fixture
+def app():
+    app = Dash(__name__)
+    app.layout = html.Div([dcc.Input(id='text-input', value=''), html.Div(id='text-output')])
+    app.calls = []
+    app.started = threading.Event()
+    app.release = threading.Event()
+
+    @app.callback(Output('text-output', 'children'), Input('text-input', 'value'))
+    def echo(value):
+        app.calls.append(value)
+        if value.startswith('slow'):
+            app.started.set()
+            app.release.wait(5)
+        return f'{value} #{len(app.calls)}'
+
+    register_coalescing(app)
+    return app
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Callback request of the Dash renderer
+def callback_request(app, value, session=None):
+    body = {'output': 'text-output.children', 'outputs': {'id': 'text-output', 'property': 'children'},
+            'inputs': [{'id': 'text-input', 'property': 'value', 'value': value}],
+            'changedPropIds': ['text-input.value']}
+    return app.server.test_client().post('/_dash-update-component', data=json.dumps(body),
+                                         content_type='application/json',
+                                         headers={SESSION_HEADER: session} if session else {})
+
+
+# Send a request from a thread, its response is stored in responses
+def send(app, responses, value, session=None):
+    thread = threading.Thread(target=lambda: responses.append(callback_request(app, value, session)))
+    thread.start()
+    return thread
+
+
+# ------------------------------------------------------------------------------------------------
+# SINGLE-FLIGHT SECTION
+
+# Identical requests arriving while the first one runs get its response, the callback runs once
+def test_identical_requests_run_once(app):
+    responses = []
+    threads = [send(app, responses, 'slow')]
+    assert app.started.wait(5)
+    threads += [send(app, responses, 'slow') for _ in range(3)]
+    time.sleep(0.2)
+    app.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert app.calls == ['slow']
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.get_data() for response in responses}) == 1
+
+
+# Other inputs are not coalesced, and a finished flight is not reused
+def test_other_requests_run(app):
+    app.release.set()
+    responses = []
+    threads = [send(app, responses, 'slow'), send(app, responses, 'fast')]
+    for thread in threads:
+        thread.join(5)
+    callback_request(app, 'slow')
+    assert sorted(app.calls) == ['fast', 'slow', 'slow']
+
+
+# ------------------------------------------------------------------------------------------------
+# SUPERSEDED SECTION
+
+# A request of a tab answered after a newer request of the same tab for the callback is dropped
+def test_superseded_request_dropped(app):
+    responses = []
+    thread = send(app, responses, 'slow', session='tab-1')
+    assert app.started.wait(5)
+    newer = callback_request(app, 'fast', session='tab-1')
+    app.release.set()
+    thread.join(5)
+
+    assert newer.status_code == 200
+    assert responses[0].status_code == 204
+
+
+# Requests of other tabs are never dropped
+def test_other_tab_kept(app):
+    responses = []
+    thread = send(app, responses, 'slow', session='tab-1')
+    assert app.started.wait(5)
+    callback_request(app, 'fast', session='tab-2')
+    app.release.set()
+    thread.join(5)
+    assert responses[0].status_code == 200
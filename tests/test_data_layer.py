@@ -0,0 +1,46 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA LAYER TESTS: KPIs of the overview row
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pytest
+
+from data_layer import ALL, kpi_table, with_totals
+
+# ------------------------------------------------------------------------------------------------
+# KPI SECTION
+
+# Values of the overview row for every year and every category (in millions, as displayed)
+def test_kpi_baseline(cube):
+    kpis = cube['kpis'].loc[(ALL, ALL)]
+    assert round(kpis['total_value'] / 1e6, 1) == 1871.7
+    assert round(kpis['average_value'] / 1e6, 1) == 133.7
+    assert round(kpis['total_volume'] / 1e6, 1) == 1010.0
+    assert kpis['value_share'] == 1.0
+
+
+def test_kpi_table_covers_every_combination(cube):
+    assert len(cube['kpis']) == len(cube['years']) * len(cube['categories'])
+    assert set(cube['overview']) == set(cube['kpis'].index)
+
+
+def test_with_totals():
+    totals = with_totals(np.array([[1.0, 2.0], [3.0, 4.0]]))
+    assert totals.tolist() == [[1.0, 2.0, 3.0], [3.0, 4.0, 7.0], [4.0, 6.0, 10.0]]
+
+
+# Average of the values present (a missing category isn't counted), growth and share
+def test_kpi_table_small_matrix():
+    values = np.array([[10.0, np.nan], [20.0, 30.0]])
+    volumes = np.array([[1.0, np.nan], [2.0, 3.0]])
+    kpis = kpi_table(np.array([2021, 2022]), ['A', 'B'], values, volumes)
+
+    assert kpis.loc[('2021', ALL), 'total_value'] == 10.0
+    assert kpis.loc[('2021', ALL), 'average_value'] == 10.0
+    assert kpis.loc[('2022', ALL), 'average_value'] == 25.0
+    assert kpis.loc[(ALL, 'A'), 'total_volume'] == 3.0
+    assert kpis.loc[('2022', 'A'), 'value_growth'] == pytest.approx(1.0)
+    assert kpis.loc[('2022', 'B'), 'value_share'] == pytest.approx(0.6)
+    assert kpis.loc[(ALL, ALL), 'total_value'] == 60.0
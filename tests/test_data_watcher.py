@@ -0,0 +1,134 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DATA WATCHER TESTS: appended rows and reloaded tables of the data directory
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+import shutil
+
+import pytest
+
+from conftest import DATA_DIR, SRC_DIR
+from data_watcher import DataWatcher
+from snapshot import TABLES, source_info
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Copy of the source files (ending with a new line) in a temporary data directory
+@pytest.fixture
+def data_dir(tmp_path):
+    for file in TABLES.values():
+        shutil.copy(os.path.join(DATA_DIR, file), tmp_path)
+        with open(tmp_path / file, 'rb+') as handle:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b'\n':
+                handle.write(b'\n')
+    return tmp_path
+
+
+@pytest.fixture
+def watcher(data_dir):
+    return DataWatcher(str(data_dir), {file: source_info(os.path.join(data_dir, file)) for file in TABLES.values()})
+
+
+def append(data_dir, file, text):
+    with open(data_dir / file, 'a') as handle:
+        handle.write(text)
+
+
+# ------------------------------------------------------------------------------------------------
+# POLL SECTION
+
+def test_unchanged_files(watcher):
+    assert watcher.poll() == {}
+
+
+def test_append(watcher, data_dir):
+    append(data_dir, TABLES['food_value_countries'], '2024,Chile,Wine,Beverages,10.0\n2024,Peru,Coffee,Coffee,5.0\n')
+    changes = watcher.poll()
+
+    assert list(changes) == ['food_value_countries']
+    kind, rows = changes['food_value_countries']
+    assert kind == 'append'
+    assert rows['Country'].astype(str).tolist() == ['Chile', 'Peru']
+    assert rows['Year'].tolist() == [2024, 2024]
+    # The new state is recorded: the next poll finds nothing
+    assert watcher.poll() == {}
+
+
+# A line still being written is left for the next poll
+def test_partial_line(watcher, data_dir):
+    file = TABLES['food_value_categories']
+    append(data_dir, file, '2024,1.5,Bev')
+    assert watcher.poll() == {}
+    append(data_dir, file, 'erages\n')
+    kind, rows = watcher.poll()['food_value_categories']
+    assert kind == 'append'
+    assert rows['Food Category'].astype(str).tolist() == ['Beverages']
+
+
+def test_rewritten_file_reloaded(watcher, data_dir):
+    path = data_dir / TABLES['food_volume_categories']
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text(lines[0] + ''.join(lines[2:]))
+    kind, rows = watcher.poll()['food_volume_categories']
+    assert kind == 'reload'
+    assert len(rows) == len(lines) - 2
+
+
+# Rows appended to a file without a final new line change its last line: the file is reloaded
+def test_append_without_new_line_reloaded(data_dir):
+    file = TABLES['food_value_countries']
+    path = data_dir / file
+    path.write_bytes(path.read_bytes().rstrip(b'\n'))
+    watcher = DataWatcher(str(data_dir), {file: source_info(str(path))})
+    append(data_dir, file, '\n2024,Chile,Wine,Beverages,10.0\n')
+    kind, rows = watcher.poll()['food_value_countries']
+    assert kind == 'reload'
+    assert rows['Country'].astype(str).iloc[-1] == 'Chile'
+
+
+# A change whose apply failed is found again by the next check
+def test_failed_change_retried(watcher, data_dir):
+    append(data_dir, TABLES['food_value_categories'], '2024,1.5,Beverages\n')
+
+    def fail(changes):
+        raise RuntimeError('apply failed')
+
+    with pytest.raises(RuntimeError):
+        watcher.check(fail)
+    applied = []
+    watcher.check(applied.append)
+    assert [list(i) for i in applied] == [['food_value_categories']]
+    watcher.check(applied.append)
+    assert len(applied) == 1
+
+
+# ------------------------------------------------------------------------------------------------
+# DATA RELOAD SECTION
+
+# The new facts are kept when the figure invalidation fails: the rows are applied once only
+def test_failed_invalidation_applied_once(watcher, data_dir, monkeypatch):
+    monkeypatch.chdir(SRC_DIR)
+    import app
+    app.load_data()
+    for name in ('facts', 'cube', 'current_layout', 'data_version'):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    monkeypatch.setattr(app.figure_cache, 'version', app.figure_cache.version)
+    monkeypatch.setattr(app, 'data_watcher', watcher)
+
+    def fail(changed_tables, changed_years, data_hash):
+        raise RuntimeError('invalidation failed')
+
+    monkeypatch.setattr(app, 'invalidate_figures', fail)
+    rows = len(app.facts['countries'])
+    append(data_dir, TABLES['food_value_countries'], '2024,Chile,Wine,Beverages,10.0\n')
+
+    watcher.check(app.apply_data_changes)
+    watcher.check(app.apply_data_changes)
+    countries = app.facts['countries']
+    assert len(countries) == rows + 1
+    assert (countries['Country'] == 'Chile').sum() == 1
+    assert app.figure_cache.version == app.figure_version(app.data_version)
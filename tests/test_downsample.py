@@ -0,0 +1,72 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# DOWNSAMPLING TESTS: length and end points of the LTTB and min-max outputs
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pandas as pd
+import pytest
+
+import downsample
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+@pytest.fixture(scope='module')
+def series():
+    x = pd.date_range('2000-01-01', periods=20000, freq='h').to_numpy()
+    y = np.sin(np.arange(len(x)) / 300) + np.random.default_rng(0).random(len(x))
+    return x, y
+
+
+# ------------------------------------------------------------------------------------------------
+# DOWNSAMPLING SECTION
+
+@pytest.mark.parametrize('points', [3, 100, 800])
+def test_lttb_length_and_end_points(series, points):
+    x, y = series
+    sampled_x, sampled_y = downsample.downsample(x, y, points, method='lttb')
+    assert len(sampled_x) == len(sampled_y) == points
+    assert sampled_x[0] == x[0] and sampled_x[-1] == x[-1]
+    assert sampled_y[0] == y[0] and sampled_y[-1] == y[-1]
+    assert np.all(np.diff(sampled_x) > np.timedelta64(0))
+
+
+@pytest.mark.parametrize('points', [4, 100, 1600])
+def test_min_max_length_and_end_points(series, points):
+    x, y = series
+    sampled_x, sampled_y = downsample.downsample(x, y, points, method='minmax')
+    assert len(sampled_x) <= points
+    assert sampled_x[0] == x[0] and sampled_x[-1] == x[-1]
+    assert np.all(np.diff(sampled_x) > np.timedelta64(0))
+    # Every peak is kept
+    assert sampled_y.max() == y.max() and sampled_y.min() == y.min()
+
+
+@pytest.mark.parametrize('method', downsample.METHODS)
+def test_short_series_kept(method):
+    x, y = np.arange(10.0), np.arange(10.0)
+    sampled_x, sampled_y = downsample.downsample(x, y, 100, method=method)
+    assert sampled_x.tolist() == x.tolist() and sampled_y.tolist() == y.tolist()
+
+
+def test_unsorted_series_sorted_first():
+    x = np.array([3.0, 1.0, 2.0, 0.0, 4.0])
+    sampled_x, sampled_y = downsample.downsample(x, x * 10, 3, method='lttb')
+    assert sampled_x[0] == 0.0 and sampled_x[-1] == 4.0
+    assert (sampled_y == sampled_x * 10).all()
+
+
+# The points next to the window are kept so the line reaches the edges of the graph
+def test_window_end_points(series):
+    x, y = series
+    start, end = x[5000], x[9000]
+    sampled_x, _ = downsample.window(x, y, start, end, 200)
+    assert len(sampled_x) == 200
+    assert sampled_x[0] == x[4999] and sampled_x[-1] == x[9001]
+
+
+def test_max_points():
+    assert downsample.max_points(500, 'lttb') == 500
+    assert downsample.max_points(500, 'minmax') == 1000
@@ -0,0 +1,96 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# FIGURE CACHE TESTS: memoized figure callbacks, data version of the keys and invalidation
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import plotly.graph_objects as go
+import pytest
+
+from cache_backends import DiskBackend, MemoryBackend
+from figure_cache import NO_FIGURE, FigureCache, cache_key, figure_from_json, figure_to_json
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+@pytest.fixture(params=['memory', 'disk'])
+def figure_cache(request, tmp_path):
+    if request.param == 'memory':
+        return FigureCache(backend=MemoryBackend(max_size=8), version='v1')
+    return FigureCache(backend=DiskBackend(str(tmp_path / 'figures.sqlite'), max_size=8), version='v1')
+
+
+# Figure callback counting its calls
+@pytest.fixture
+def callback():
+    calls = []
+
+    def build_figure(year_input, category_input):
+        calls.append((year_input, category_input))
+        return go.Figure(go.Bar(x=[category_input], y=[len(calls)]))
+
+    build_figure.calls = calls
+    return build_figure
+
+
+# ------------------------------------------------------------------------------------------------
+# SERIALIZATION SECTION
+
+def test_figure_json_round_trip():
+    figure = go.Figure(go.Scatter(x=[2020, 2021], y=[1.5, 2.5]))
+    data = figure_from_json(figure_to_json(figure))
+    assert list(data['data'][0]['x']) == [2020, 2021]
+    assert list(data['data'][0]['y']) == [1.5, 2.5]
+    assert figure_to_json(None) == NO_FIGURE
+    assert figure_from_json(NO_FIGURE) is None
+
+
+# ------------------------------------------------------------------------------------------------
+# MEMOIZATION SECTION
+
+# A repeat view is served from the cache, another filter combination builds its own figure
+def test_cached_hit_and_miss(figure_cache, callback):
+    cached = figure_cache.cached('graph')(callback)
+    first = cached(2023, 'Fish')
+    assert cached(2023, 'Fish') == first
+    assert callback.calls == [(2023, 'Fish')]
+
+    cached(2023, 'Meats')
+    assert callback.calls == [(2023, 'Fish'), (2023, 'Meats')]
+    stats = figure_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+# A callback returning no figure is cached too
+def test_cached_no_figure(figure_cache):
+    calls = []
+    cached = figure_cache.cached('graph')(lambda year_input, category_input: calls.append(1))
+    assert cached(2023, 'Fish') is None
+    assert cached(2023, 'Fish') is None
+    assert len(calls) == 1
+
+
+# Figures of an older data version are never served
+def test_version_in_key(figure_cache, callback):
+    cached = figure_cache.cached('graph')(callback)
+    cached(2023, 'Fish')
+    assert figure_cache.backend.get(cache_key('v1', 'graph', 2023, 'Fish')) is not None
+
+    figure_cache.version = 'v2'
+    cached(2023, 'Fish')
+    assert len(callback.calls) == 2
+
+
+def test_invalidate_and_clear(figure_cache, callback):
+    cached = figure_cache.cached('graph')(callback)
+    cached(2023, 'Fish')
+    cached(2023, 'Meats')
+
+    figure_cache.invalidate('graph', 2023, 'Fish')
+    cached(2023, 'Fish')
+    cached(2023, 'Meats')
+    assert callback.calls == [(2023, 'Fish'), (2023, 'Meats'), (2023, 'Fish')]
+
+    figure_cache.clear()
+    cached(2023, 'Meats')
+    assert len(callback.calls) == 4
@@ -0,0 +1,60 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# FORKED WORKER TESTS: per process watcher thread and SQLite connections (gunicorn --preload)
+#
+# A fork is simulated by changing the process id seen by the modules.
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import os
+
+import pytest
+
+from cache_backends import DiskBackend
+from data_watcher import DataWatcher
+from warmup import AccessStats
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Make os.getpid() return another process id
+def fork(monkeypatch):
+    pid = os.getpid() + 1
+    monkeypatch.setattr(os, 'getpid', lambda: pid)
+
+
+# ------------------------------------------------------------------------------------------------
+# WATCHER SECTION
+
+def test_watcher_thread_started_once_per_process(tmp_path, monkeypatch):
+    watcher = DataWatcher(str(tmp_path), {}, interval=60)
+    try:
+        watcher.start(lambda changes: None)
+        master_thread = watcher._thread
+        watcher.start(lambda changes: None)
+        assert watcher._thread is master_thread
+
+        fork(monkeypatch)
+        watcher.start(lambda changes: None)
+        assert watcher._thread is not master_thread
+        assert watcher._thread.is_alive()
+    finally:
+        watcher.stop()
+
+
+# ------------------------------------------------------------------------------------------------
+# SQLITE CONNECTIONS SECTION
+
+@pytest.mark.parametrize('store', [
+    lambda path: DiskBackend(str(path / 'figures.sqlite')),
+    lambda path: AccessStats(str(path / 'access.sqlite')),
+])
+def test_connection_opened_per_process(tmp_path, monkeypatch, store):
+    store = store(tmp_path)
+    master_connection = store._connection()
+    assert store._connection() is master_connection
+
+    fork(monkeypatch)
+    worker_connection = store._connection()
+    assert worker_connection is not master_connection
+    assert worker_connection.execute('SELECT 1').fetchone() == (1,)
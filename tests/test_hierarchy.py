@@ -0,0 +1,70 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# HIERARCHY TESTS: totals of the Food Category -> Category Type -> Country sum tree
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pytest
+
+from data_layer import ALL
+from hierarchy import SumTree
+from query_engine import QueryEngine
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+@pytest.fixture(scope='module')
+def engine(facts):
+    return QueryEngine(facts['countries'])
+
+
+@pytest.fixture(scope='module')
+def tree(engine):
+    return SumTree(engine, ALL)
+
+
+# ------------------------------------------------------------------------------------------------
+# TOTALS SECTION
+
+# The 'All' node adds up every row of its year, the every year row adds up the years
+def test_all_node_totals(tree, facts):
+    countries = facts['countries']
+    root = tree.node_index[ALL]
+    for year, row in tree.year_index.items():
+        rows = countries if year == ALL else countries.loc[countries['Year'] == int(year)]
+        assert tree.sums[row, root] == pytest.approx(rows['Food Value'].astype(np.float64).sum())
+        assert tree.counts[row, root] == len(rows)
+
+
+# Every node with children adds up its children, in every year
+def test_children_add_up_to_their_parent(tree):
+    parents = np.flatnonzero(tree.child_end > tree.child_start)
+    for position in parents:
+        children = slice(tree.child_start[position], tree.child_end[position])
+        assert np.allclose(tree.sums[:, children].sum(axis=1), tree.sums[:, position])
+        assert (tree.parents[children] == position).all()
+
+
+# The 'All' branch holds the same types and countries as the categories added up
+def test_all_branch_matches_the_categories(tree, engine):
+    for year in (None, '2020'):
+        labels, sums = tree.children(tree.node_id(None), year)
+        expected = engine.group_by('Category Type', 'Food Value', year=year).set_index('Category Type')
+        assert sorted(labels) == sorted(expected.index)
+        assert np.allclose(sums, expected['Food Value'].loc[labels].to_numpy(dtype=np.float64), rtol=1e-6)
+
+
+def test_treemap_of_a_category(tree):
+    nodes = tree.treemap('2020', 'Beverages')
+    root = nodes['ids'].index('Beverages')
+    assert nodes['parents'][root] == ''
+    assert all(i == 'Beverages' or i.startswith('Beverages/') for i in nodes['ids'])
+    children = [i for i, parent in enumerate(nodes['parents']) if parent == 'Beverages']
+    assert nodes['values'][children].sum() == pytest.approx(nodes['values'][root])
+
+
+def test_unknown_year_or_node(tree):
+    assert tree.treemap('1900')['ids'] == []
+    labels, sums = tree.children('Unknown')
+    assert len(labels) == 0 and len(sums) == 0
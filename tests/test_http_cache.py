@@ -0,0 +1,108 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# HTTP CACHING TESTS: callback ETags (304 before the callback runs), content ETags, asset lifetime
+# and compression of the Dash responses
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import gzip
+import json
+import os
+
+import pytest
+from dash import Dash, Input, Output, dcc, html
+
+from conftest import SRC_DIR
+from http_cache import IMMUTABLE_CACHE_CONTROL, asset_url, register_http_cache
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Dash app with one callback counting its calls, and the data version it reads
+@pytest.fixture
+def app():
+    app = Dash(__name__, assets_folder=os.path.join(SRC_DIR, 'assets'))
+    app.layout = html.Div([dcc.Input(id='text-input', value=''), html.Div(id='text-output')])
+    app.calls = []
+    app.data_version = 'version-1'
+
+    @app.callback(Output('text-output', 'children'), Input('text-input', 'value'))
+    def echo(value):
+        app.calls.append(value)
+        return value * 100
+
+    register_http_cache(app, lambda: app.data_version)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.server.test_client()
+
+
+# ------------------------------------------------------------------------------------------------
+# HELPERS SECTION
+
+# Callback request of the Dash renderer
+def callback_request(client, value, headers=None):
+    body = {'output': 'text-output.children', 'outputs': {'id': 'text-output', 'property': 'children'},
+            'inputs': [{'id': 'text-input', 'property': 'value', 'value': value}],
+            'changedPropIds': ['text-input.value']}
+    return client.post('/_dash-update-component', data=json.dumps(body), content_type='application/json',
+                       headers=headers or {})
+
+
+# ------------------------------------------------------------------------------------------------
+# CALLBACK SECTION
+
+# A repeated callback request with the ETag is answered 304 without running the callback
+def test_callback_not_modified(app, client):
+    response = callback_request(client, 'a')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = callback_request(client, 'a', {'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert app.calls == ['a']
+
+
+# Other inputs or another data version give another ETag: the callback runs again
+def test_callback_etag_changes(app, client):
+    etag = callback_request(client, 'a').headers['ETag']
+    assert callback_request(client, 'b', {'If-None-Match': etag}).status_code == 200
+
+    app.data_version = 'version-2'
+    response = callback_request(client, 'a', {'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert app.calls == ['a', 'b', 'a']
+
+
+# ------------------------------------------------------------------------------------------------
+# CONTENT SECTION
+
+def test_layout_not_modified(client):
+    etag = client.get('/_dash-layout').headers['ETag']
+    response = client.get('/_dash-layout', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+# A versioned asset URL is cached for a year, the plain URL is revalidated
+def test_asset_cache_control(app, client):
+    url = asset_url(app, 'graph_view.js')
+    assert '?v=' in url
+    assert client.get(url).headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert client.get(app.get_asset_url('graph_view.js')).headers.get('Cache-Control') != IMMUTABLE_CACHE_CONTROL
+
+
+# Large text responses are compressed when accepted, small ones are sent as they are
+def test_compression(client):
+    plain = callback_request(client, 'a' * 20)
+    response = callback_request(client, 'a' * 20, {'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+    assert 'Content-Encoding' not in callback_request(client, '', {'Accept-Encoding': 'gzip'}).headers
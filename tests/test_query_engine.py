@@ -0,0 +1,83 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# QUERY ENGINE TESTS: breakdowns of the country level data
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import numpy as np
+import pytest
+
+from query_engine import QueryEngine, top_groups
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+@pytest.fixture(scope='module')
+def engine(facts):
+    return QueryEngine(facts['countries'])
+
+
+# Sums of a measure per group computed directly on the fact table
+def expected_sums(countries, group_column, year=None, category=None):
+    rows = countries
+    if year is not None:
+        rows = rows.loc[rows['Year'] == int(year)]
+    if category is not None:
+        rows = rows.loc[rows['Food Category'] == category]
+    sums = rows.groupby(rows[group_column].astype(str))['Food Value'].sum()
+    return sums.loc[sums.index.isin(rows[group_column].astype(str))]
+
+
+# ------------------------------------------------------------------------------------------------
+# GROUP BY SECTION
+
+@pytest.mark.parametrize('group_column', ['Country', 'Category Type'])
+@pytest.mark.parametrize('year, category', [(None, None), ('2020', None), (None, 'Beverages'), ('2021', 'Fish')])
+def test_group_by_matches_the_fact_table(engine, facts, group_column, year, category):
+    result = engine.group_by(group_column, 'Food Value', year=year, category=category)
+    expected = expected_sums(facts['countries'], group_column, year, category)
+
+    assert sorted(result[group_column]) == sorted(expected.index)
+    assert np.allclose(result.set_index(group_column)['Food Value'].loc[expected.index], expected, rtol=1e-6)
+    # Ascending order (bottom to top of the bar charts)
+    assert np.all(np.diff(result['Food Value'].to_numpy()) >= 0)
+
+
+def test_group_by_unknown_category(engine):
+    assert engine.group_by('Country', 'Food Value', category='Unknown').empty
+
+
+# The top_n largest groups, the others added up in one row placed first
+def test_group_by_top_n_with_others(engine):
+    every_group = engine.group_by('Country', 'Food Value')
+    result = engine.group_by('Country', 'Food Value', top_n=3, others_label='Others')
+
+    assert len(result) == 4
+    assert result['Country'].iloc[0] == 'Others'
+    assert result['Country'].iloc[1:].tolist() == every_group['Country'].iloc[-3:].tolist()
+    assert result['Food Value'].sum() == pytest.approx(every_group['Food Value'].sum())
+
+
+# ------------------------------------------------------------------------------------------------
+# TOP GROUPS SECTION
+
+def test_top_groups_others_row():
+    labels = np.array(['a', 'b', 'c', 'd'], dtype=object)
+    sums = np.array([4.0, 1.0, 3.5, 2.0])
+    result = top_groups(labels, sums, 'Country', 'Food Value', top_n=2, others_label='Others')
+
+    assert result['Country'].tolist() == ['Others', 'c', 'a']
+    assert result['Food Value'].tolist() == [3.0, 3.5, 4.0]
+
+
+def test_top_groups_without_others_label():
+    labels = np.array(['a', 'b', 'c'], dtype=object)
+    result = top_groups(labels, np.array([3.0, 1.0, 2.0]), 'Country', 'Food Value', top_n=2)
+    assert result['Country'].tolist() == ['c', 'a']
+
+
+# Fewer groups than top_n: every group, no 'Others' row
+def test_top_groups_every_group_shown():
+    labels = np.array(['a', 'b'], dtype=object)
+    result = top_groups(labels, np.array([2.0, 1.0]), 'Country', 'Food Value', top_n=5, others_label='Others')
+    assert result['Country'].tolist() == ['b', 'a']
@@ -0,0 +1,70 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# SHARED STORE TESTS: fact tables and query engine attached from the shared memory segment
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_DIR
+from query_engine import QueryEngine
+from shared_store import attach, attach_data, publish, publish_data
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Segment published as by the gunicorn master, unlinked after the test
+@pytest.fixture
+def published():
+    segment = publish_data(DATA_DIR)
+    yield segment
+    segment.close()
+    segment.unlink()
+
+
+# ------------------------------------------------------------------------------------------------
+# SEGMENT SECTION
+
+# The arrays are read only views of the segment, with their metadata
+def test_publish_attach_arrays():
+    arrays = {'values': np.arange(10, dtype='float64'), 'codes': np.array([3, 1, 2], dtype='int8')}
+    segment = publish(arrays, {'note': 'test'})
+    try:
+        worker_segment, attached, meta = attach(segment.name)
+        assert meta == {'note': 'test'}
+        for key, values in arrays.items():
+            np.testing.assert_array_equal(attached[key], values)
+            assert attached[key].dtype == values.dtype
+            assert not attached[key].flags.writeable
+        del attached
+        worker_segment.close()
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+# ------------------------------------------------------------------------------------------------
+# DASHBOARD DATA SECTION
+
+# A worker attached to the segment gets the fact tables and a query engine giving the same results
+def test_attach_data(published, facts):
+    attached_facts, engine, report, segment = attach_data(published.name)
+    try:
+        assert report['source'] == 'shared memory'
+        assert set(attached_facts) == set(facts)
+        for name, data in facts.items():
+            pd.testing.assert_frame_equal(attached_facts[name], data)
+
+        expected = QueryEngine(facts['countries'])
+        year = int(facts['countries']['Year'].max())
+        for year_filter in (None, year):
+            pd.testing.assert_frame_equal(engine.group_by('Country', 'Food Value', year_filter, top_n=5),
+                                          expected.group_by('Country', 'Food Value', year_filter, top_n=5))
+    finally:
+        del attached_facts, engine
+        gc.collect()
+        segment.close()
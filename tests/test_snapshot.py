@@ -0,0 +1,92 @@
+# PROJECT NAME: U.S.A. FOOD IMPORT DASHBOARD
+# AUTHOR: MIKE MUSAS
+# SNAPSHOT TESTS: round-trip of the fact tables through the columnar snapshot and its fallbacks
+
+
+# REQUIRED PYTHON PACKAGES TO IMPORT
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATA_DIR
+from snapshot import MANIFEST_FILE, TABLES, build_snapshot, load_facts, read_manifest
+
+# ------------------------------------------------------------------------------------------------
+# FIXTURES SECTION
+
+# Copy of the CSV files (the files of the repository are never changed) and its snapshot directory
+@pytest.fixture
+def data_dir(tmp_path):
+    for file in TABLES.values():
+        shutil.copy(os.path.join(DATA_DIR, file), tmp_path / file)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    return str(tmp_path / 'snapshot')
+
+
+# ------------------------------------------------------------------------------------------------
+# ROUND-TRIP SECTION
+
+# The snapshot gives the fact tables built from the CSV files, with the same dtypes
+def test_round_trip(data_dir, snapshot_dir, facts):
+    manifest = build_snapshot(data_dir, snapshot_dir)
+    loaded, report = load_facts(data_dir, snapshot_dir)
+
+    assert report['source'] == 'snapshot'
+    assert report['content_hash'] == manifest['content_hash']
+    assert set(loaded) == set(facts)
+    for name, data in facts.items():
+        pd.testing.assert_frame_equal(loaded[name], data)
+
+
+# Without a snapshot the CSV files are read, with the same content hash
+def test_missing_snapshot(data_dir, snapshot_dir):
+    _, report = load_facts(data_dir, snapshot_dir)
+    assert report['source'] == 'csv'
+    assert report['content_hash'] == build_snapshot(data_dir, snapshot_dir)['content_hash']
+
+
+# The numeric columns are used in place from the memory mapped files
+def test_columns_memory_mapped(data_dir, snapshot_dir):
+    build_snapshot(data_dir, snapshot_dir)
+    loaded, _ = load_facts(data_dir, snapshot_dir)
+    data = loaded['categories']
+    column = next(name for name in data.columns if pd.api.types.is_float_dtype(data[name]))
+    values = data[column].to_numpy()
+    while values.base is not None and not isinstance(values, np.memmap):
+        values = values.base
+    assert isinstance(values, np.memmap)
+
+
+# ------------------------------------------------------------------------------------------------
+# FALLBACK SECTION
+
+# A source file changed after the snapshot was built makes it stale
+def test_stale_snapshot(data_dir, snapshot_dir):
+    build_snapshot(data_dir, snapshot_dir)
+    with open(os.path.join(data_dir, TABLES['food_value_categories']), 'a') as file:
+        file.write('\n')
+
+    assert read_manifest(data_dir, snapshot_dir) is None
+    assert load_facts(data_dir, snapshot_dir)[1]['source'] == 'csv'
+
+
+# A snapshot written by another version of the format is not loaded
+def test_outdated_snapshot(data_dir, snapshot_dir):
+    build_snapshot(data_dir, snapshot_dir)
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    manifest['version'] -= 1
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file)
+
+    assert read_manifest(data_dir, snapshot_dir) is None
+    assert load_facts(data_dir, snapshot_dir)[1]['source'] == 'csv'